@@ -1,25 +1,68 @@
+from __future__ import annotations
+
 import os
 import sys
 import time
+import math
 import socket
+import struct
+import asyncio
+import bisect
+import errno
+import heapq
+import threading
 import subprocess
 import select
 import warnings
-from typing import List
+from array import array
+from collections import deque
+from typing import List, Optional, Tuple
 import json
 
-try:
-    import requests
-    from pythonping import ping
-    from rich.console import Console
-    from rich.panel import Panel
-    from rich.text import Text
-    from rich.table import Table
-    from rich.live import Live
-except ImportError as e:
-    print(f"Error: One or more required libraries are missing: {e.name}")
-    print(f"Please install the missing libraries with: pip install requests pythonping rich")
-    sys.exit(1)
+console = None
+
+def _load_ui() -> None:
+    """Imports Rich and creates the console; only the interactive menus need them."""
+    global console, Console, Panel, Text, Table, Live, Group
+    try:
+        import requests
+        import pythonping
+        from rich.console import Console
+        from rich.panel import Panel
+        from rich.text import Text
+        from rich.table import Table
+        from rich.live import Live
+        from rich.console import Group
+    except ImportError as e:
+        print(f"Error: One or more required libraries are missing: {e.name}")
+        print(f"Please install the missing libraries with: pip install requests pythonping rich")
+        sys.exit(1)
+    console = Console()
+
+def log_error(message: str) -> None:
+    """Reports an error on the Rich console, or on stderr when running headless."""
+    if console:
+        console.print(f"[bold red]{message}[/bold red]")
+    else:
+        print(message, file=sys.stderr)
+
+np = None
+LOG_DTYPE = None
+_numpy_missing = False
+
+def _load_numpy():
+    """Imports NumPy on first use, so probing and 'run' never pay for it; returns None if it is not installed."""
+    global np, LOG_DTYPE, _numpy_missing
+    if np is None and not _numpy_missing:
+        try:
+            import numpy
+        except ImportError:
+            _numpy_missing = True
+            return None
+        LOG_DTYPE = numpy.dtype([("ts", "<i8"), ("target", "<u4"), ("rtt", "<f4"),
+                                 ("method", "u1"), ("status", "u1"), ("pad", "V2")])
+        np = numpy
+    return np
 
 try:
     import msvcrt
@@ -43,38 +86,329 @@ except ImportError:
                 termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
         return ch
 
-console = Console()
+class KeyReader:
+    """Reads key presses without blocking while a live view is running.
+
+    On Unix the terminal is switched to cbreak mode for the duration, so keys
+    arrive immediately instead of after Enter. Arrow and paging keys are
+    returned as 'up', 'down', 'pgup', 'pgdn', 'home' and 'end'.
+    """
+    UNIX_KEYS = {"\x1b[A": "up", "\x1b[B": "down", "\x1b[5~": "pgup", "\x1b[6~": "pgdn",
+                 "\x1b[H": "home", "\x1b[F": "end", "\x1b[1~": "home", "\x1b[4~": "end"}
+    WINDOWS_KEYS = {"H": "up", "P": "down", "I": "pgup", "Q": "pgdn", "G": "home", "O": "end"}
+
+    def __enter__(self) -> "KeyReader":
+        self.old_settings = None
+        if 'msvcrt' not in sys.modules:
+            try:
+                self.old_settings = termios.tcgetattr(sys.stdin.fileno())
+                tty.setcbreak(sys.stdin.fileno())
+            except (termios.error, AttributeError, ValueError):
+                self.old_settings = None
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self.old_settings:
+            termios.tcsetattr(sys.stdin.fileno(), termios.TCSADRAIN, self.old_settings)
+
+    def read(self) -> Optional[str]:
+        """Returns the next key press, or None if no key is waiting."""
+        if 'msvcrt' in sys.modules:
+            if not msvcrt.kbhit():
+                return None
+            ch = msvcrt.getwch()
+            if ch in ("\x00", "\xe0"):
+                return self.WINDOWS_KEYS.get(msvcrt.getwch(), "")
+            return ch
+        if sys.stdin not in select.select([sys.stdin], [], [], 0)[0]:
+            return None
+        data = os.read(sys.stdin.fileno(), 16).decode('utf-8', errors='ignore')
+        return self.UNIX_KEYS.get(data, data[:1])
 
 VERSION = "1.0.1"
 
 CONFIG_FILE = "config.json"
+TARGET_DB_FILE = "targets.db"
+TARGET_PAGE_SIZE = 20
+
+ICMP_TIMEOUT = 1
+ICMP_WHEEL_TICK = 0.01
+TCP_TIMEOUT = 2
+UDP_TIMEOUT = 1
+DNS_TIMEOUT = 2
+HTTP_TIMEOUT = 5
+HTTP_WORKERS = 32
+HTTP_POOL_SIZE = 4
+HTTP_MAX_BODY = 1024 * 1024
+PROBE_RESULT_GRACE = 1.0
+TRACE_MAX_HOPS = 30
+TRACE_TIMEOUT = 2.0
+TRACE_INTERVAL = 1.0
+TRACE_UDP_BASE_PORT = 33434
+TRACE_UDP_PORTS = 1024
+TRACE_HOP_ADDRESSES = 8
+TRACE_PAYLOAD = b"sry-ping"
+FLEET_MAX_IN_FLIGHT = 512
+FLEET_MAX_RATE = 10.0
+SHARD_REPORT_INTERVAL = 0.5
+ADAPTIVE_MAX_RATE = 5.0
+ADAPTIVE_MAX_BACKOFF = 8
+ADAPTIVE_STABLE_PROBES = 30
+ADAPTIVE_BURST_PROBES = 10
+CHANGE_WARMUP = 20
+CHANGE_DRIFT = 0.5
+CHANGE_THRESHOLD = 8.0
+CHANGE_CLIP = 3.0
+CHANGE_SETTLE = 5
+CHANGE_CONFIRM = 0.5
+CHANGE_MIN_SIGMA = 0.1
+CHANGE_MIN_RELATIVE = 0.05
+CHANGE_BASELINE_ALPHA = 0.01
+CHANGE_LOSS_WINDOW = 20
+CHANGE_LOSS_ALARM = 0.2
+CHANGE_LOSS_CLEAR = 0.05
+CHANGE_RECENT_EVENTS = 100
+SELF_STATS_INTERVAL = 10.0
+PROFILE_INTERVAL = 0.005
+REPORT_DIR = "reports"
+REPORT_PERCENTILES = (50, 95, 99)
+REPORT_OUTAGE_PROBES = 3
+REPORT_IPINFO_WAIT = 30.0
+REPORT_HEATMAP_FLOOR = 90.0
+REPORT_HTML_HEATMAP_ROWS = 50
+BENCH_DIR = "bench"
+BENCH_NET = "10.201.0.0/16"
+BENCH_LINK = ("10.200.0.1", "10.200.0.2")
+BENCH_TCP_LISTENERS = 16
+BENCH_WARMUP = 1.0
+BENCH_MEMORY_SAMPLES = 50
+RENDER_FPS = 4
+HISTORY_SPAN = 15 * 60
+HISTORY_WINDOWS = ((60, "1m"), (5 * 60, "5m"), (15 * 60, "15m"))
+DNS_WORKERS = 32
+DNS_TTL = 300
+DNS_NEGATIVE_TTL = 30
+DNS_MIN_REFRESH = 30
+RESULT_LOG_DIR = "results"
+RESULT_LOG_SEGMENT_SIZE = 64 * 1024 * 1024
+RESULT_LOG_BATCH_BYTES = 64 * 1024
+RESULT_LOG_FSYNC_INTERVAL = 1.0
+METRICS_BUCKETS_MS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+METRICS_MAX_SERIES = 5000
+RUN_BATCH_LINES = 1000
+RUN_FLUSH_INTERVAL = 1.0
+IPINFO_CACHE_FILE = "ipinfo_cache.json"
+IPINFO_TTL = 7 * 24 * 3600
+IPINFO_NEGATIVE_TTL = 3600
+IPINFO_MAX_ENTRIES = 100000
+IPINFO_BATCH_SIZE = 100
+IPINFO_BATCH_DELAY = 0.05
+IPINFO_BATCH_PER_MINUTE = 15
 
 
 ping_mode: str = "Smart"
-saved_pings: List[dict] = []
+ip_info_db: str = ""
+metrics_port: int = 0
+tcp_source_ports: str = ""
+fleet_workers: int = 1
+adaptive_probing: bool = False
+adaptive_max_rate: float = ADAPTIVE_MAX_RATE
+result_log_enabled: bool = True
+profile_path: Optional[str] = None
+
+class TargetStore:
+    """Saved pings in SQLite, indexed by name, host and tag.
+
+    Every create, edit, delete or import is its own small transaction, so
+    nothing rewrites the whole list. Entries are plain dicts shaped like the
+    old config.json saved pings, plus "id" and "tags". "query" holds a
+    method's extra argument: the HTTP(S) path or the DNS name to look up.
+    """
+    COLUMNS = "id, name, host, method, port, interval, tags, query"
+
+    def __init__(self, path: str = TARGET_DB_FILE) -> None:
+        import sqlite3
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA foreign_keys=ON")
+        with self.db:
+            self.db.executescript("""
+                CREATE TABLE IF NOT EXISTS targets (
+                    id INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL COLLATE NOCASE,
+                    host TEXT NOT NULL COLLATE NOCASE,
+                    method TEXT NOT NULL,
+                    port INTEGER,
+                    interval REAL,
+                    tags TEXT NOT NULL DEFAULT ''
+                );
+                CREATE INDEX IF NOT EXISTS targets_name ON targets (name);
+                CREATE INDEX IF NOT EXISTS targets_host ON targets (host);
+                CREATE TABLE IF NOT EXISTS target_tags (
+                    tag TEXT NOT NULL COLLATE NOCASE,
+                    target_id INTEGER NOT NULL REFERENCES targets (id) ON DELETE CASCADE,
+                    PRIMARY KEY (tag, target_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS target_tags_target ON target_tags (target_id);
+            """)
+            if "query" not in {row[1] for row in self.db.execute("PRAGMA table_info(targets)")}:
+                self.db.execute("ALTER TABLE targets ADD COLUMN query TEXT")
+
+    @staticmethod
+    def _row(entry: dict) -> tuple:
+        tags = entry.get("tags") or []
+        if isinstance(tags, str):
+            tags = tags.split(",")
+        tags = sorted({tag.strip() for tag in tags if tag.strip()})
+        port = entry.get("port")
+        interval = entry.get("interval")
+        return (entry.get("name") or entry["host"], entry["host"], (entry.get("method") or "ICMP").upper(),
+                int(port) if port not in (None, "") else None,
+                float(interval) if interval not in (None, "") else None, ",".join(tags), entry.get("query") or None)
+
+    @staticmethod
+    def _entry(row: tuple) -> dict:
+        target_id, name, host, method, port, interval, tags, query = row
+        entry = {"id": target_id, "name": name, "host": host, "method": method, "tags": tags.split(",") if tags else []}
+        if port is not None:
+            entry["port"] = port
+        if interval is not None:
+            entry["interval"] = interval
+        if query is not None:
+            entry["query"] = query
+        return entry
+
+    def _write_tags(self, target_id: int, tags: str) -> None:
+        self.db.execute("DELETE FROM target_tags WHERE target_id = ?", (target_id,))
+        if tags:
+            self.db.executemany("INSERT INTO target_tags (tag, target_id) VALUES (?, ?)",
+                                [(tag, target_id) for tag in tags.split(",")])
+
+    def count(self, query: str = "") -> int:
+        """Number of entries matching a filter (see find)."""
+        where, params = self._where(query)
+        with self.lock:
+            return self.db.execute(f"SELECT COUNT(*) FROM targets{where}", params).fetchone()[0]
+
+    def all(self) -> List[dict]:
+        """Every entry, in insertion order."""
+        return self.find()
+
+    def find(self, query: str = "", limit: int = -1, offset: int = 0) -> List[dict]:
+        """Entries whose name or host starts with `query`, or that carry a tag for 'tag:<name>'."""
+        where, params = self._where(query)
+        with self.lock:
+            rows = self.db.execute(f"SELECT {self.COLUMNS} FROM targets{where} ORDER BY id LIMIT ? OFFSET ?",
+                                   (*params, limit, offset)).fetchall()
+        return [self._entry(row) for row in rows]
+
+    @staticmethod
+    def _where(query: str) -> Tuple[str, tuple]:
+        query = query.strip()
+        if not query:
+            return "", ()
+        if query.lower().startswith("tag:"):
+            return " WHERE id IN (SELECT target_id FROM target_tags WHERE tag = ?)", (query[4:].strip(),)
+        # Prefix LIKE on the NOCASE columns is answered from the name and host indexes.
+        pattern = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return " WHERE name LIKE ? ESCAPE '\\' OR host LIKE ? ESCAPE '\\'", (pattern, pattern)
+
+    def add(self, entry: dict) -> int:
+        """Saves a new entry and returns its id."""
+        return self.import_entries([entry])[0]
+
+    def update(self, target_id: int, entry: dict) -> None:
+        """Replaces the fields of an existing entry."""
+        row = self._row(entry)
+        with self.lock, self.db:
+            self.db.execute("UPDATE targets SET name = ?, host = ?, method = ?, port = ?, interval = ?, tags = ?, query = ? "
+                            "WHERE id = ?", (*row, target_id))
+            self._write_tags(target_id, row[5])
+
+    def delete(self, target_id: int) -> None:
+        """Removes an entry."""
+        with self.lock, self.db:
+            self.db.execute("DELETE FROM targets WHERE id = ?", (target_id,))
+
+    def import_entries(self, entries: List[dict]) -> List[int]:
+        """Saves many entries in one transaction and returns their ids."""
+        rows = [self._row(entry) for entry in entries]
+        with self.lock, self.db:
+            start = self.db.execute("SELECT COALESCE(MAX(id), 0) FROM targets").fetchone()[0] + 1
+            ids = list(range(start, start + len(rows)))
+            self.db.executemany(f"INSERT INTO targets ({self.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                [(target_id, *row) for target_id, row in zip(ids, rows)])
+            self.db.executemany("INSERT INTO target_tags (tag, target_id) VALUES (?, ?)",
+                                [(tag, target_id) for target_id, row in zip(ids, rows) if row[5]
+                                 for tag in row[5].split(",")])
+        return ids
+
+    def migrate(self, entries: List[dict]) -> int:
+        """Imports legacy config.json saved pings that are not in the store yet; returns how many."""
+        with self.lock:
+            existing = set(self.db.execute("SELECT name, host, method, port FROM targets"))
+        fresh = [entry for entry in entries if self._row(entry)[:4] not in existing]
+        if fresh:
+            self.import_entries(fresh)
+        return len(fresh)
+
+_target_store: Optional[TargetStore] = None
+
+def get_target_store() -> TargetStore:
+    """Returns the saved-ping store, opening it on first use."""
+    global _target_store
+    if _target_store is None:
+        _target_store = TargetStore()
+    return _target_store
 
 def load_settings() -> None:
-    """Loads the ping mode and saved pings from the config file."""
-    global ping_mode, saved_pings
+    """Loads the ping mode and other settings from the config file, moving legacy saved pings to the store."""
+    global ping_mode, ip_info_db, result_log_enabled, metrics_port, tcp_source_ports, fleet_workers
+    global adaptive_probing, adaptive_max_rate
     try:
         with open(CONFIG_FILE, 'r') as f:
             settings = json.load(f)
             ping_mode = settings.get("ping_mode", "Smart")
-            saved_pings = settings.get("saved_pings", [])
+            if settings.get("saved_pings"):
+                # Saved pings used to live in config.json; move them to the target store once.
+                get_target_store().migrate(settings["saved_pings"])
+            ip_info_db = settings.get("ip_info_db", "")
+            result_log_enabled = settings.get("result_log", True)
+            metrics_port = int(settings.get("metrics_port", 0))
+            tcp_source_ports = settings.get("tcp_source_ports", "")
+            fleet_workers = int(settings.get("fleet_workers", 1))
+            adaptive_probing = settings.get("adaptive_probing", False)
+            adaptive_max_rate = float(settings.get("adaptive_max_rate", ADAPTIVE_MAX_RATE))
     except (FileNotFoundError, json.JSONDecodeError):
         ping_mode = "Smart"
-        saved_pings = []
+        ip_info_db = ""
+        result_log_enabled = True
+        metrics_port = 0
+        tcp_source_ports = ""
+        fleet_workers = 1
+        adaptive_probing = False
+        adaptive_max_rate = ADAPTIVE_MAX_RATE
     save_settings()
 
 def save_settings() -> None:
-    """Saves the current ping mode and saved pings to the config file."""
-    settings = {"ping_mode": ping_mode, "saved_pings": saved_pings}
+    """Saves the current settings to the config file (saved pings live in the target store)."""
+    settings = {"ping_mode": ping_mode, "result_log": result_log_enabled, "adaptive_probing": adaptive_probing}
+    if ip_info_db:
+        settings["ip_info_db"] = ip_info_db
+    if metrics_port:
+        settings["metrics_port"] = metrics_port
+    if tcp_source_ports:
+        settings["tcp_source_ports"] = tcp_source_ports
+    if fleet_workers != 1:
+        settings["fleet_workers"] = fleet_workers
+    if adaptive_max_rate != ADAPTIVE_MAX_RATE:
+        settings["adaptive_max_rate"] = adaptive_max_rate
     with open(CONFIG_FILE, 'w') as f:
         json.dump(settings, f, indent=4)
 
 warnings.filterwarnings("ignore", category=SyntaxWarning)
-load_settings()
-os.system(f"title SryPing - {VERSION} by shellXploit")
 
 def get_title_panel() -> Panel:
     """Returns the application title as a rich Panel."""
@@ -97,12 +431,16 @@ def show_menu() -> None:
 
 def show_settings() -> None:
     """Displays the settings menu and allows mode changes."""
-    global ping_mode
+    global ping_mode, result_log_enabled, adaptive_probing
     while True:
         console.clear()
         settings_text = Text.from_markup(
-            f"Current Ping Mode: [bold green]{ping_mode}[/bold green]\n\n"
-            "  [yellow]1)[/yellow] Toggle Mode (Smart/Extended)\n\n"
+            f"Current Ping Mode: [bold green]{ping_mode}[/bold green]\n"
+            f"Result Log: [bold green]{'On' if result_log_enabled else 'Off'}[/bold green] ([dim]{RESULT_LOG_DIR}/[/dim])\n"
+            f"Adaptive Probing: [bold green]{'On' if adaptive_probing else 'Off'}[/bold green]\n\n"
+            "  [yellow]1)[/yellow] Toggle Mode (Smart/Extended)\n"
+            "  [yellow]2)[/yellow] Toggle Result Log (On/Off)\n"
+            "  [yellow]3)[/yellow] Toggle Adaptive Probing (On/Off)\n\n"
             "  [yellow]b)[/yellow] Back to Main Menu\n"
         )
         console.print(Panel(settings_text, title="Settings", border_style="cyan"))
@@ -112,35 +450,94 @@ def show_settings() -> None:
         if choice == '1':
             ping_mode = "Extended" if ping_mode == "Smart" else "Smart"
             save_settings()
+        elif choice == '2':
+            result_log_enabled = not result_log_enabled
+            save_settings()
+        elif choice == '3':
+            adaptive_probing = not adaptive_probing
+            save_settings()
         elif choice == 'b':
             break
 
+def saved_pings_table(entries: List[dict], first_number: int) -> Table:
+    """Builds the numbered table of one page of saved pings."""
+    table = Table(show_header=True, header_style="bold green")
+    table.add_column("#", style="dim")
+    table.add_column("Name")
+    table.add_column("Host")
+    table.add_column("Method")
+    table.add_column("Port", justify="right")
+    table.add_column("Tags")
+
+    for i, p in enumerate(entries):
+        plugin = get_probe(p["method"])
+        port = p.get("port") or (plugin.default_port if plugin else None)
+        port_display = str(port) if port else "N/A"
+        table.add_row(str(first_number + i), p["name"], p["host"], p["method"], port_display, ", ".join(p["tags"]))
+    return table
+
+def choose_saved_ping(title: str, action: str) -> Optional[dict]:
+    """Pages through the saved pings with an optional filter and returns the one picked, or None."""
+    store = get_target_store()
+    query = ""
+    offset = 0
+    while True:
+        console.clear()
+        console.print(Panel(Text(f"Select a saved ping to {action}.", justify="center"), title=title, border_style="cyan"))
+        total = store.count(query)
+        offset = min(offset, max((total - 1) // TARGET_PAGE_SIZE * TARGET_PAGE_SIZE, 0))
+        entries = store.find(query, TARGET_PAGE_SIZE, offset)
+        if entries:
+            console.print(saved_pings_table(entries, offset + 1))
+            console.print(f"[dim]Showing {offset + 1}-{offset + len(entries)} of {total}"
+                          + (f" matching '{query}'" if query else "") + "[/dim]")
+        else:
+            console.print("\n[italic yellow]No saved pings match.[/italic yellow]\n" if query else
+                          "\n[italic yellow]No saved pings yet. Create one from the 'Saved Pings' menu.[/italic yellow]\n")
+
+        choice = console.input(f"\n[bold yellow]Enter the number of the ping to {action}, /text or /tag:name to filter, "
+                               "n/p for next/previous page (or 'b' to go back): [/bold yellow]").strip()
+        if choice.lower() in ("", "b"):
+            return None
+        elif choice.startswith("/"):
+            query = choice[1:]
+            offset = 0
+        elif choice.lower() == "n":
+            if offset + TARGET_PAGE_SIZE < total:
+                offset += TARGET_PAGE_SIZE
+        elif choice.lower() == "p":
+            offset = max(offset - TARGET_PAGE_SIZE, 0)
+        else:
+            try:
+                number = int(choice)
+                picked = store.find(query, 1, number - 1) if number > 0 else []
+            except ValueError:
+                picked = []
+            if picked:
+                return picked[0]
+            console.print("[bold red]Invalid selection.[/bold red]")
+            time.sleep(1)
+
 def manage_saved_pings() -> None:
     """Manages saved ping configurations."""
-    global saved_pings
+    store = get_target_store()
     while True:
         console.clear()
         console.print(Panel(Text("Manage your saved ping configurations.", justify="center"), title="Saved Pings", border_style="cyan"))
 
-        if not saved_pings:
+        total = store.count()
+        if not total:
             console.print("\n[italic yellow]No saved pings yet.[/italic yellow]\n")
         else:
-            saved_pings_table = Table(show_header=True, header_style="bold green")
-            saved_pings_table.add_column("#", style="dim")
-            saved_pings_table.add_column("Name")
-            saved_pings_table.add_column("Host")
-            saved_pings_table.add_column("Method")
-            saved_pings_table.add_column("Port", justify="right")
-
-            for i, p in enumerate(saved_pings):
-                port_display = str(p.get("port", "N/A")) if p["method"] == "TCP" else "N/A"
-                saved_pings_table.add_row(str(i + 1), p["name"], p["host"], p["method"], port_display)
-            console.print(saved_pings_table)
+            console.print(saved_pings_table(store.find(limit=TARGET_PAGE_SIZE), 1))
+            if total > TARGET_PAGE_SIZE:
+                console.print(f"[dim]Showing 1-{TARGET_PAGE_SIZE} of {total}[/dim]")
 
         menu_text = Text.from_markup(
             "\n  [yellow]1)[/yellow] Create New Saved Ping\n"
             "  [yellow]2)[/yellow] Edit Saved Ping\n"
             "  [yellow]3)[/yellow] Delete Saved Ping\n"
+            "  [yellow]4)[/yellow] Import From File (CSV/JSON/JSONL)\n"
             "  [yellow]b)[/yellow] Back to Main Menu\n"
         )
         console.print(Panel(menu_text, title="Options", border_style="magenta"))
@@ -150,49 +547,55 @@ def manage_saved_pings() -> None:
         if choice == '1':
             create_new_saved_ping()
         elif choice == '2':
-            if not saved_pings:
+            if not total:
                 console.print("[bold red]No saved pings to edit.[/bold red]")
                 time.sleep(1)
                 continue
-            console.print("\n[bold yellow]Enter the number of the ping to edit:[/bold yellow]", end="")
-            try:
-                ping_index = int(getch()) - 1
-                if 0 <= ping_index < len(saved_pings):
-                    edit_saved_ping(ping_index)
-                else:
-                    console.print("\n[bold red]Invalid number.[/bold red]", end="")
-                    time.sleep(1)
-            except ValueError:
-                console.print("\n[bold red]Invalid input. Please enter a number.[/bold red]", end="")
-                time.sleep(1)
+            ping_to_edit = choose_saved_ping("Edit Saved Ping", "edit")
+            if ping_to_edit:
+                edit_saved_ping(ping_to_edit)
         elif choice == '3':
-            if not saved_pings:
+            if not total:
                 console.print("[bold red]No saved pings to delete.[/bold red]")
                 time.sleep(1)
                 continue
-            console.print("\n[bold yellow]Enter the number of the ping to delete:[/bold yellow]", end="")
-            try:
-                ping_index = int(getch()) - 1
-                if 0 <= ping_index < len(saved_pings):
-                    del saved_pings[ping_index]
-                    save_settings()
-                    console.print("\n[bold green]Ping deleted successfully![/bold green]")
-                    time.sleep(1)
-                else:
-                    console.print("\n[bold red]Invalid number.[/bold red]", end="")
-                    time.sleep(1)
-            except ValueError:
-                console.print("\n[bold red]Invalid input. Please enter a number.[/bold red]", end="")
+            ping_to_delete = choose_saved_ping("Delete Saved Ping", "delete")
+            if ping_to_delete:
+                store.delete(ping_to_delete["id"])
+                console.print("\n[bold green]Ping deleted successfully![/bold green]")
                 time.sleep(1)
+        elif choice == '4':
+            import_saved_pings()
         elif choice == 'b':
             break
         else:
             console.print("[bold red]Invalid choice. Please try again.[/bold red]")
             time.sleep(1)
 
+def import_saved_pings() -> None:
+    """Prompts for a targets file and bulk-imports it into the saved pings."""
+    console.clear()
+    console.print(Panel(Text("Import Saved Pings", justify="center"), title="Import", border_style="green"))
+    path = console.input("[bold yellow]Enter the path of the file to import: [/bold yellow]").strip()
+    if not path:
+        return
+    tags = console.input("[bold yellow]Tags to add to every imported ping (comma-separated, optional): [/bold yellow]").strip()
+    try:
+        count = import_targets_file(path, tags)
+    except (OSError, ValueError, KeyError) as e:
+        console.print(f"[bold red]Error: Could not import '{path}': {e}[/bold red]")
+        time.sleep(2)
+        return
+    console.print(f"[bold green]Imported {count} saved pings.[/bold green]")
+    time.sleep(1)
+
+def method_menu(methods: List[str]) -> str:
+    """'1 for ICMP, 2 for TCP, ...' for the method prompts."""
+    return ", ".join(f"{number} for {method}" for number, method in enumerate(methods, 1))
+
 def create_new_saved_ping() -> None:
+
     """Prompts user for details to create a new saved ping."""
-    global saved_pings
     console.clear()
     console.print(Panel(Text("Create New Saved Ping", justify="center"), title="New Ping", border_style="green"))
 
@@ -208,41 +611,47 @@ def create_new_saved_ping() -> None:
         time.sleep(1)
         return
 
-    method_choice = console.input("[bold yellow]Select method (1 for ICMP, 2 for TCP): [/bold yellow]").strip()
-    method = ""
+    methods = probe_methods()
+    method_choice = console.input(f"[bold yellow]Select method ({method_menu(methods)}): [/bold yellow]").strip()
     port = None
+    query = ""
 
-    if method_choice == '1':
-        method = "ICMP"
-    elif method_choice == '2':
-        method = "TCP"
-        port_str = console.input("[bold yellow]Enter the port number (e.g., 80, 443): [/bold yellow]").strip()
-        try:
-            port = int(port_str)
-            if not 0 < port < 65536:
-                raise ValueError("Port out of range.")
-        except ValueError:
-            console.print(f"[bold red]Error: Invalid port number. Ping not saved.[/bold red]")
-            time.sleep(2)
-            return
+    if method_choice.isdigit() and 0 < int(method_choice) <= len(methods):
+        method = methods[int(method_choice) - 1]
+        plugin = get_probe(method)
+        if plugin.needs_port or plugin.default_port:
+            hint = "e.g., 80, 443" if plugin.needs_port else f"blank for {plugin.default_port}"
+            port_str = console.input(f"[bold yellow]Enter the port number ({hint}): [/bold yellow]").strip()
+            if port_str or plugin.needs_port:
+                try:
+                    port = int(port_str)
+                    if not 0 < port < 65536:
+                        raise ValueError("Port out of range.")
+                except ValueError:
+                    console.print(f"[bold red]Error: Invalid port number. Ping not saved.[/bold red]")
+                    time.sleep(2)
+                    return
+        if plugin.query_prompt:
+            query = console.input(f"[bold yellow]Enter the {plugin.query_prompt}: [/bold yellow]").strip()
     else:
         console.print("[bold red]Invalid method choice. Ping not saved.[/bold red]")
         time.sleep(1)
         return
 
-    new_ping = {"name": name, "host": host, "method": method}
+    tags = console.input("[bold yellow]Enter tags (comma-separated, optional): [/bold yellow]").strip()
+
+    new_ping = {"name": name, "host": host, "method": method, "tags": tags}
     if port:
         new_ping["port"] = port
+    if query:
+        new_ping["query"] = query
 
-    saved_pings.append(new_ping)
-    save_settings()
+    get_target_store().add(new_ping)
     console.print("[bold green]Ping saved successfully![/bold green]")
     time.sleep(1)
 
-def edit_saved_ping(index: int) -> None:
+def edit_saved_ping(ping_to_edit: dict) -> None:
     """Prompts user to edit an existing saved ping."""
-    global saved_pings
-    ping_to_edit = saved_pings[index]
     console.clear()
     console.print(Panel(Text(f"Editing: {ping_to_edit['name']}", justify="center"), title="Edit Ping", border_style="yellow"))
 
@@ -256,292 +665,4461 @@ def edit_saved_ping(index: int) -> None:
 
 
     console.print(f"[bold yellow]Current method: {ping_to_edit['method']}[/bold yellow]")
-    method_choice = console.input("[bold yellow]Change method? (1 for ICMP, 2 for TCP, leave blank to keep current): [/bold yellow]").strip()
-
-    if method_choice == '1':
-        ping_to_edit['method'] = "ICMP"
-        ping_to_edit.pop('port', None)
-    elif method_choice == '2':
-        ping_to_edit['method'] = "TCP"
-        current_port = ping_to_edit.get('port', 'N/A')
-        port_str = console.input(f"[bold yellow]Enter new port (current: {current_port}): [/bold yellow]").strip()
-        if port_str:
-            try:
-                new_port = int(port_str)
-                if not 0 < new_port < 65536:
-                    raise ValueError("Port out of range.")
-                ping_to_edit['port'] = new_port
-            except ValueError:
-                console.print(f"[bold red]Error: Invalid port number. Port not updated.[/bold red]")
-                time.sleep(2)
+    methods = probe_methods()
+    method_choice = console.input(f"[bold yellow]Change method? ({method_menu(methods)}, leave blank to keep current): [/bold yellow]").strip()
+
+    if method_choice.isdigit() and 0 < int(method_choice) <= len(methods):
+        ping_to_edit['method'] = methods[int(method_choice) - 1]
+        plugin = get_probe(ping_to_edit['method'])
+        if not plugin.needs_port and not plugin.default_port:
+            ping_to_edit.pop('port', None)
+        else:
+            current_port = ping_to_edit.get('port', plugin.default_port or 'N/A')
+            port_str = console.input(f"[bold yellow]Enter new port (current: {current_port}): [/bold yellow]").strip()
+            if port_str:
+                try:
+                    new_port = int(port_str)
+                    if not 0 < new_port < 65536:
+                        raise ValueError("Port out of range.")
+                    ping_to_edit['port'] = new_port
+                except ValueError:
+                    console.print(f"[bold red]Error: Invalid port number. Port not updated.[/bold red]")
+                    time.sleep(2)
+        if plugin.query_prompt:
+            query = console.input(f"[bold yellow]Enter the {plugin.query_prompt} "
+                                  f"(current: {ping_to_edit.get('query') or 'default'}): [/bold yellow]").strip()
+            if query:
+                ping_to_edit['query'] = query
+        else:
+            ping_to_edit.pop('query', None)
     elif method_choice != '':
         console.print("[bold red]Invalid method choice. Method not updated.[/bold red]")
         time.sleep(1)
 
-    save_settings()
+    new_tags = console.input(f"[bold yellow]Enter new tags (current: {', '.join(ping_to_edit['tags']) or 'none'}, '-' to clear): [/bold yellow]").strip()
+    if new_tags:
+        ping_to_edit['tags'] = "" if new_tags == "-" else new_tags
+
+    get_target_store().update(ping_to_edit['id'], ping_to_edit)
     console.print("[bold green]Ping updated successfully![/bold green]")
     time.sleep(1)
 
+class PrefixIndex:
+    """Longest-prefix-match index over an offline ASN/Org database (CSV or mmdb)."""
+
+    def __init__(self, path: str) -> None:
+        self.reader = None
+        self.tables: dict = {}
+        if path.endswith(".mmdb"):
+            import maxminddb
+            self.reader = maxminddb.open_database(path)
+            return
+        import csv
+        import ipaddress
+        with open(path, newline='') as f:
+            for row in csv.reader(f):
+                if not row or row[0].startswith("#"):
+                    continue
+                try:
+                    network = ipaddress.ip_network(row[0].strip(), strict=False)
+                except ValueError:
+                    continue
+                asn = row[1].strip() if len(row) > 1 else "N/A"
+                org = row[2].strip() if len(row) > 2 else "N/A"
+                table = self.tables.setdefault((network.version, network.prefixlen), {})
+                table[int(network.network_address)] = {"asn": asn, "org": org}
+        self.lengths = sorted(self.tables, key=lambda key: -key[1])
+
+    def lookup(self, ip_address: str) -> Optional[dict]:
+        """Returns the info of the most specific network containing the address."""
+        if self.reader:
+            record = self.reader.get(ip_address)
+            if not record:
+                return None
+            number = record.get("autonomous_system_number") or record.get("asn")
+            org = record.get("autonomous_system_organization") or record.get("as_name") or record.get("name") or "N/A"
+            asn = str(number) if number else "N/A"
+            if asn != "N/A" and not asn.startswith("AS"):
+                asn = f"AS{asn}"
+            return {"asn": f"{asn} {org}" if asn != "N/A" else asn, "org": org}
+        import ipaddress
+        address = ipaddress.ip_address(ip_address)
+        value, bits = int(address), address.max_prefixlen
+        for version, length in self.lengths:
+            if version != address.version:
+                continue
+            network = value >> (bits - length) << (bits - length)
+            info = self.tables[(version, length)].get(network)
+            if info:
+                return info
+        return None
+
+class IpInfoCache:
+    """Cached, rate-limited ASN/Org lookups, batched against ip-api.com in a background thread.
+
+    Results persist to disk with a TTL and LRU eviction. Concurrent requests
+    for the same IP are coalesced into one lookup.
+    """
+
+    def __init__(self, path: str = IPINFO_CACHE_FILE, offline_db: str = "", ttl: float = IPINFO_TTL,
+                 max_entries: int = IPINFO_MAX_ENTRIES) -> None:
+        from collections import OrderedDict
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, dict]" = OrderedDict()
+        self.waiting: dict = {}
+        self.lock = threading.Lock()
+        self.queue: List[str] = []
+        self.wakeup = threading.Event()
+        self.next_request = 0.0
+        self.dirty = False
+        self.last_error: Optional[Exception] = None
+        self.offline: Optional[PrefixIndex] = None
+        if offline_db:
+            try:
+                self.offline = PrefixIndex(offline_db)
+            except (OSError, ImportError, ValueError) as e:
+                log_error(f"Could not load offline ASN database '{offline_db}': {e}")
+        try:
+            with open(path, 'r') as f:
+                now = time.time()
+                for ip_address, entry in json.load(f).items():
+                    if entry.get("expires", 0) > now:
+                        self.entries[ip_address] = entry
+        except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+            pass
+        self.thread = threading.Thread(target=self._worker, name="ipinfo-lookup", daemon=True)
+        self.thread.start()
+
+    def peek(self, ip_address: str) -> Optional[dict]:
+        """Returns cached info without triggering a lookup."""
+        with self.lock:
+            entry = self.entries.get(ip_address)
+            if entry and entry["expires"] > time.time():
+                self.entries.move_to_end(ip_address)
+                return {"asn": entry["asn"], "org": entry["org"]}
+        return None
+
+    def lookup_async(self, ip_address: str, callback: Optional[callable] = None) -> None:
+        """Resolves info in the background; callback receives the info dict."""
+        info = self.peek(ip_address)
+        if info is None and self.offline:
+            info = self.offline.lookup(ip_address) or {"asn": "N/A", "org": "N/A"}
+            self._store(ip_address, info)
+        if info is not None:
+            if callback:
+                callback(info)
+            return
+        with self.lock:
+            callbacks = self.waiting.get(ip_address)
+            if callbacks is not None:
+                if callback:
+                    callbacks.append(callback)
+                return
+            self.waiting[ip_address] = [callback] if callback else []
+            self.queue.append(ip_address)
+        self.wakeup.set()
+
+    def lookup(self, ip_address: str, timeout: float = 10.0) -> dict:
+        """Returns info for one IP, waiting for the background lookup if needed."""
+        done = threading.Event()
+        result: list = []
+        def on_info(info: dict) -> None:
+            result.append(info)
+            done.set()
+        self.lookup_async(ip_address, on_info)
+        done.wait(timeout)
+        return result[0] if result else {"asn": "N/A", "org": "N/A"}
+
+    def _store(self, ip_address: str, info: dict, ttl: Optional[float] = None) -> None:
+        """Caches one result and evicts the least recently used entries."""
+        with self.lock:
+            self.entries[ip_address] = {"asn": info["asn"], "org": info["org"],
+                                        "expires": time.time() + (ttl or self.ttl)}
+            self.entries.move_to_end(ip_address)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self.dirty = True
+
+    def _worker(self) -> None:
+        """Sends queued IPs to the batch endpoint, respecting the provider's rate limit."""
+        while True:
+            self.wakeup.wait()
+            time.sleep(max(self.next_request - time.time(), IPINFO_BATCH_DELAY))
+            with self.lock:
+                batch, self.queue = self.queue[:IPINFO_BATCH_SIZE], self.queue[IPINFO_BATCH_SIZE:]
+                if not self.queue:
+                    self.wakeup.clear()
+            if not batch:
+                continue
+            fetch_start = time.perf_counter()
+            results = self._fetch(batch)
+            if _self_stats:
+                _self_stats.observe("ipinfo", (time.perf_counter() - fetch_start) * 1000)
+            for ip_address in batch:
+                info = results.get(ip_address) if results is not None else None
+                if info:
+                    self._store(ip_address, info)
+                else:
+                    info = {"asn": "N/A", "org": "N/A"}
+                    if results is not None:
+                        # The provider answered but had nothing (e.g. private ranges).
+                        self._store(ip_address, info, IPINFO_NEGATIVE_TTL)
+                with self.lock:
+                    callbacks = self.waiting.pop(ip_address, [])
+                for callback in callbacks:
+                    callback(info)
+            self.save()
+
+    def _fetch(self, batch: List[str]) -> Optional[dict]:
+        """Looks up a batch of IPs with one request to ip-api.com; None if the request failed."""
+        import requests
+        results = {}
+        self.next_request = time.time() + 60 / IPINFO_BATCH_PER_MINUTE
+        try:
+            response = requests.post("http://ip-api.com/batch?fields=status,query,org,as",
+                                      json=batch, timeout=10)
+            remaining = response.headers.get("X-Rl")
+            reset = response.headers.get("X-Ttl")
+            if remaining == "0" and reset:
+                self.next_request = time.time() + int(reset)
+            response.raise_for_status()
+            for data in response.json():
+                if data.get("status") == "success":
+                    results[data["query"]] = {"asn": data.get("as") or "N/A", "org": data.get("org") or "N/A"}
+        except Exception as e:
+            self.last_error = e
+            return None
+        return results
+
+    def save(self) -> None:
+        """Writes the cache to disk if it changed."""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = dict(self.entries)
+            self.dirty = False
+        try:
+            with open(self.path + ".tmp", 'w') as f:
+                json.dump(data, f)
+            os.replace(self.path + ".tmp", self.path)
+        except OSError:
+            pass
+
+_ip_info_cache: Optional[IpInfoCache] = None
+
+def get_ip_info_cache() -> IpInfoCache:
+    """Returns the process-wide IP info cache, creating it on first use."""
+    global _ip_info_cache
+    if _ip_info_cache is None:
+        _ip_info_cache = IpInfoCache(offline_db=ip_info_db)
+    return _ip_info_cache
+
 def get_ip_info(ip_address: str) -> dict:
-    """Retrieves IP and ASN information from an API."""
-    info = {"asn": "N/A", "org": "N/A"}
-    try:
-        response = requests.get(f"http://ip-api.com/json/{ip_address}?fields=org,as")
-        response.raise_for_status()
-        data = response.json()
-        info["asn"] = data.get("as", "N/A")
-        info["org"] = data.get("org", "N/A")
-    except Exception as e:
-        console.print(f"\n[bold red]Could not retrieve ASN/Org info: {e}[/bold red]")
+    """Retrieves IP and ASN information, from the cache when possible."""
+    cache = get_ip_info_cache()
+    cache.last_error = None
+    info = cache.lookup(ip_address)
+    if cache.last_error:
+        log_error(f"\nCould not retrieve ASN/Org info: {cache.last_error}")
     return info
 
-def _start_ping_session(host: str, ip_address: str, method: str, ping_function: callable) -> None:
-    """Handles the generic pinging process, UI, and statistics."""
-    with console.status("[bold green]Retrieving host information...[/bold green]"):
-        ip_info = get_ip_info(ip_address)
-
-    info_table = Table(show_header=False, box=None, padding=(0, 1))
-    info_table.add_column()
-    info_table.add_column()
-    info_table.add_row("[bold white]Host:[/bold white]", host, "[bold white]IP:[/bold white]", ip_address)
-    info_table.add_row("[bold white]ASN:[/bold white]", ip_info['asn'], "[bold white]Organization:[/bold white]", ip_info['org'])
-    info_table.add_row("[bold white]Method:[/bold white]", method, "[bold white]Mode:[/bold white]", f"[bold]{ping_mode}[/bold]")
+class Resolver:
+    """Concurrent host resolver with a TTL-respecting cache, negative caching and re-resolution.
 
-    console.clear()
-    console.print(Panel(info_table, title="Ping Information", border_style="green"))
-    console.print("\n[cyan]Pinging... Press any key to stop.[/cyan]")
+    Lookups run on a thread pool over getaddrinfo. When dnspython is installed
+    the record TTL is honoured; otherwise DNS_TTL is used. IPv4 answers are
+    preferred, falling back to IPv6 (AAAA) when a host has no A record.
+    """
 
-    latencies: List[float] = []
-    pings_sent = 0
-    pings_failed = 0
-    extended_ping_count = 0
+    def __init__(self, workers: int = DNS_WORKERS, ttl: float = DNS_TTL, negative_ttl: float = DNS_NEGATIVE_TTL) -> None:
+        from concurrent.futures import ThreadPoolExecutor
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="resolver")
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.cache: dict = {}
+        self.in_flight: dict = {}
+        self.lock = threading.RLock()
+        self.watches: dict = {}
+        self.watch_heap: List[tuple] = []
+        self.watch_ids = 0
+        self.watch_wakeup = threading.Condition(self.lock)
+        self.watch_thread: Optional[threading.Thread] = None
+        try:
+            import dns.resolver
+            self.dns = dns.resolver
+        except ImportError:
+            self.dns = None
 
-    def generate_output() -> Panel:
-        """Generates the rich Panel for live display."""
-        stats_table = Table(show_header=True, header_style="bold magenta", box=None)
-        stats_table.add_column("Statistic", justify="right")
-        stats_table.add_column("Value", justify="left")
-        stats_table.add_row("Sent", str(pings_sent))
-        stats_table.add_row("Failed", f"{pings_failed} ([red]{(pings_failed/pings_sent*100):.1f}%[/red])" if pings_sent > 0 else "0")
-        if latencies:
-            stats_table.add_row("Latency (ms)", "")
-            stats_table.add_row("  └─ Current", f"{latencies[-1]:.2f}")
-            stats_table.add_row("  └─ Min", f"{min(latencies):.2f}")
-            stats_table.add_row("  └─ Max", f"{max(latencies):.2f}")
-            stats_table.add_row("  └─ Avg", f"{(sum(latencies)/len(latencies)):.2f}")
-        return Panel(stats_table, title="Live Statistics", border_style="yellow", expand=False)
+    def _lookup(self, host: str) -> Tuple[str, float]:
+        """Resolves a host uncached, returning (ip_address, ttl)."""
+        try:
+            socket.inet_pton(address_family(host), host)
+            return host, math.inf
+        except OSError:
+            pass
+        if self.dns:
+            for record_type in ("A", "AAAA"):
+                try:
+                    answer = self.dns.resolve(host, record_type)
+                    return answer[0].to_text(), max(answer.rrset.ttl, 1)
+                except (self.dns.NoAnswer, self.dns.NXDOMAIN, self.dns.NoNameservers, self.dns.LifetimeTimeout):
+                    continue
+        infos = socket.getaddrinfo(host, None, socket.AF_UNSPEC, socket.SOCK_STREAM)
+        infos.sort(key=lambda info: info[0] != socket.AF_INET)
+        return infos[0][4][0], self.ttl
 
-    with Live(generate_output(), console=console, screen=False, refresh_per_second=4, vertical_overflow="visible") as live:
+    def _resolve_now(self, host: str) -> str:
+        """Resolves a host, caching both answers and failures."""
         try:
-            while True:
-                pings_sent += 1
-                latency, success, message = ping_function()
+            ip_address, ttl = self._lookup(host)
+        except (socket.gaierror, OSError) as e:
+            error = e if isinstance(e, socket.gaierror) else socket.gaierror(str(e))
+            with self.lock:
+                self.cache[host] = (None, error, time.monotonic() + self.negative_ttl)
+            raise error
+        with self.lock:
+            self.cache[host] = (ip_address, None, time.monotonic() + ttl)
+        return ip_address
 
-                if success:
-                    latencies.append(latency)
+    def resolve_async(self, host: str) -> "Future":
+        """Returns a Future for the host's address; concurrent calls share one lookup."""
+        from concurrent.futures import Future
+        with self.lock:
+            cached = self.cache.get(host)
+            if cached and cached[2] > time.monotonic():
+                future = Future()
+                if cached[1]:
+                    future.set_exception(cached[1])
                 else:
-                    pings_failed += 1
+                    future.set_result(cached[0])
+                return future
+            future = self.in_flight.get(host)
+            if future is None:
+                future = self.pool.submit(self._resolve_now, host)
+                self.in_flight[host] = future
+                future.add_done_callback(lambda _: self._forget(host, future))
+            return future
 
-                if ping_mode == "Extended":
-                    console.print(message)
-                    extended_ping_count += 1
-                    if extended_ping_count > 10:
-                        console.clear()
-                        console.print(Panel(info_table, title="Ping Information", border_style="green"))
-                        console.print("\n[cyan]Pinging... Press any key to stop.[/cyan]")
-                        extended_ping_count = 1
+    def _forget(self, host: str, future: "Future") -> None:
+        with self.lock:
+            if self.in_flight.get(host) is future:
+                del self.in_flight[host]
 
-                live.update(generate_output())
+    def resolve(self, host: str) -> str:
+        """Returns the host's address, raising socket.gaierror when it cannot be resolved."""
+        return self.resolve_async(host).result()
 
-                if 'msvcrt' in sys.modules:
-                    if msvcrt.kbhit():
-                        break
-                elif sys.stdin in select.select([sys.stdin], [], [], 0)[0]:
-                    break
-                time.sleep(1)
-        except Exception as e:
-            console.print(f"\n[bold red]Error during ping: {e}[/bold red]")
+    def resolve_many(self, hosts: List[str]) -> dict:
+        """Resolves many hosts concurrently; unresolvable hosts map to None."""
+        futures = {host: self.resolve_async(host) for host in set(hosts)}
+        results = {}
+        for host, future in futures.items():
+            try:
+                results[host] = future.result()
+            except (socket.gaierror, OSError):
+                results[host] = None
+        return results
 
+    def watch(self, host: str, callback: callable, interval: Optional[float] = None) -> int:
+        """Re-resolves a host periodically and calls callback(host, old_ip, new_ip) when its address changes."""
+        import heapq
+        with self.lock:
+            self.watch_ids += 1
+            cached = self.cache.get(host)
+            current = cached[0] if cached else None
+            self.watches[self.watch_ids] = [host, callback, interval, current]
+            heapq.heappush(self.watch_heap, (self._next_check(host, interval), self.watch_ids))
+            if self.watch_thread is None:
+                self.watch_thread = threading.Thread(target=self._watch_loop, name="resolver-watch", daemon=True)
+                self.watch_thread.start()
+            self.watch_wakeup.notify()
+            return self.watch_ids
 
-def start_icmp_ping() -> None:
-    """Handles the ICMP pinging process."""
-    console.clear()
-    host = console.input("[bold yellow]Enter the host to ping: [/bold yellow]")
+    def unwatch(self, watch_id: int) -> None:
+        """Stops re-resolving for a watch returned by watch()."""
+        with self.lock:
+            self.watches.pop(watch_id, None)
 
-    try:
-        ip_address = socket.gethostbyname(host)
-    except socket.gaierror as e:
-        console.print(f"[bold red]Error: Invalid hostname - {e}[/bold red]")
-        time.sleep(3)
-        return
-    except Exception as e:
-        console.print(f"[bold red]An unexpected error occurred: {e}[/bold red]")
-        time.sleep(3)
-        return
+    def _next_check(self, host: str, interval: Optional[float]) -> float:
+        """Returns when a watched host is due, honouring its cache expiry."""
+        if interval:
+            return time.monotonic() + interval
+        cached = self.cache.get(host)
+        expires = cached[2] if cached else time.monotonic() + self.ttl
+        return max(min(expires, time.monotonic() + 3600), time.monotonic() + DNS_MIN_REFRESH)
 
-    def icmp_ping_executor():
-        result = ping(host, timeout=1, count=1)
-        if result.success:
-            latency = result.rtt_avg_ms
-            message = f"[green]Ping successful, latency: {latency:.2f} ms[/green]"
-            return latency, True, message
-        else:
-            message = f"[red]Ping failed (Timeout)[/red]"
-            return -1, False, message
+    def _watch_loop(self) -> None:
+        """Re-resolves due hosts and reports address changes."""
+        import heapq
+        while True:
+            with self.lock:
+                while not self.watch_heap or self.watch_heap[0][0] > time.monotonic():
+                    wait = self.watch_heap[0][0] - time.monotonic() if self.watch_heap else None
+                    self.watch_wakeup.wait(wait)
+                _, watch_id = heapq.heappop(self.watch_heap)
+                watch = self.watches.get(watch_id)
+                if watch is None:
+                    continue
+                host, callback, interval, previous = watch
+                self.cache.pop(host, None)
+            try:
+                current = self.resolve(host)
+            except (socket.gaierror, OSError):
+                current = previous
+            with self.lock:
+                if watch_id not in self.watches:
+                    continue
+                watch[3] = current
+                heapq.heappush(self.watch_heap, (self._next_check(host, interval), watch_id))
+            if previous is not None and current != previous:
+                callback(host, previous, current)
 
-    _start_ping_session(host, ip_address, "ICMP Echo", icmp_ping_executor)
+_resolver: Optional[Resolver] = None
 
-def select_and_start_saved_ping() -> None:
-    """Displays saved pings and prompts user to start one."""
-    console.clear()
-    console.print(Panel(Text("Select a saved ping to start.", justify="center"), title="Start Saved Ping", border_style="cyan"))
+def get_resolver() -> Resolver:
+    """Returns the process-wide resolver, creating it on first use."""
+    global _resolver
+    if _resolver is None:
+        _resolver = Resolver()
+    return _resolver
 
-    if not saved_pings:
-        console.print("\n[italic yellow]No saved pings yet. Create one from the 'Saved Pings' menu.[/italic yellow]\n")
-        console.print("[cyan]Returning to menu in 3 seconds...[/cyan]")
-        time.sleep(3)
-        return
+def _icmp_checksum(data: bytes) -> int:
+    """Computes the RFC 1071 internet checksum of an ICMP packet."""
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
 
-    saved_pings_table = Table(show_header=True, header_style="bold green")
-    saved_pings_table.add_column("#", style="dim")
-    saved_pings_table.add_column("Name")
-    saved_pings_table.add_column("Host")
-    saved_pings_table.add_column("Method")
-    saved_pings_table.add_column("Port", justify="right")
+class LatencySketch:
+    """Mergeable log-bucket quantile sketch with bounded relative error (DDSketch style)."""
+    __slots__ = ("gamma", "log_gamma", "buckets", "zero_count", "count", "max_buckets")
 
-    for i, p in enumerate(saved_pings):
-        port_display = str(p.get("port", "N/A")) if p["method"] == "TCP" else "N/A"
-        saved_pings_table.add_row(str(i + 1), p["name"], p["host"], p["method"], port_display)
-    console.print(saved_pings_table)
+    MIN_VALUE = 0.001
 
-    console.print("\n[bold yellow]Enter the number of the ping to start (or 'b' to go back):[/bold yellow]", end="")
-    try:
-        choice = getch().lower()
-        if choice == 'b':
+    def __init__(self, relative_accuracy: float = 0.01, max_buckets: int = 2048) -> None:
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets: dict = {}
+        self.zero_count = 0
+        self.count = 0
+        self.max_buckets = max_buckets
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Adds a latency sample (in ms) to the sketch."""
+        self.count += count
+        if value <= self.MIN_VALUE:
+            self.zero_count += count
             return
-        ping_index = int(choice) - 1
-        if 0 <= ping_index < len(saved_pings):
-            start_saved_ping(saved_pings[ping_index])
-    except (ValueError, IndexError):
-        console.print("\n[bold red]Invalid selection.[/bold red]")
-        time.sleep(1)
+        index = math.ceil(math.log(value) / self.log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
 
-def start_saved_ping(ping_config: dict) -> None:
-    """Starts a ping session using a saved ping configuration."""
-    host = ping_config["host"]
-    method = ping_config["method"]
-    port = ping_config.get("port")
+    def _collapse(self) -> None:
+        """Folds the lowest buckets together so memory stays bounded."""
+        indexes = sorted(self.buckets)
+        excess = len(indexes) - self.max_buckets
+        target = indexes[excess]
+        for index in indexes[:excess]:
+            self.buckets[target] += self.buckets.pop(index)
 
-    try:
-        ip_address = socket.gethostbyname(host)
-    except socket.gaierror as e:
-        console.print(f"[bold red]Error: Invalid hostname for saved ping '{ping_config['name']}' - {e}[/bold red]")
-        time.sleep(3)
-        return
-    except Exception as e:
-        console.print(f"[bold red]An unexpected error occurred for saved ping '{ping_config['name']}': {e}[/bold red]")
-        time.sleep(3)
-        return
+    def quantile(self, q: float) -> Optional[float]:
+        """Returns the estimated q-quantile (0 <= q <= 1), or None if the sketch is empty."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen > rank:
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
 
-    if method == "ICMP":
-        def icmp_ping_executor():
-            result = ping(host, timeout=1, count=1)
-            if result.success:
-                latency = result.rtt_avg_ms
-                message = f"[green]Ping successful, latency: {latency:.2f} ms[/green]"
-                return latency, True, message
-            else:
-                message = f"[red]Ping failed (Timeout)[/red]"
-                return -1, False, message
-        _start_ping_session(host, ip_address, "ICMP Echo", icmp_ping_executor)
-    elif method == "TCP":
-        if port is None:
-            console.print(f"[bold red]Error: TCP ping '{ping_config['name']}' is missing a port number.[/bold red]")
-            time.sleep(3)
+    def merge(self, other: "LatencySketch") -> None:
+        """Adds another sketch with the same accuracy into this one."""
+        self.count += other.count
+        self.zero_count += other.zero_count
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+class RingBuffer:
+    """Fixed-capacity probe history backed by flat arrays (timestamps, RTTs, success bitmap)."""
+    __slots__ = ("capacity", "timestamps", "rtts", "success", "position")
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = capacity
+        self.timestamps = array('d', [-math.inf]) * capacity
+        self.rtts = array('d', [0.0]) * capacity
+        self.success = bytearray((capacity + 7) // 8)
+        self.position = 0
+
+    @classmethod
+    def for_interval(cls, interval: float, span: float = HISTORY_SPAN) -> "RingBuffer":
+        """Sizes a buffer to hold `span` seconds of probes taken every `interval` seconds."""
+        return cls(max(int(math.ceil(span / max(interval, 0.01))), 1))
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by the sample storage, independent of how many samples were added."""
+        return (self.timestamps.itemsize + self.rtts.itemsize) * self.capacity + len(self.success)
+
+    def add(self, timestamp: float, latency: float, success: bool) -> None:
+        """Stores one probe result, overwriting the oldest once full."""
+        i = self.position
+        self.timestamps[i] = timestamp
+        self.rtts[i] = latency
+        if success:
+            self.success[i >> 3] |= 1 << (i & 7)
+        else:
+            self.success[i >> 3] &= ~(1 << (i & 7)) & 0xFF
+        self.position = (i + 1) % self.capacity
+
+    def window(self, seconds: float, now: Optional[float] = None) -> Optional[dict]:
+        """Returns min/avg/max latency and loss over the last `seconds`, or None if empty."""
+        cutoff = (time.time() if now is None else now) - seconds
+        if _load_numpy() is not None:
+            in_window = np.frombuffer(self.timestamps, dtype=np.float64) >= cutoff
+            sent = int(np.count_nonzero(in_window))
+            if not sent:
+                return None
+            ok = np.unpackbits(np.frombuffer(self.success, dtype=np.uint8), bitorder="little")[:self.capacity].astype(bool)
+            rtts = np.frombuffer(self.rtts, dtype=np.float64)[in_window & ok]
+            received = len(rtts)
+            if received:
+                low, avg, high = float(rtts.min()), float(rtts.mean()), float(rtts.max())
+        else:
+            sent = received = 0
+            low, high, total = math.inf, -math.inf, 0.0
+            for i, timestamp in enumerate(self.timestamps):
+                if timestamp < cutoff:
+                    continue
+                sent += 1
+                if self.success[i >> 3] >> (i & 7) & 1:
+                    latency = self.rtts[i]
+                    received += 1
+                    total += latency
+                    low = min(low, latency)
+                    high = max(high, latency)
+            if not sent:
+                return None
+            avg = total / received if received else 0.0
+        if not received:
+            low = avg = high = None
+        return {"sent": sent, "min": low, "avg": avg, "max": high, "loss": (sent - received) / sent * 100}
+
+class RunningStats:
+    """Constant-memory probe statistics, updated in O(1) per result (Welford's method)."""
+    __slots__ = ("sent", "failed", "count", "last", "min", "max", "mean", "m2", "jitter",
+                 "success_streak", "failure_streak", "longest_failure_streak", "sketch")
+
+    def __init__(self) -> None:
+        self.sent = 0
+        self.failed = 0
+        self.count = 0
+        self.last = -1.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.jitter = 0.0
+        self.success_streak = 0
+        self.failure_streak = 0
+        self.longest_failure_streak = 0
+        self.sketch = LatencySketch()
+
+    def add(self, latency: float, success: bool) -> None:
+        """Folds one probe result into the statistics."""
+        self.sent += 1
+        if not success:
+            self.failed += 1
+            self.success_streak = 0
+            self.failure_streak += 1
+            if self.failure_streak > self.longest_failure_streak:
+                self.longest_failure_streak = self.failure_streak
             return
+        self.failure_streak = 0
+        self.success_streak += 1
+        if self.count:
+            # RFC 3550 interarrival jitter, applied to consecutive RTTs.
+            self.jitter += (abs(latency - self.last) - self.jitter) / 16
+        self.count += 1
+        self.last = latency
+        if latency < self.min:
+            self.min = latency
+        if latency > self.max:
+            self.max = latency
+        delta = latency - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (latency - self.mean)
+        self.sketch.add(latency)
 
-        def tcp_ping_executor():
-            start_time = time.perf_counter()
-            try:
-                with socket.create_connection((ip_address, port), timeout=2):
-                    end_time = time.perf_counter()
-                    latency = (end_time - start_time) * 1000
-                    message = f"[green]Connection to port {port} successful, latency: {latency:.2f} ms[/green]"
-                    return latency, True, message
-            except Exception as e:
-                error_message = f"failed ({type(e).__name__})"
-                message = f"[red]Connection to port {port} {error_message}[/red]"
-                return -1, False, message
-        _start_ping_session(host, ip_address, f"TCP Connect (Port {port})", tcp_ping_executor)
-    else:
-        console.print(f"[bold red]Error: Unknown ping method '{method}' for saved ping '{ping_config['name']}'.[/bold red]")
-        time.sleep(3)
+    def merge(self, other: "RunningStats") -> None:
+        """Combines another target's statistics into this one (Chan et al.)."""
+        if other.count:
+            total = self.count + other.count
+            delta = other.mean - self.mean
+            self.m2 += other.m2 + delta * delta * self.count * other.count / total
+            self.mean += delta * other.count / total
+            self.jitter = (self.jitter * self.count + other.jitter * other.count) / total
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self.count = total
+            self.last = other.last
+        self.sent += other.sent
+        self.failed += other.failed
+        self.longest_failure_streak = max(self.longest_failure_streak, other.longest_failure_streak)
+        self.sketch.merge(other.sketch)
 
-def start_tcp_ping() -> None:
-    """Handles the TCP pinging process by attempting to connect to a port."""
-    console.clear()
-    host = console.input("[bold yellow]Enter the host for TCP ping: [/bold yellow]")
-    port_str = console.input("[bold yellow]Enter the port number (e.g., 80, 443): [/bold yellow]")
+    @property
+    def variance(self) -> float:
+        """Sample variance of the successful latencies."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
 
-    try:
-        port = int(port_str)
-        if not 0 < port < 65536:
-            raise ValueError("Port out of range.")
-    except ValueError:
-        console.print(f"[bold red]Error: Invalid port number.[/bold red]")
-        time.sleep(3)
-        return
+    @property
+    def stddev(self) -> float:
+        """Sample standard deviation of the successful latencies."""
+        return math.sqrt(self.variance)
 
-    try:
-        ip_address = socket.gethostbyname(host)
-    except socket.gaierror as e:
-        console.print(f"[bold red]Error: Invalid hostname - {e}[/bold red]")
-        time.sleep(3)
-        return
+    @property
+    def loss_percent(self) -> float:
+        """Percentage of probes that failed."""
+        return self.failed / self.sent * 100 if self.sent else 0.0
 
-    def tcp_ping_executor():
-        start_time = time.perf_counter()
-        try:
-            with socket.create_connection((ip_address, port), timeout=2):
-                end_time = time.perf_counter()
-                latency = (end_time - start_time) * 1000
-                message = f"[green]Connection to port {port} successful, latency: {latency:.2f} ms[/green]"
-                return latency, True, message
-        except Exception as e:
-            error_message = f"failed ({type(e).__name__})"
-            message = f"[red]Connection to port {port} {error_message}[/red]"
-            return -1, False, message
-    
-    _start_ping_session(host, ip_address, f"TCP Connect (Port {port})", tcp_ping_executor)
+class ChangeEvent:
+    """A detected change in a target's RTT or loss rate."""
+    __slots__ = ("kind", "target", "timestamp", "before", "after")
 
-def select_ping_method() -> None:
-    """Displays a menu to select the ping method."""
-    while True:
-        console.clear()
-        ping_menu_text = Text.from_markup(
-            "Select a ping method:\n\n"
-            "  [yellow]1)[/yellow] ICMP Ping (Standard)\n"
-            "  [yellow]2)[/yellow] TCP Ping (Port Check)\n"
-            "  [yellow]3)[/yellow] From Saved Pings\n\n"
-            "  [yellow]b)[/yellow] Back to Main Menu\n"
-        )
-        console.print(Panel(ping_menu_text, title="Ping Method", border_style="cyan"))
-        choice = getch().lower()
+    KINDS = {"rtt_shift": "RTT shift", "loss": "Loss rose", "loss_cleared": "Loss cleared"}
 
-        if choice == '1':
-            start_icmp_ping()
-            break
-        elif choice == '2':
-            start_tcp_ping()
-            break
-        elif choice == '3':
-            select_and_start_saved_ping()
-            break
-        elif choice == 'b':
-            break
+    def __init__(self, kind: str, target: "Target", timestamp: float, before: float, after: float) -> None:
+        self.kind = kind
+        self.target = target
+        self.timestamp = timestamp
+        self.before = before
+        self.after = after
+
+    def describe(self) -> str:
+        """One-line human-readable summary."""
+        unit = " ms" if self.kind == "rtt_shift" else "%"
+        return f"{self.KINDS[self.kind]}: {self.before:.2f}{unit} -> {self.after:.2f}{unit}"
+
+    def to_dict(self) -> dict:
+        target = self.target
+        return {"kind": self.kind, "name": target.name, "host": target.host, "method": target.method,
+                "port": target.port, "ts": round(self.timestamp, 6), "before": round(self.before, 3),
+                "after": round(self.after, 3)}
+
+class RttCusum:
+    """Two-sided CUSUM over standardized RTTs against a slowly tracking baseline, O(1) per sample.
+
+    The first CHANGE_WARMUP samples set the baseline mean and deviation.
+    Standardized samples are clipped to CHANGE_CLIP so a lone spike cannot
+    raise an alarm; a sustained shift of about one deviation trips
+    CHANGE_THRESHOLD within a handful of samples. An alarm drops the sums and
+    the baseline, which the following samples warm up again; the change is
+    reported CHANGE_SETTLE samples later, with the mean of those post-alarm
+    samples as the new level, unless that level is within CHANGE_CONFIRM old
+    deviations of the old one (a false alarm).
+    """
+    __slots__ = ("count", "mean", "m2", "high", "low", "before")
+
+    def __init__(self) -> None:
+        self.before: Optional[Tuple[float, float]] = None
+        self._restart()
+
+    def _restart(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.high = self.low = 0.0
+
+    def add(self, latency: float) -> Optional[Tuple[float, float]]:
+        """Feeds one RTT; returns (level before, level after) when a change is detected."""
+        if self.count < CHANGE_WARMUP:
+            self.count += 1
+            delta = latency - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (latency - self.mean)
+            if self.before is not None and self.count == CHANGE_SETTLE:
+                (before, sigma), self.before = self.before, None
+                if abs(self.mean - before) >= CHANGE_CONFIRM * sigma:
+                    return before, self.mean
+            return None
+        sigma = max(math.sqrt(self.m2 / (self.count - 1)), CHANGE_MIN_SIGMA, CHANGE_MIN_RELATIVE * self.mean)
+        z = min(max((latency - self.mean) / sigma, -CHANGE_CLIP), CHANGE_CLIP)
+        self.high = max(self.high + z - CHANGE_DRIFT, 0.0)
+        self.low = max(self.low - z - CHANGE_DRIFT, 0.0)
+        if self.high > CHANGE_THRESHOLD or self.low > CHANGE_THRESHOLD:
+            # The samples that tripped the alarm may straddle the shift, so neither they nor the old
+            # baseline feed the new level.
+            self.before = (self.mean, sigma)
+            self._restart()
+            return None
+        # Let the baseline follow slow drift and shed warm-up bias: an EWMA of
+        # mean and variance over the clipped residual, so spikes barely move it.
+        delta = z * sigma
+        self.mean += CHANGE_BASELINE_ALPHA * delta
+        self.m2 = (1 - CHANGE_BASELINE_ALPHA) * (self.m2 + CHANGE_BASELINE_ALPHA * delta * delta * (self.count - 1))
+        return None
+
+class LossWindow:
+    """Loss rate over the last CHANGE_LOSS_WINDOW probes with alarm/clear hysteresis, O(1) per sample."""
+    __slots__ = ("ring", "position", "count", "failed", "alarmed", "level")
+
+    def __init__(self) -> None:
+        self.ring = bytearray(CHANGE_LOSS_WINDOW)
+        self.position = 0
+        self.count = 0
+        self.failed = 0
+        self.alarmed = False
+        self.level = 0.0
+
+    def add(self, success: bool) -> Optional[Tuple[str, float, float]]:
+        """Feeds one result; returns (kind, loss % before, loss % now) when the state flips."""
+        lost = 0 if success else 1
+        self.failed += lost - self.ring[self.position]
+        self.ring[self.position] = lost
+        self.position = (self.position + 1) % CHANGE_LOSS_WINDOW
+        if self.count < CHANGE_LOSS_WINDOW:
+            self.count += 1
+            if self.count < CHANGE_LOSS_WINDOW:
+                return None
+        rate = self.failed / CHANGE_LOSS_WINDOW
+        if not self.alarmed and rate >= CHANGE_LOSS_ALARM:
+            kind = "loss"
+        elif self.alarmed and rate <= CHANGE_LOSS_CLEAR:
+            kind = "loss_cleared"
+        else:
+            return None
+        self.alarmed = not self.alarmed
+        before, self.level = self.level, rate * 100
+        return kind, before, self.level
+
+class ChangeDetectors:
+    """The streaming detectors of one target, fed from Target.record()."""
+    __slots__ = ("rtt", "loss")
+
+    def __init__(self) -> None:
+        self.rtt = RttCusum()
+        self.loss = LossWindow()
+
+    def observe(self, target: "Target", timestamp_ns: int, latency: float, success: bool) -> None:
+        shift = self.rtt.add(latency) if success else None
+        if shift:
+            get_change_monitor().emit(ChangeEvent("rtt_shift", target, timestamp_ns / 1e9, *shift))
+        flip = self.loss.add(success)
+        if flip:
+            get_change_monitor().emit(ChangeEvent(flip[0], target, timestamp_ns / 1e9, flip[1], flip[2]))
+
+class ChangeMonitor:
+    """Delivers change events to registered hooks and keeps the most recent ones.
+
+    Hooks are called synchronously on the thread that recorded the probe, so
+    they should only hand the event off.
+    """
+
+    def __init__(self) -> None:
+        self.hooks: List[callable] = []
+        self.recent: deque = deque(maxlen=CHANGE_RECENT_EVENTS)
+        self.counts: dict = {kind: 0 for kind in ChangeEvent.KINDS}
+
+    def add_hook(self, hook: callable) -> None:
+        """Registers hook(event) for every future change event."""
+        self.hooks = self.hooks + [hook]
+
+    def remove_hook(self, hook: callable) -> None:
+        self.hooks = [h for h in self.hooks if h is not hook]
+
+    def emit(self, event: ChangeEvent) -> None:
+        self.counts[event.kind] += 1
+        self.recent.append(event)
+        for hook in self.hooks:
+            hook(event)
+
+    def metrics_lines(self) -> List[str]:
+        """Exposition lines for the event counters."""
+        lines = ["# HELP sryping_change_events_total Change events detected, by kind.",
+                 "# TYPE sryping_change_events_total counter"]
+        lines.extend(f'sryping_change_events_total{{kind="{kind}"}} {count}' for kind, count in self.counts.items())
+        return lines
+
+_change_monitor = ChangeMonitor()
+
+def get_change_monitor() -> ChangeMonitor:
+    """Returns the process-wide change monitor."""
+    return _change_monitor
+
+class SelfStats:
+    """Per-stage timing histograms of Sry-Ping's own work, in ms.
+
+    Stages: schedule (deadline to send), send (building and sending a probe),
+    wait (handing a reply from the receiver thread to the event loop), parse
+    (matching a reply or reading a connect's outcome), record (statistics,
+    detectors and outputs), merge (applying worker batches), render, input
+    (key polling), export (writing outputs and metrics) and ipinfo (ASN/Org
+    requests). Nothing is timed unless enable_self_stats() was called.
+    """
+    STAGES = ("schedule", "send", "wait", "parse", "record", "merge", "render", "input", "export", "ipinfo")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.stages = {stage: RunningStats() for stage in self.STAGES}
+
+    def observe(self, stage: str, elapsed_ms: float) -> None:
+        """Adds one timing to a stage; safe to call from any thread."""
+        with self.lock:
+            self.stages[stage].add(elapsed_ms, True)
+
+    def take(self) -> dict:
+        """Returns the timings since the last take and starts over (for worker batches)."""
+        with self.lock:
+            stages = {stage: stats for stage, stats in self.stages.items() if stats.count}
+            for stage in stages:
+                self.stages[stage] = RunningStats()
+        return stages
+
+    def merge(self, stages: dict) -> None:
+        """Adds timings taken elsewhere (e.g. in a worker process)."""
+        with self.lock:
+            for stage, stats in stages.items():
+                self.stages[stage].merge(stats)
+
+    def rows(self) -> List[tuple]:
+        """(stage, count, mean, p50, p99, max) for every stage that has timings."""
+        with self.lock:
+            return [(stage, stats.count, stats.mean, stats.sketch.quantile(0.5), stats.sketch.quantile(0.99), stats.max)
+                    for stage, stats in self.stages.items() if stats.count]
+
+    def summary(self) -> str:
+        """Plain-text table of the stage timings."""
+        lines = [f"{'stage':<9} {'count':>10} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}"]
+        lines.extend(f"{stage:<9} {count:>10} {mean:>9.3f} {p50:>9.3f} {p99:>9.3f} {high:>9.3f}"
+                     for stage, count, mean, p50, p99, high in self.rows())
+        return "\n".join(lines)
+
+    def metrics_lines(self) -> List[str]:
+        """Exposition lines for the stage timings."""
+        lines = ["# HELP sryping_self_stage_seconds Time Sry-Ping spent in each stage of its own work.",
+                 "# TYPE sryping_self_stage_seconds summary"]
+        with self.lock:
+            for stage, stats in self.stages.items():
+                if stats.count:
+                    for q in (0.5, 0.9, 0.99):
+                        lines.append(f'sryping_self_stage_seconds{{stage="{stage}",quantile="{q}"}} '
+                                     f'{stats.sketch.quantile(q) / 1000:.9f}')
+                lines.append(f'sryping_self_stage_seconds_sum{{stage="{stage}"}} {stats.mean * stats.count / 1000:.6f}')
+                lines.append(f'sryping_self_stage_seconds_count{{stage="{stage}"}} {stats.count}')
+        return lines
+
+_self_stats: Optional[SelfStats] = None
+
+def enable_self_stats() -> SelfStats:
+    """Turns on self-instrumentation for this process and returns the collector."""
+    global _self_stats
+    if _self_stats is None:
+        _self_stats = SelfStats()
+    return _self_stats
+
+def get_self_stats() -> Optional[SelfStats]:
+    """Returns the self-instrumentation collector, or None when it is off."""
+    return _self_stats
+
+class StackSampler:
+    """Sampling profiler: snapshots every thread's stack at a fixed interval.
+
+    write() saves the samples as collapsed stacks ("thread;outer;...;inner count"
+    per line), the input format of flamegraph.pl, speedscope and similar tools.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL) -> None:
+        self.interval = interval
+        self.counts: dict = {}
+        self.frames: dict = {}
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> "StackSampler":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.thread.join(timeout=1)
+
+    def _label(self, code) -> str:
+        label = self.frames.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self.frames[code] = label
+        return label
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                key = ";".join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+    def write(self, path: str) -> None:
+        """Saves the collapsed stacks sampled so far."""
+        with open(path, 'w') as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+
+class Target:
+    """A single monitored host and its live counters.
+
+    `result_log` starts as None; the ping session or fleet engine probing the
+    target attaches the log, so merely building targets never touches disk.
+    """
+    __slots__ = ("name", "host", "method", "port", "interval", "query", "ip_address", "stats", "history", "result_log",
+                 "version", "detectors")
+
+    def __init__(self, name: str, host: str, method: str, port: Optional[int] = None, interval: float = 1.0,
+                 query: Optional[str] = None) -> None:
+        self.name = name
+        self.host = host
+        self.method = method
+        self.port = port
+        self.interval = interval
+        self.query = query
+        self.ip_address: Optional[str] = None
+        self.stats = RunningStats()
+        self.history = RingBuffer.for_interval(interval)
+        self.result_log: Optional[ResultLog] = None
+        self.version = 0
+        self.detectors = ChangeDetectors()
+
+    @classmethod
+    def from_config(cls, ping_config: dict) -> "Target":
+        """Builds a target from a saved ping entry."""
+        return cls(ping_config["name"], ping_config["host"], ping_config["method"],
+                   ping_config.get("port"), float(ping_config.get("interval", 1.0)), ping_config.get("query"))
+
+    def record(self, latency: float, success: bool) -> None:
+        """Updates the statistics, history, change detectors and result log with the result of one probe."""
+        timestamp_ns = time.time_ns()
+        self.version += 1
+        self.stats.add(latency, success)
+        self.history.add(timestamp_ns / 1e9, latency, success)
+        self.detectors.observe(self, timestamp_ns, latency, success)
+        if self.result_log:
+            self.result_log.write(self, timestamp_ns, latency, success)
+
+LOG_RECORD = struct.Struct("<qIfBBxx")
+LOG_HEADER = struct.Struct("<8sII")
+LOG_MAGIC = b"SRYLOG1\0"
+LOG_VERSION = 1
+METHOD_CODES = {"ICMP": 1, "TCP": 2, "UDP": 3, "DNS": 4, "HTTP": 5, "HTTPS": 6}
+STATUS_OK = 0
+STATUS_FAILED = 1
+
+class _FileLock:
+    """Holds an exclusive lock on an open file (flock on Unix, msvcrt on Windows) for a with-block."""
+
+    def __init__(self, f) -> None:
+        self.f = f
+
+    def __enter__(self) -> None:
+        if os.name == "nt":
+            import msvcrt
+            self.f.seek(0)
+            msvcrt.locking(self.f.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(self.f.fileno(), fcntl.LOCK_EX)
+
+    def __exit__(self, *exc) -> None:
+        if os.name == "nt":
+            import msvcrt
+            self.f.seek(0)
+            msvcrt.locking(self.f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(self.f.fileno(), fcntl.LOCK_UN)
+
+class ResultLog:
+    """Append-only binary probe log with batched writes, interval fsync and size-based segments.
+
+    Each record is a fixed 20-byte (timestamp ns, target id, RTT ms, method,
+    status) row; target ids map to targets through targets.jsonl.
+    """
+
+    def __init__(self, directory: str = RESULT_LOG_DIR, segment_size: int = RESULT_LOG_SEGMENT_SIZE,
+                 fsync_interval: float = RESULT_LOG_FSYNC_INTERVAL) -> None:
+        self.directory = directory
+        self.segment_size = segment_size
+        self.fsync_interval = fsync_interval
+        self.buffer = bytearray()
+        self.lock = threading.Lock()
+        self.ids: dict = {}
+        self.file = None
+        self.file_size = 0
+        self.closed = False
+        os.makedirs(directory, exist_ok=True)
+        self.index_path = os.path.join(directory, "targets.jsonl")
+        for entry in load_log_index(directory).values():
+            self.ids[self._key(entry)] = entry["id"]
+        self.thread = threading.Thread(target=self._flush_loop, name="result-log", daemon=True)
+        self.thread.start()
+
+    @staticmethod
+    def _key(target) -> str:
+        get = target.get if isinstance(target, dict) else lambda name: getattr(target, name)
+        return f"{get('name')}|{get('host')}|{get('method')}|{get('port') or ''}"
+
+    def target_id(self, target: "Target") -> int:
+        """Returns the log id of a target, registering it in targets.jsonl on first use."""
+        key = self._key(target)
+        target_id = self.ids.get(key)
+        if target_id is None:
+            with self.lock:
+                target_id = self.ids.get(key)
+                if target_id is None:
+                    target_id = self._register(key, target)
+        return target_id
+
+    def _register(self, key: str, target: "Target") -> int:
+        """Allocates a target id under an exclusive lock on targets.jsonl.
+
+        Other processes (a headless run next to the TUI) may share the
+        directory, so the index is re-read under the lock and the new id
+        follows the highest one any of them registered.
+        """
+        with open(self.index_path, 'a+') as f:
+            with _FileLock(f):
+                f.seek(0)
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.ids[self._key(entry)] = entry["id"]
+                target_id = self.ids.get(key)
+                if target_id is None:
+                    target_id = max(self.ids.values(), default=0) + 1
+                    self.ids[key] = target_id
+                    f.seek(0, os.SEEK_END)
+                    f.write(json.dumps({"id": target_id, "name": target.name, "host": target.host,
+                                        "method": target.method, "port": target.port}) + "\n")
+                    f.flush()
+        return target_id
+
+    def write(self, target: "Target", timestamp_ns: int, latency: float, success: bool) -> None:
+        """Queues one probe result for the next batched write."""
+        record = LOG_RECORD.pack(timestamp_ns, self.target_id(target), latency if success else -1.0,
+                                 METHOD_CODES.get(target.method, 0), STATUS_OK if success else STATUS_FAILED)
+        with self.lock:
+            self.buffer += record
+            if len(self.buffer) >= RESULT_LOG_BATCH_BYTES:
+                self._write_buffer()
+
+    def _write_buffer(self) -> None:
+        """Writes pending records, starting a new segment when the current one is full."""
+        if not self.buffer:
+            return
+        self_stats = _self_stats
+        if self_stats:
+            write_start = time.perf_counter()
+        if self.file is None or self.file_size + len(self.buffer) > self.segment_size:
+            if self.file:
+                os.fsync(self.file.fileno())
+                self.file.close()
+            path = os.path.join(self.directory, f"segment-{time.time_ns()}-{os.getpid()}.srylog")
+            self.file = open(path, 'ab')
+            self.file.write(LOG_HEADER.pack(LOG_MAGIC, LOG_VERSION, LOG_RECORD.size))
+            self.file_size = LOG_HEADER.size
+        self.file.write(self.buffer)
+        self.file_size += len(self.buffer)
+        self.buffer.clear()
+        if self_stats:
+            self_stats.observe("export", (time.perf_counter() - write_start) * 1000)
+
+    def flush(self) -> None:
+        """Writes and fsyncs everything queued so far."""
+        with self.lock:
+            self._write_buffer()
+            if self.file:
+                self.file.flush()
+                os.fsync(self.file.fileno())
+
+    def _flush_loop(self) -> None:
+        while not self.closed:
+            time.sleep(self.fsync_interval)
+            self.flush()
+
+    def close(self) -> None:
+        """Flushes and closes the current segment."""
+        self.flush()
+        with self.lock:
+            self.closed = True
+            if self.file:
+                self.file.close()
+                self.file = None
+
+def load_log_index(directory: str = RESULT_LOG_DIR) -> dict:
+    """Returns the target id -> target info map of a result log directory."""
+    index = {}
+    try:
+        with open(os.path.join(directory, "targets.jsonl"), 'r') as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    index[entry["id"]] = entry
+    except FileNotFoundError:
+        pass
+    return index
+
+def read_result_log(directory: str = RESULT_LOG_DIR) -> list:
+    """Maps every segment of a result log and returns its records.
+
+    With NumPy this is a list of zero-copy structured arrays (one per segment,
+    fields ts/target/rtt/method/status); without it, a list of record tuples.
+    """
+    import mmap
+    segments = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".srylog"):
+            continue
+        with open(os.path.join(directory, name), 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < LOG_HEADER.size:
+                continue
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, _, record_size = LOG_HEADER.unpack_from(mapped)
+        if magic != LOG_MAGIC or record_size != LOG_RECORD.size:
+            continue
+        count = (size - LOG_HEADER.size) // record_size
+        if _load_numpy() is not None:
+            segments.append(np.frombuffer(mapped, dtype=LOG_DTYPE, count=count, offset=LOG_HEADER.size))
+        else:
+            view = memoryview(mapped)[LOG_HEADER.size:LOG_HEADER.size + count * record_size]
+            segments.extend(LOG_RECORD.iter_unpack(view))
+    return segments
+
+_result_log: Optional[ResultLog] = None
+
+def get_result_log() -> Optional[ResultLog]:
+    """Returns the process-wide result log, or None when logging is turned off."""
+    global _result_log
+    if not result_log_enabled:
+        return None
+    if _result_log is None:
+        _result_log = ResultLog()
+    return _result_log
+
+def prom_label(value) -> str:
+    """Escapes a value for use inside a Prometheus label."""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class TargetMetrics:
+    """Pre-aggregated Prometheus series of one target (or of the overflow bucket)."""
+    __slots__ = ("labels", "sent", "failed", "up", "buckets", "rtt_sum", "rtt_count", "phases")
+
+    def __init__(self, labels: str, bucket_count: int) -> None:
+        self.labels = labels
+        self.sent = 0
+        self.failed = 0
+        self.up = 0
+        self.buckets = [0] * (bucket_count + 1)
+        self.rtt_sum = 0.0
+        self.rtt_count = 0
+        self.phases: Optional[dict] = None
+
+class MetricsRegistry:
+    """Prometheus metrics updated incrementally per probe, so a scrape only formats counters.
+
+    At most `max_series` targets get their own series; the rest share one
+    name="__overflow__" series to keep label cardinality bounded.
+    """
+
+    def __init__(self, buckets_ms: Tuple[float, ...] = METRICS_BUCKETS_MS, max_series: int = METRICS_MAX_SERIES) -> None:
+        self.bounds = sorted(buckets_ms)
+        self.bucket_labels = [f"{bound / 1000:g}" for bound in self.bounds] + ["+Inf"]
+        self.max_series = max_series
+        self.series: dict = {}
+        self.overflow: Optional[TargetMetrics] = None
+        self.collectors: List[callable] = []
+        self.lock = threading.Lock()
+
+    def _series_for(self, target: Target) -> TargetMetrics:
+        series = self.series.get(target)
+        if series is None:
+            with self.lock:
+                if len(self.series) < self.max_series:
+                    port = f":{target.port}" if target.port else ""
+                    labels = f'name="{prom_label(target.name)}",host="{prom_label(target.host)}",method="{target.method}{port}"'
+                    series = TargetMetrics(labels, len(self.bounds))
+                else:
+                    if self.overflow is None:
+                        self.overflow = TargetMetrics('name="__overflow__",host="",method=""', len(self.bounds))
+                    series = self.overflow
+                self.series[target] = series
+        return series
+
+    def observe(self, target: Target, latency: float, success: bool, message: str = "",
+                timings: Optional[dict] = None) -> None:
+        """Folds one probe result into the target's counters, histogram and phase totals."""
+        series = self._series_for(target)
+        series.sent += 1
+        if success:
+            series.up = 1
+            series.buckets[bisect.bisect_left(self.bounds, latency)] += 1
+            series.rtt_sum += latency / 1000
+            series.rtt_count += 1
+            if timings:
+                if series.phases is None:
+                    series.phases = {}
+                for phase, ms in timings.items():
+                    totals = series.phases.get(phase) or self._add_phase(series, phase)
+                    totals[0] += ms / 1000
+                    totals[1] += 1
+        else:
+            series.failed += 1
+            series.up = 0
+
+    __call__ = observe
+
+    def _add_phase(self, series: TargetMetrics, phase: str) -> list:
+        # New keys go in under the lock so render() can copy the phase dicts consistently.
+        with self.lock:
+            return series.phases.setdefault(phase, [0.0, 0])
+
+    def take(self, target: Target) -> Optional[TargetMetrics]:
+        """Removes and returns a target's series, so its next observation starts a fresh delta."""
+        with self.lock:
+            return self.series.pop(target, None)
+
+    def merge(self, target: Target, delta: TargetMetrics) -> None:
+        """Adds counters observed elsewhere (e.g. in a worker process) to the target's series."""
+        series = self._series_for(target)
+        series.sent += delta.sent
+        series.failed += delta.failed
+        series.up = delta.up
+        for bucket, count in enumerate(delta.buckets):
+            series.buckets[bucket] += count
+        series.rtt_sum += delta.rtt_sum
+        series.rtt_count += delta.rtt_count
+        if delta.phases:
+            if series.phases is None:
+                series.phases = {}
+            for phase, (seconds, count) in delta.phases.items():
+                totals = series.phases.get(phase) or self._add_phase(series, phase)
+                totals[0] += seconds
+                totals[1] += count
+
+    def add_collector(self, collector: callable) -> None:
+        """Registers a function returning extra exposition lines on every scrape."""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        """Formats every series in the Prometheus text exposition format."""
+        self_stats = _self_stats
+        if self_stats:
+            render_start = time.perf_counter()
+        # Targets register (and phases appear) from other threads; copy the dicts under the lock, format outside it.
+        with self.lock:
+            unique = [(series, list(series.phases.items()) if series.phases else None)
+                      for series in {id(series): series for series in self.series.values()}.values()]
+        sent = ["# HELP sryping_probes_sent_total Probes sent.", "# TYPE sryping_probes_sent_total counter"]
+        failed = ["# HELP sryping_probes_failed_total Probes that failed.", "# TYPE sryping_probes_failed_total counter"]
+        up = ["# HELP sryping_up Whether the last probe succeeded.", "# TYPE sryping_up gauge"]
+        rtt = ["# HELP sryping_rtt_seconds Round-trip time of successful probes.", "# TYPE sryping_rtt_seconds histogram"]
+        phases = ["# HELP sryping_probe_phase_seconds Time successful probes spent per phase (dns, connect, tls, ttfb).",
+                  "# TYPE sryping_probe_phase_seconds summary"]
+        for series, series_phases in unique:
+            labels = series.labels
+            sent.append(f"sryping_probes_sent_total{{{labels}}} {series.sent}")
+            failed.append(f"sryping_probes_failed_total{{{labels}}} {series.failed}")
+            up.append(f"sryping_up{{{labels}}} {series.up}")
+            cumulative = 0
+            for le, count in zip(self.bucket_labels, series.buckets):
+                cumulative += count
+                rtt.append(f'sryping_rtt_seconds_bucket{{{labels},le="{le}"}} {cumulative}')
+            rtt.append(f"sryping_rtt_seconds_sum{{{labels}}} {series.rtt_sum:.6f}")
+            rtt.append(f"sryping_rtt_seconds_count{{{labels}}} {series.rtt_count}")
+            if series_phases:
+                for phase, (seconds, count) in series_phases:
+                    phases.append(f'sryping_probe_phase_seconds_sum{{{labels},phase="{phase}"}} {seconds:.6f}')
+                    phases.append(f'sryping_probe_phase_seconds_count{{{labels},phase="{phase}"}} {count}')
+        lines = sent + failed + up + rtt + (phases if len(phases) > 2 else [])
+        for collector in self.collectors:
+            lines.extend(collector())
+        if self_stats:
+            self_stats.observe("export", (time.perf_counter() - render_start) * 1000)
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, address: str = "") -> "ThreadingHTTPServer":
+        """Serves /metrics over HTTP from a background thread and returns the server."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        server = ThreadingHTTPServer((address, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        return server
+
+def fan_out(*callbacks: Optional[callable]) -> Optional[callable]:
+    """Combines several on_result callbacks into one, skipping None."""
+    callbacks = [callback for callback in callbacks if callback]
+    if len(callbacks) <= 1:
+        return callbacks[0] if callbacks else None
+    def on_result(*args) -> None:
+        for callback in callbacks:
+            callback(*args)
+    return on_result
+
+class IcmpSocket:
+    """One long-lived ICMP socket that multiplexes echo requests to many hosts.
+
+    Outstanding probes live in a table keyed by sequence number and expire
+    through a timing wheel, so a probe costs one sendto and one dict lookup.
+    """
+
+    def __init__(self, family: int = socket.AF_INET, tick: float = ICMP_WHEEL_TICK, max_timeout: float = 5.0) -> None:
+        self.family = family
+        protocol = socket.IPPROTO_ICMPV6 if family == socket.AF_INET6 else socket.IPPROTO_ICMP
+        # ICMPv6 uses echo types 128/129 and the kernel fills in its checksum.
+        self.echo_request, self.echo_reply = (128, 129) if family == socket.AF_INET6 else (8, 0)
+        try:
+            self.sock = socket.socket(family, socket.SOCK_DGRAM, protocol)
+            self.sock.bind(("", 0))
+            # Unprivileged ICMP sockets get their echo identifier from the kernel.
+            self.ident = self.sock.getsockname()[1]
+        except OSError:
+            self.sock = socket.socket(family, socket.SOCK_RAW, protocol)
+            self.ident = os.getpid() & 0xFFFF
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        except OSError:
+            pass
+        self.tick = tick
+        self.wheel: List[list] = [[] for _ in range(int(math.ceil(max_timeout / tick)) + 2)]
+        self.wheel_pos = 0
+        self.wheel_time = time.perf_counter()
+        self.seq = 0
+        self.pending: dict = {}
+        self.lock = threading.Lock()
+        self.payload = b"sry-ping"
+        self.thread = threading.Thread(target=self._receive_loop, name="icmp-receiver", daemon=True)
+        self.thread.start()
+
+    def send(self, ip_address: str, timeout: float, callback: callable) -> None:
+        """Sends one echo request; callback receives the RTT in ms, or None on timeout."""
+        self_stats = _self_stats
+        if self_stats:
+            send_start = time.perf_counter()
+        slots = min(max(int(math.ceil(timeout / self.tick)), 1), len(self.wheel) - 1)
+        with self.lock:
+            # Past 65536 probes per timeout the sequence wraps; skip numbers still awaiting a reply.
+            for _ in range(0x10000):
+                self.seq = (self.seq + 1) & 0xFFFF
+                if self.seq not in self.pending:
+                    break
+            seq = self.seq
+            checksum = 0
+            if self.family == socket.AF_INET:
+                checksum = _icmp_checksum(struct.pack("!BBHHH", self.echo_request, 0, 0, self.ident, seq) + self.payload)
+            packet = struct.pack("!BBHHH", self.echo_request, 0, checksum, self.ident, seq) + self.payload
+            self.wheel[(self.wheel_pos + slots) % len(self.wheel)].append(seq)
+            sent = time.perf_counter()
+            self.pending[seq] = (ip_address, sent, callback)
+        try:
+            self.sock.sendto(packet, (ip_address, 0))
+        except OSError:
+            with self.lock:
+                entry = self.pending.pop(seq, None)
+            if entry:
+                callback(None)
+        if self_stats:
+            self_stats.observe("send", (time.perf_counter() - send_start) * 1000)
+
+    def _receive_loop(self) -> None:
+        """Matches replies to outstanding probes and expires the ones that timed out."""
+        while True:
+            wait = max(self.wheel_time + self.tick - time.perf_counter(), 0)
+            readable = select.select([self.sock], [], [], wait)[0]
+            if readable:
+                try:
+                    data, address = self.sock.recvfrom(2048)
+                except OSError:
+                    continue
+                received = time.perf_counter()
+                self_stats = _self_stats
+                if self.family == socket.AF_INET and data and data[0] >> 4 == 4:
+                    data = data[(data[0] & 0x0F) * 4:]
+                if len(data) >= 8:
+                    icmp_type, _, _, ident, seq = struct.unpack_from("!BBHHH", data)
+                    if icmp_type == self.echo_reply and ident == self.ident:
+                        with self.lock:
+                            entry = self.pending.get(seq)
+                            if entry and entry[0] == address[0]:
+                                del self.pending[seq]
+                            else:
+                                entry = None
+                        if self_stats:
+                            self_stats.observe("parse", (time.perf_counter() - received) * 1000)
+                        if entry:
+                            entry[2]((received - entry[1]) * 1000)
+            self._expire(time.perf_counter())
+
+    def _expire(self, now: float) -> None:
+        """Advances the timing wheel and fails every probe in the slots passed."""
+        expired = []
+        with self.lock:
+            while now - self.wheel_time >= self.tick:
+                self.wheel_time += self.tick
+                self.wheel_pos = (self.wheel_pos + 1) % len(self.wheel)
+                slot = self.wheel[self.wheel_pos]
+                for seq in slot:
+                    entry = self.pending.pop(seq, None)
+                    if entry:
+                        expired.append(entry[2])
+                slot.clear()
+        for callback in expired:
+            callback(None)
+
+_icmp_sockets: dict = {}
+_icmp_socket_lock = threading.Lock()
+
+def address_family(ip_address: str) -> int:
+    """Returns AF_INET6 for IPv6 literals and AF_INET otherwise."""
+    return socket.AF_INET6 if ":" in ip_address else socket.AF_INET
+
+def get_icmp_socket(family: int = socket.AF_INET) -> Optional[IcmpSocket]:
+    """Returns the process-wide ICMP socket for a family, or None if ICMP sockets are not permitted."""
+    with _icmp_socket_lock:
+        if family not in _icmp_sockets:
+            try:
+                _icmp_sockets[family] = IcmpSocket(family)
+            except OSError:
+                _icmp_sockets[family] = None
+        return _icmp_sockets[family]
+
+def _icmp_result(latency: Optional[float]) -> "ProbeResult":
+    """Formats an ICMP RTT (or None) as a (latency, success, message) result."""
+    if latency is None:
+        return ProbeResult(-1, False, "[red]Ping failed (Timeout)[/red]")
+    return ProbeResult(latency, True, f"[green]Ping successful, latency: {latency:.2f} ms[/green]")
+
+class TcpProbePool:
+    """Non-blocking TCP connect probes multiplexed on one selector thread.
+
+    Callers start the connect themselves (so the send timestamp is taken on
+    the calling thread) and hand the socket to the selector thread, which
+    completes it. Sockets close with SO_LINGER 0 so probes leave no TIME_WAIT.
+    On Linux the RTT is the kernel's handshake RTT from TCP_INFO; elsewhere it
+    is bracketed with perf_counter_ns.
+    """
+
+    def __init__(self, source_ports: Optional[Tuple[int, int]] = None) -> None:
+        import selectors
+        self.selector = selectors.DefaultSelector()
+        self.source_ports = source_ports
+        self.next_source_port = source_ports[0] if source_ports else 0
+        self.lock = threading.Lock()
+        self.incoming: List[tuple] = []
+        self.timeouts: List[tuple] = []
+        self.wake_reader, self.wake_writer = socket.socketpair()
+        self.wake_reader.setblocking(False)
+        self.wake_writer.setblocking(False)
+        self.selector.register(self.wake_reader, selectors.EVENT_READ)
+        self.linger = struct.pack("ii", 1, 0)
+        self.thread = threading.Thread(target=self._loop, name="tcp-prober", daemon=True)
+        self.thread.start()
+
+    def _bind_source(self, sock: socket.socket, family: int) -> None:
+        """Binds to the next free port of the configured source-port range."""
+        low, high = self.source_ports
+        span = high - low + 1
+        for _ in range(min(span, 64)):
+            with self.lock:
+                port = self.next_source_port
+                self.next_source_port = low + (port - low + 1) % span
+            try:
+                sock.bind(("::" if family == socket.AF_INET6 else "0.0.0.0", port))
+                return
+            except OSError:
+                continue
+        raise OSError(errno.EADDRNOTAVAIL, "No free source port in range")
+
+    def connect(self, ip_address: str, port: int, timeout: float, callback: callable) -> None:
+        """Starts one connect; callback receives (latency_ms, None) or (None, error_name)."""
+        self_stats = _self_stats
+        if self_stats:
+            send_start = time.perf_counter()
+        family = address_family(ip_address)
+        try:
+            sock = socket.socket(family, socket.SOCK_STREAM)
+        except OSError as e:
+            callback(None, type(e).__name__)
+            return
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, self.linger)
+            sock.setblocking(False)
+            if self.source_ports:
+                self._bind_source(sock, family)
+            start_ns = time.perf_counter_ns()
+            result = sock.connect_ex((ip_address, port))
+        except OSError as e:
+            sock.close()
+            callback(None, type(e).__name__)
+            return
+        if result == 0:
+            self._finish(sock, start_ns, time.perf_counter_ns(), callback)
+            return
+        if result not in (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN, getattr(errno, "WSAEWOULDBLOCK", -1)):
+            sock.close()
+            callback(None, type(OSError(result, os.strerror(result))).__name__)
+            return
+        with self.lock:
+            self.incoming.append((sock, start_ns, start_ns + int(timeout * 1e9), callback))
+        try:
+            self.wake_writer.send(b"\0")
+        except OSError:
+            pass
+        if self_stats:
+            self_stats.observe("send", (time.perf_counter() - send_start) * 1000)
+
+    def _finish(self, sock: socket.socket, start_ns: int, end_ns: int, callback: callable) -> None:
+        """Reads the outcome of a completed connect, closes the socket and reports."""
+        self_stats = _self_stats
+        if self_stats:
+            parse_start = time.perf_counter()
+        error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        latency = None
+        if not error:
+            latency = (end_ns - start_ns) / 1e6
+            if hasattr(socket, "TCP_INFO"):
+                try:
+                    kernel_rtt_us = struct.unpack_from("I", sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_INFO, 104), 68)[0]
+                    if kernel_rtt_us:
+                        latency = kernel_rtt_us / 1000
+                except (OSError, struct.error):
+                    pass
+        sock.close()
+        if self_stats:
+            self_stats.observe("parse", (time.perf_counter() - parse_start) * 1000)
+        if error:
+            callback(None, type(OSError(error, os.strerror(error))).__name__)
+        else:
+            callback(latency, None)
+
+    def _loop(self) -> None:
+        """Completes connects as they become writable and fails the ones past their deadline."""
+        import selectors
+        while True:
+            wait = None
+            if self.timeouts:
+                wait = max((self.timeouts[0][0] - time.perf_counter_ns()) / 1e9, 0)
+            for key, _ in self.selector.select(wait):
+                if key.fileobj is self.wake_reader:
+                    try:
+                        while self.wake_reader.recv(4096):
+                            pass
+                    except OSError:
+                        pass
+                    continue
+                end_ns = time.perf_counter_ns()
+                sock = key.fileobj
+                start_ns, _, callback = key.data
+                self.selector.unregister(sock)
+                self._finish(sock, start_ns, end_ns, callback)
+            with self.lock:
+                incoming, self.incoming = self.incoming, []
+            for sock, start_ns, deadline_ns, callback in incoming:
+                self.selector.register(sock, selectors.EVENT_WRITE, (start_ns, deadline_ns, callback))
+                heapq.heappush(self.timeouts, (deadline_ns, sock.fileno(), sock))
+            now_ns = time.perf_counter_ns()
+            while self.timeouts and self.timeouts[0][0] <= now_ns:
+                _, _, sock = heapq.heappop(self.timeouts)
+                try:
+                    key = self.selector.get_key(sock)
+                except (KeyError, ValueError):
+                    continue
+                if key.data[1] > now_ns:
+                    continue
+                self.selector.unregister(sock)
+                sock.close()
+                key.data[2](None, "TimeoutError")
+
+_tcp_probe_pool: Optional[TcpProbePool] = None
+
+def get_tcp_probe_pool() -> TcpProbePool:
+    """Returns the process-wide TCP probe pool, creating it on first use."""
+    global _tcp_probe_pool
+    with _icmp_socket_lock:
+        if _tcp_probe_pool is None:
+            _tcp_probe_pool = TcpProbePool(parse_port_range(tcp_source_ports))
+    return _tcp_probe_pool
+
+def parse_port_range(value: str) -> Optional[Tuple[int, int]]:
+    """Parses 'low-high' into a port range, or returns None for an empty value."""
+    if not value:
+        return None
+    low, _, high = value.partition("-")
+    low, high = int(low), int(high or low)
+    if not 0 < low <= high < 65536:
+        raise ValueError(f"Invalid port range '{value}'")
+    return low, high
+
+class HopTracer:
+    """TTL-limited probes for path tracing, with every reply matched on one raw ICMP socket.
+
+    ICMP echoes go out on the raw socket itself, UDP datagrams on one shared
+    socket (to a traceroute port that identifies the probe) and TCP SYNs on a
+    socket per probe (identified by its source port). Routers answer with
+    time-exceeded errors quoting the probe's headers, which map back to the
+    outstanding probe in one dict lookup; a reply from the target itself (echo
+    reply, port unreachable, SYN-ACK or RST) marks the destination. Needs root
+    or CAP_NET_RAW.
+    """
+
+    def __init__(self, family: int = socket.AF_INET) -> None:
+        import selectors
+        self.family = family
+        if family == socket.AF_INET6:
+            self.sock = socket.socket(family, socket.SOCK_RAW, socket.IPPROTO_ICMPV6)
+            self.ttl_option = (socket.IPPROTO_IPV6, socket.IPV6_UNICAST_HOPS)
+            self.echo_request, self.echo_reply, self.time_exceeded, self.unreachable = 128, 129, 3, 1
+        else:
+            self.sock = socket.socket(family, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+            self.ttl_option = (socket.IPPROTO_IP, socket.IP_TTL)
+            self.echo_request, self.echo_reply, self.time_exceeded, self.unreachable = 8, 0, 11, 3
+        self.sock.setblocking(False)
+        self.udp = socket.socket(family, socket.SOCK_DGRAM)
+        self.udp.bind(("", 0))
+        self.udp_port = self.udp.getsockname()[1]
+        # Differs from the echo socket's identifier, so each ignores the other's replies.
+        self.ident = (os.getpid() ^ 0x5352) & 0xFFFF
+        self.seq = 0
+        self.sequence = 0
+        self.pending: dict = {}
+        self.timeouts: List[tuple] = []
+        self.incoming: List[socket.socket] = []
+        self.lock = threading.Lock()
+        self.linger = struct.pack("ii", 1, 0)
+        self.selector = selectors.DefaultSelector()
+        self.wake_reader, self.wake_writer = socket.socketpair()
+        self.wake_reader.setblocking(False)
+        self.wake_writer.setblocking(False)
+        self.selector.register(self.sock, selectors.EVENT_READ)
+        self.selector.register(self.wake_reader, selectors.EVENT_READ)
+        self.thread = threading.Thread(target=self._receive_loop, name="hop-tracer", daemon=True)
+        self.thread.start()
+
+    def send(self, ip_address: str, method: str, port: Optional[int], ttl: int, timeout: float, callback: callable) -> None:
+        """Sends one probe limited to `ttl` hops; callback receives (latency_ms, responder, reached), or (None, None, False)."""
+        self_stats = _self_stats
+        if self_stats:
+            send_start = time.perf_counter()
+        destination = socket.inet_pton(self.family, ip_address)
+        tcp_sock = None
+        with self.lock:
+            if method == "TCP":
+                try:
+                    tcp_sock = socket.socket(self.family, socket.SOCK_STREAM)
+                    tcp_sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, self.linger)
+                    tcp_sock.setsockopt(*self.ttl_option, ttl)
+                    tcp_sock.setblocking(False)
+                    tcp_sock.bind(("", 0))
+                    key = ("TCP", tcp_sock.getsockname()[1])
+                except OSError:
+                    if tcp_sock:
+                        tcp_sock.close()
+                    tcp_sock = None
+                    key = None
+            else:
+                # Sequence numbers (and the UDP ports derived from them) still awaiting a reply are skipped.
+                span = TRACE_UDP_PORTS if method == "UDP" else 0x10000
+                for _ in range(span):
+                    self.seq = (self.seq + 1) % span
+                    key = (method, self.seq)
+                    if key not in self.pending:
+                        break
+            error = key is None
+            if not error:
+                deadline = time.perf_counter() + timeout
+                self.sequence += 1
+                first = not self.timeouts or deadline < self.timeouts[0][0]
+                heapq.heappush(self.timeouts, (deadline, self.sequence, key))
+                # The lock is held through the send, so the receiver cannot see a reply before its entry exists.
+                self.pending[key] = (destination, time.perf_counter(), callback, self.sequence, tcp_sock)
+                try:
+                    if method == "ICMP":
+                        header = struct.pack("!BBHHH", self.echo_request, 0, 0, self.ident, key[1])
+                        checksum = _icmp_checksum(header + TRACE_PAYLOAD) if self.family == socket.AF_INET else 0
+                        self.sock.setsockopt(*self.ttl_option, ttl)
+                        self.sock.sendto(struct.pack("!BBHHH", self.echo_request, 0, checksum, self.ident, key[1]) + TRACE_PAYLOAD,
+                                         (ip_address, 0))
+                    elif method == "UDP":
+                        self.udp.setsockopt(*self.ttl_option, ttl)
+                        self.udp.sendto(TRACE_PAYLOAD, (ip_address, TRACE_UDP_BASE_PORT + key[1]))
+                    else:
+                        result = tcp_sock.connect_ex((ip_address, port))
+                        if result not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN):
+                            raise OSError(result, os.strerror(result))
+                        self.incoming.append(tcp_sock)
+                        first = True
+                except OSError:
+                    error = True
+                    del self.pending[key]
+        if error:
+            if tcp_sock:
+                tcp_sock.close()
+            callback(None, None, False)
+            return
+        if first:
+            try:
+                self.wake_writer.send(b"\0")
+            except OSError:
+                pass
+        if self_stats:
+            self_stats.observe("send", (time.perf_counter() - send_start) * 1000)
+
+    def _match(self, data: bytes, responder: str) -> Optional[tuple]:
+        """Returns (key, quoted destination, reached) for a reply to one of our probes, else None."""
+        if self.family == socket.AF_INET:
+            if len(data) < 20:
+                return None
+            data = data[(data[0] & 0x0F) * 4:]
+        if len(data) < 8:
+            return None
+        icmp_type, code = data[0], data[1]
+        if icmp_type == self.echo_reply:
+            ident, seq = struct.unpack_from("!HH", data, 4)
+            if ident != self.ident:
+                return None
+            return ("ICMP", seq), socket.inet_pton(self.family, responder), True
+        if icmp_type not in (self.time_exceeded, self.unreachable):
+            return None
+        # The error quotes the probe's IP header and at least the first 8 bytes after it.
+        quoted = data[8:]
+        if self.family == socket.AF_INET:
+            if len(quoted) < 20:
+                return None
+            header_length = (quoted[0] & 0x0F) * 4
+            protocol, destination = quoted[9], quoted[16:20]
+        else:
+            header_length = 40
+            protocol, destination = (quoted[6], quoted[24:40]) if len(quoted) >= 40 else (None, b"")
+        inner = quoted[header_length:header_length + 8]
+        if len(inner) < 8:
+            return None
+        reached = icmp_type == self.unreachable and socket.inet_pton(self.family, responder) == destination
+        if protocol in (socket.IPPROTO_ICMP, socket.IPPROTO_ICMPV6):
+            inner_type, _, _, ident, seq = struct.unpack("!BBHHH", inner)
+            if inner_type != self.echo_request or ident != self.ident:
+                return None
+            return ("ICMP", seq), destination, reached
+        if protocol == socket.IPPROTO_UDP:
+            source_port, destination_port = struct.unpack_from("!HH", inner)
+            if source_port != self.udp_port:
+                return None
+            return ("UDP", destination_port - TRACE_UDP_BASE_PORT), destination, reached
+        if protocol == socket.IPPROTO_TCP:
+            return ("TCP", struct.unpack_from("!H", inner)[0]), destination, reached
+        return None
+
+    def _complete(self, key: tuple, destination: Optional[bytes], received: float, responder: Optional[str], reached: bool) -> None:
+        with self.lock:
+            entry = self.pending.get(key)
+            if not entry or (destination is not None and entry[0] != destination):
+                return
+            del self.pending[key]
+        if entry[4]:
+            self._close(entry[4])
+        entry[2]((received - entry[1]) * 1000, responder or socket.inet_ntop(self.family, entry[0]), reached)
+
+    def _close(self, sock: socket.socket) -> None:
+        try:
+            self.selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+        sock.close()
+
+    def _receive_loop(self) -> None:
+        import selectors
+        while True:
+            with self.lock:
+                wait = max(self.timeouts[0][0] - time.perf_counter(), 0) if self.timeouts else None
+            for key, _ in self.selector.select(wait):
+                sock = key.fileobj
+                if sock is self.wake_reader:
+                    try:
+                        while self.wake_reader.recv(4096):
+                            pass
+                    except OSError:
+                        pass
+                elif sock is self.sock:
+                    while True:
+                        try:
+                            data, address = self.sock.recvfrom(2048)
+                        except OSError:
+                            break
+                        received = time.perf_counter()
+                        match = self._match(data, address[0])
+                        if _self_stats:
+                            _self_stats.observe("parse", (time.perf_counter() - received) * 1000)
+                        if match:
+                            self._complete(match[0], match[1], received, address[0], match[2])
+                else:
+                    # A TCP probe that got through: SYN-ACK or RST from the target. Other errors are
+                    # answered by an ICMP error on the raw socket, or time out.
+                    received = time.perf_counter()
+                    error = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+                    if error in (0, errno.ECONNREFUSED):
+                        self._complete(("TCP", key.data), None, received, None, True)
+                    else:
+                        self.selector.unregister(sock)
+            with self.lock:
+                incoming, self.incoming = self.incoming, []
+            for sock in incoming:
+                if sock.fileno() >= 0:
+                    self.selector.register(sock, selectors.EVENT_WRITE, sock.getsockname()[1])
+            expired = []
+            now = time.perf_counter()
+            with self.lock:
+                while self.timeouts and self.timeouts[0][0] <= now:
+                    _, sequence, key = heapq.heappop(self.timeouts)
+                    entry = self.pending.get(key)
+                    if entry and entry[3] == sequence:
+                        del self.pending[key]
+                        expired.append(entry)
+            for entry in expired:
+                if entry[4]:
+                    self._close(entry[4])
+                entry[2](None, None, False)
+
+_hop_tracers: dict = {}
+
+def get_hop_tracer(family: int = socket.AF_INET) -> HopTracer:
+    """Returns the process-wide hop tracer for a family, raising PermissionError without raw-socket rights."""
+    with _icmp_socket_lock:
+        if family not in _hop_tracers:
+            _hop_tracers[family] = HopTracer(family)
+        return _hop_tracers[family]
+
+def _tcp_result(port: int, latency: Optional[float], error: Optional[str]) -> "ProbeResult":
+    """Formats a TCP connect outcome as a (latency, success, message) result."""
+    if latency is None:
+        return ProbeResult(-1, False, f"[red]Connection to port {port} failed ({error})[/red]")
+    return ProbeResult(latency, True, f"[green]Connection to port {port} successful, latency: {latency:.2f} ms[/green]")
+
+class ProbeResult(tuple):
+    """A ping_function result: unpacks as (latency, success, message) like before.
+
+    `timings` breaks the latency down by phase in ms (e.g. dns, connect,
+    tls, ttfb for HTTP) and stays empty for single-phase probes.
+    """
+
+    def __new__(cls, latency: float, success: bool, message: str, timings: Optional[dict] = None) -> "ProbeResult":
+        result = super().__new__(cls, (latency, success, message))
+        result.timings = timings or {}
+        return result
+
+
+class ProbePlugin:
+    """One probe method, keyed by the `method` stored in saved pings.
+
+    Subclasses implement start(), which begins one probe without blocking and
+    calls back with a ProbeResult from any thread. probe() (for the single
+    target session's ping_function) and probe_async() (for the fleet engine)
+    are built on it; both turn an exception from start() into a failed
+    result, and give up on a callback that has not come PROBE_RESULT_GRACE
+    after `timeout`. Register new methods with register_probe().
+    """
+    method = ""
+    label = ""
+    default_port: Optional[int] = None
+    needs_port = False
+    query_prompt = ""
+    timeout: float = ICMP_TIMEOUT
+
+    def start(self, target: "Target", callback: callable) -> None:
+        raise NotImplementedError
+
+    def describe(self, target: "Target") -> str:
+        """The method as shown in the ping view header."""
+        return f"{self.label} (Port {port_of(target)})" if port_of(target) else self.label
+
+    def probe(self, target: "Target") -> ProbeResult:
+        """Runs one probe and blocks until its result."""
+        done = threading.Event()
+        result: list = []
+        def on_result(probe_result: ProbeResult) -> None:
+            result.append(probe_result)
+            done.set()
+        try:
+            self.start(target, on_result)
+        except Exception as e:
+            return self._failed(target, type(e).__name__)
+        if not done.wait(self.timeout + PROBE_RESULT_GRACE):
+            return self._failed(target, "no result")
+        return result[0]
+
+    async def probe_async(self, target: "Target") -> ProbeResult:
+        """Runs one probe and awaits its result."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        def on_result(probe_result: ProbeResult) -> None:
+            handed = time.perf_counter()
+            try:
+                loop.call_soon_threadsafe(lambda: future.done() or future.set_result((probe_result, handed)))
+            except RuntimeError:
+                # The loop shut down while the probe was pending.
+                pass
+        try:
+            self.start(target, on_result)
+            probe_result, handed = await asyncio.wait_for(future, self.timeout + PROBE_RESULT_GRACE)
+        except asyncio.TimeoutError:
+            return self._failed(target, "no result")
+        except Exception as e:
+            return self._failed(target, type(e).__name__)
+        if _self_stats:
+            _self_stats.observe("wait", (time.perf_counter() - handed) * 1000)
+        return probe_result
+
+    def _failed(self, target: "Target", error: str) -> ProbeResult:
+        return ProbeResult(-1, False, f"[red]{self.label} probe of {target.host} failed ({error})[/red]")
+
+_probe_plugins: dict = {}
+
+def register_probe(plugin: ProbePlugin) -> ProbePlugin:
+    """Makes a probe method available to saved pings, the fleet engine and 'run'."""
+    _probe_plugins[plugin.method] = plugin
+    return plugin
+
+def get_probe(method: str) -> Optional[ProbePlugin]:
+    """Returns the plugin for a method name, or None if it is unknown."""
+    return _probe_plugins.get(method.upper())
+
+def probe_methods() -> List[str]:
+    """Names of every registered probe method."""
+    return list(_probe_plugins)
+
+def port_of(target: "Target") -> Optional[int]:
+    """The target's port, or its method's default port."""
+    if target.port:
+        return target.port
+    plugin = get_probe(target.method)
+    return plugin.default_port if plugin else None
+
+def is_probeable(entry: dict) -> bool:
+    """Whether a saved-ping entry has a known method and every field that method needs."""
+    plugin = get_probe(entry.get("method") or "ICMP")
+    return bool(entry.get("host")) and plugin is not None and (not plugin.needs_port or bool(entry.get("port")))
+
+def make_probe_executor(target: "Target") -> callable:
+    """Returns a ping_function that probes the target's current IP with its method's plugin."""
+    plugin = get_probe(target.method)
+    return lambda: plugin.probe(target)
+
+_blocking_probe_pool = None
+
+def get_blocking_probe_pool():
+    """Thread pool for probes that can only block (pythonping, HTTP), created on first use."""
+    global _blocking_probe_pool
+    with _icmp_socket_lock:
+        if _blocking_probe_pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+            _blocking_probe_pool = ThreadPoolExecutor(max_workers=HTTP_WORKERS, thread_name_prefix="blocking-probe")
+    return _blocking_probe_pool
+
+class PythonpingProbe(ProbePlugin):
+    """ICMP through pythonping on the blocking pool; the fallback when ICMP sockets are not permitted."""
+    method = "ICMP"
+    label = "ICMP Echo"
+
+    def start(self, target: "Target", callback: callable) -> None:
+        ip_address = target.ip_address
+        def run() -> None:
+            from pythonping import ping
+            try:
+                result = ping(ip_address, timeout=ICMP_TIMEOUT, count=1)
+                callback(_icmp_result(result.rtt_avg_ms if result.success() else None))
+            except Exception:
+                callback(_icmp_result(None))
+        get_blocking_probe_pool().submit(run)
+
+class IcmpProbe(ProbePlugin):
+    """ICMP echo over the shared ICMP socket."""
+    method = "ICMP"
+    label = "ICMP Echo"
+
+    def __init__(self) -> None:
+        self.fallback = PythonpingProbe()
+
+    def start(self, target: "Target", callback: callable) -> None:
+        icmp = get_icmp_socket(address_family(target.ip_address))
+        if icmp is None:
+            self.fallback.start(target, callback)
+            return
+        icmp.send(target.ip_address, ICMP_TIMEOUT, lambda latency: callback(_icmp_result(latency)))
+
+class TcpProbe(ProbePlugin):
+    """TCP connect through the shared connect pool."""
+    method = "TCP"
+    label = "TCP Connect"
+    needs_port = True
+    timeout = TCP_TIMEOUT
+
+    def start(self, target: "Target", callback: callable) -> None:
+        port = target.port
+        get_tcp_probe_pool().connect(target.ip_address, port, TCP_TIMEOUT,
+                                     lambda latency, error: callback(_tcp_result(port, latency, error)))
+
+class DatagramSocket:
+    """One unconnected UDP socket shared by every probe of a kind, with replies matched by key.
+
+    `key_of(data, address)` extracts the key a reply answers (None to ignore
+    it); probes without a reply by their deadline are failed from a heap. As
+    with the ICMP socket, a probe costs one sendto and one dict lookup.
+    """
+
+    def __init__(self, family: int, key_of: callable) -> None:
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+        except OSError:
+            pass
+        self.key_of = key_of
+        self.pending: dict = {}
+        self.timeouts: List[tuple] = []
+        self.sequence = 0
+        self.lock = threading.Lock()
+        self.wake_reader, self.wake_writer = socket.socketpair()
+        self.wake_reader.setblocking(False)
+        self.thread = threading.Thread(target=self._receive_loop, name="udp-receiver", daemon=True)
+        self.thread.start()
+
+    def send(self, address: tuple, payload: bytes, key, timeout: float, callback: callable) -> None:
+        """Sends one datagram; callback receives (latency_ms, reply) or (None, error_name)."""
+        self_stats = _self_stats
+        if self_stats:
+            send_start = time.perf_counter()
+        deadline = time.perf_counter() + timeout
+        with self.lock:
+            self.sequence += 1
+            self.pending[key] = (address[0], time.perf_counter(), callback, self.sequence)
+            first = not self.timeouts or deadline < self.timeouts[0][0]
+            heapq.heappush(self.timeouts, (deadline, self.sequence, key))
+        try:
+            self.sock.sendto(payload, address)
+        except OSError as e:
+            with self.lock:
+                entry = self.pending.pop(key, None)
+            if entry:
+                callback(None, type(e).__name__)
+            return
+        if first:
+            try:
+                self.wake_writer.send(b"\0")
+            except OSError:
+                pass
+        if self_stats:
+            self_stats.observe("send", (time.perf_counter() - send_start) * 1000)
+
+    def _receive_loop(self) -> None:
+        while True:
+            with self.lock:
+                wait = max(self.timeouts[0][0] - time.perf_counter(), 0) if self.timeouts else None
+            readable = select.select([self.sock, self.wake_reader], [], [], wait)[0]
+            if self.wake_reader in readable:
+                try:
+                    while self.wake_reader.recv(4096):
+                        pass
+                except OSError:
+                    pass
+            if self.sock in readable:
+                while True:
+                    try:
+                        data, address = self.sock.recvfrom(4096)
+                    except OSError:
+                        break
+                    received = time.perf_counter()
+                    key = self.key_of(data, address)
+                    with self.lock:
+                        entry = self.pending.get(key)
+                        if entry and entry[0] == address[0]:
+                            del self.pending[key]
+                        else:
+                            entry = None
+                    if _self_stats:
+                        _self_stats.observe("parse", (time.perf_counter() - received) * 1000)
+                    if entry:
+                        entry[2]((received - entry[1]) * 1000, data)
+            expired = []
+            now = time.perf_counter()
+            with self.lock:
+                while self.timeouts and self.timeouts[0][0] <= now:
+                    _, sequence, key = heapq.heappop(self.timeouts)
+                    entry = self.pending.get(key)
+                    if entry and entry[3] == sequence:
+                        del self.pending[key]
+                        expired.append(entry[2])
+            for callback in expired:
+                callback(None, "TimeoutError")
+
+class UdpEchoProbe(ProbePlugin):
+    """UDP echo (RFC 862): a numbered datagram that the far end sends back unchanged."""
+    method = "UDP"
+    label = "UDP Echo"
+    default_port = 7
+    timeout = UDP_TIMEOUT
+    PREFIX = b"sry-ping"
+
+    def __init__(self) -> None:
+        self.sockets: dict = {}
+        self.lock = threading.Lock()
+        self.sequence = 0
+
+    @classmethod
+    def _key_of(cls, data: bytes, address: tuple) -> Optional[int]:
+        if len(data) == len(cls.PREFIX) + 8 and data.startswith(cls.PREFIX):
+            return struct.unpack_from("!Q", data, len(cls.PREFIX))[0]
+        return None
+
+    def start(self, target: "Target", callback: callable) -> None:
+        port = port_of(target)
+        family = address_family(target.ip_address)
+        with self.lock:
+            if family not in self.sockets:
+                self.sockets[family] = DatagramSocket(family, self._key_of)
+            sock = self.sockets[family]
+            self.sequence += 1
+            sequence = self.sequence
+        def on_reply(latency: Optional[float], reply) -> None:
+            if latency is None:
+                callback(ProbeResult(-1, False, f"[red]UDP echo to port {port} failed ({reply})[/red]"))
+            else:
+                callback(ProbeResult(latency, True, f"[green]UDP echo from port {port}, latency: {latency:.2f} ms[/green]"))
+        sock.send((target.ip_address, port), self.PREFIX + struct.pack("!Q", sequence), sequence, UDP_TIMEOUT, on_reply)
+
+class DnsProbe(ProbePlugin):
+    """Query RTT of a DNS server, over one reused UDP socket.
+
+    The target's host is the server; its `query` is the name looked up
+    (default '.', type NS, which any resolver answers from cache). A reply
+    with NOERROR or NXDOMAIN counts as success.
+    """
+    method = "DNS"
+    label = "DNS Query"
+    default_port = 53
+    query_prompt = "name to look up (blank for '.')"
+    timeout = DNS_TIMEOUT
+    RCODES = {0: "NOERROR", 1: "FORMERR", 2: "SERVFAIL", 3: "NXDOMAIN", 4: "NOTIMP", 5: "REFUSED"}
+
+    def __init__(self) -> None:
+        self.sockets: dict = {}
+        self.lock = threading.Lock()
+        self.query_id = 0
+
+    @staticmethod
+    def _key_of(data: bytes, address: tuple) -> Optional[tuple]:
+        if len(data) < 12 or not data[2] & 0x80:
+            return None
+        return struct.unpack_from("!H", data)[0], address[0]
+
+    @staticmethod
+    def build_query(query_id: int, name: str, qtype: int) -> bytes:
+        """A recursive query for one name (RFC 1035 wire format)."""
+        labels = b"".join(bytes([len(label)]) + label.encode("idna") for label in name.strip(".").split(".") if label)
+        return struct.pack("!HHHHHH", query_id, 0x0100, 1, 0, 0, 0) + labels + b"\0" + struct.pack("!HH", qtype, 1)
+
+    def start(self, target: "Target", callback: callable) -> None:
+        name = target.query or "."
+        qtype = 2 if name == "." else 28 if address_family(target.ip_address) == socket.AF_INET6 else 1
+        family = address_family(target.ip_address)
+        with self.lock:
+            if family not in self.sockets:
+                self.sockets[family] = DatagramSocket(family, self._key_of)
+            sock = self.sockets[family]
+            for _ in range(0x10000):
+                self.query_id = (self.query_id + 1) & 0xFFFF
+                if (self.query_id, target.ip_address) not in sock.pending:
+                    break
+            query_id = self.query_id
+        def on_reply(latency: Optional[float], reply) -> None:
+            if latency is None:
+                callback(ProbeResult(-1, False, f"[red]DNS query for {name} failed ({reply})[/red]"))
+                return
+            rcode = reply[3] & 0x0F
+            answers = struct.unpack_from("!H", reply, 6)[0]
+            status = self.RCODES.get(rcode, f"RCODE {rcode}")
+            if rcode in (0, 3):
+                callback(ProbeResult(latency, True, f"[green]DNS {status} for {name} ({answers} answers), "
+                                                    f"latency: {latency:.2f} ms[/green]"))
+            else:
+                callback(ProbeResult(-1, False, f"[red]DNS query for {name} failed ({status})[/red]"))
+        sock.send((target.ip_address, port_of(target)), self.build_query(query_id, name, qtype),
+                  (query_id, target.ip_address), DNS_TIMEOUT, on_reply)
+
+class HttpProbe(ProbePlugin):
+    """HTTP GET timed by phase, over pooled keep-alive connections.
+
+    A fresh connection reports dns (getaddrinfo), connect, tls (HTTPS) and
+    ttfb (request sent to response headers); a reused one only ttfb. The body
+    is drained so the connection can be reused. Statuses below 400 count as
+    success. The target's `query` is the request path (default '/').
+    """
+    method = "HTTP"
+    label = "HTTP GET"
+    default_port = 80
+    query_prompt = "request path (blank for '/')"
+    # Connect, TLS and the response each get HTTP_TIMEOUT.
+    timeout = 3 * HTTP_TIMEOUT
+    tls = False
+
+    def __init__(self) -> None:
+        self.idle: dict = {}
+        self.lock = threading.Lock()
+        self.context = None
+
+    def _connect(self, target: "Target", port: int, timings: dict):
+        import http.client
+        start = time.perf_counter()
+        address = socket.getaddrinfo(target.host, port, type=socket.SOCK_STREAM)[0][4]
+        connected = time.perf_counter()
+        timings["dns"] = (connected - start) * 1000
+        sock = socket.create_connection(address[:2], HTTP_TIMEOUT)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        timings["connect"] = (time.perf_counter() - connected) * 1000
+        if self.tls:
+            import ssl
+            if self.context is None:
+                self.context = ssl.create_default_context()
+            handshake = time.perf_counter()
+            try:
+                sock = self.context.wrap_socket(sock, server_hostname=target.host)
+            except Exception:
+                sock.close()
+                raise
+            timings["tls"] = (time.perf_counter() - handshake) * 1000
+        connection = http.client.HTTPConnection(target.host, port, timeout=HTTP_TIMEOUT)
+        connection.sock = sock
+        return connection
+
+    def _request(self, target: "Target") -> ProbeResult:
+        import http.client
+        port = port_of(target)
+        key = (target.host, port)
+        path = target.query or "/"
+        with self.lock:
+            idle = self.idle.get(key)
+            connection = idle.pop() if idle else None
+        for attempt in (0, 1):
+            timings: dict = {}
+            reused = connection is not None
+            try:
+                if connection is None:
+                    connection = self._connect(target, port, timings)
+                sent = time.perf_counter()
+                connection.request("GET", path, headers={"User-Agent": f"Sry-Ping/{VERSION}", "Connection": "keep-alive"})
+                response = connection.getresponse()
+                timings["ttfb"] = (time.perf_counter() - sent) * 1000
+                remaining = HTTP_MAX_BODY
+                while remaining > 0:
+                    chunk = response.read(min(remaining, 65536))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                break
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError) as e:
+                if connection:
+                    connection.close()
+                connection = None
+                if reused and attempt == 0:
+                    # The server closed an idle pooled connection; retry once on a fresh one.
+                    continue
+                return ProbeResult(-1, False, f"[red]HTTP request to {target.host} failed ({type(e).__name__})[/red]")
+            except (OSError, http.client.HTTPException) as e:
+                if connection:
+                    connection.close()
+                return ProbeResult(-1, False, f"[red]HTTP request to {target.host} failed ({type(e).__name__})[/red]")
+        if response.isclosed() and not response.will_close:
+            with self.lock:
+                idle = self.idle.setdefault(key, [])
+                if len(idle) < HTTP_POOL_SIZE:
+                    idle.append(connection)
+                    connection = None
+        if connection:
+            connection.close()
+        latency = sum(timings.values())
+        breakdown = ", ".join(f"{phase} {ms:.2f}" for phase, ms in timings.items())
+        if response.status >= 400:
+            return ProbeResult(-1, False, f"[red]HTTP {response.status} {response.reason} from {target.host}[/red]", timings)
+        return ProbeResult(latency, True, f"[green]HTTP {response.status} {response.reason} from {target.host}, "
+                                          f"latency: {latency:.2f} ms ({breakdown})[/green]", timings)
+
+    def start(self, target: "Target", callback: callable) -> None:
+        def run() -> None:
+            try:
+                result = self._request(target)
+            except Exception as e:
+                result = self._failed(target, type(e).__name__)
+            callback(result)
+        get_blocking_probe_pool().submit(run)
+
+class HttpsProbe(HttpProbe):
+    """HttpProbe over TLS, verified against the system trust store."""
+    method = "HTTPS"
+    label = "HTTPS GET"
+    default_port = 443
+    tls = True
+
+for _plugin in (IcmpProbe(), TcpProbe(), UdpEchoProbe(), DnsProbe(), HttpProbe(), HttpsProbe()):
+    register_probe(_plugin)
+
+class AdaptiveInterval:
+    """Per-target probe-interval policy: back off while stable, burst on loss or RTT shifts.
+
+    After ADAPTIVE_STABLE_PROBES clean results in a row the interval doubles,
+    up to ADAPTIVE_MAX_BACKOFF times the configured one. The first failure of
+    an outage, the first success after one, or a change event from the
+    target's detectors (burst(), called by the engine's change hook) drops it
+    to the burst interval for ADAPTIVE_BURST_PROBES probes before it returns
+    to the configured one. RTT shifts are left to the CUSUM detector, which
+    only reacts to a sustained shift, so heavy-tailed jitter does not keep
+    cancelling the back-off. A target that stays down is probed at the
+    configured interval, not at the burst rate.
+    """
+    __slots__ = ("base", "floor", "ceiling", "interval", "stable", "burst_left", "failing")
+
+    def __init__(self, base: float, max_rate: float = ADAPTIVE_MAX_RATE) -> None:
+        self.base = base
+        self.floor = min(base, 1.0 / max_rate)
+        self.ceiling = base * ADAPTIVE_MAX_BACKOFF
+        self.interval = base
+        self.stable = 0
+        self.burst_left = 0
+        self.failing = False
+
+    def update(self, latency: float, success: bool) -> Optional[float]:
+        """Feeds one probe result; returns the new interval when it changes, else None."""
+        anomaly = success == self.failing
+        self.failing = not success
+        if anomaly:
+            return self.burst()
+        if self.burst_left:
+            self.burst_left -= 1
+            return None if self.burst_left else self._set(self.base)
+        if not success:
+            return None
+        self.stable += 1
+        if self.stable >= ADAPTIVE_STABLE_PROBES and self.interval < self.ceiling:
+            self.stable = 0
+            return self._set(min(self.interval * 2, self.ceiling))
+        return None
+
+    def burst(self) -> Optional[float]:
+        """Switches to the burst interval for the next ADAPTIVE_BURST_PROBES probes."""
+        self.burst_left = ADAPTIVE_BURST_PROBES
+        self.stable = 0
+        return self._set(self.floor)
+
+    def _set(self, interval: float) -> Optional[float]:
+        if interval == self.interval:
+            return None
+        self.interval = interval
+        return interval
+
+class ProbeScheduler:
+    """Deadline-driven timer heap on time.monotonic_ns() (or an injected nanosecond `clock`).
+
+    Each item fires every `interval` seconds measured from its previous
+    deadline, not from when its last probe finished, so probe duration never
+    stretches the interval. New items are phase-spread with a golden-ratio
+    sequence so thousands of targets do not fire in the same millisecond.
+    Send-time skew (actual send minus deadline) is tracked in `skew`, and the
+    scheduled probes/sec (now and at the intervals items were added with) in
+    `rate` and `base_rate`.
+    """
+    GOLDEN_RATIO = 0.6180339887498949
+
+    def __init__(self, clock: callable = time.monotonic_ns) -> None:
+        self.clock = clock
+        self.heap: List[tuple] = []
+        self.entries: dict = {}
+        self.sequence = 0
+        self.added = 0
+        self.skew = RunningStats()
+        self.skipped = 0
+        self.rate = 0.0
+        self.base_rate = 0.0
+
+    def add(self, item, interval: float, phase: Optional[float] = None) -> None:
+        """Schedules an item; phase is a fraction of the interval (spread automatically if omitted)."""
+        if phase is None:
+            phase = (self.added * self.GOLDEN_RATIO) % 1.0
+        self.added += 1
+        interval_ns = int(interval * 1e9)
+        self.remove(item)
+        self.base_rate += 1e9 / interval_ns
+        self._push(item, self.clock() + int(phase * interval_ns), interval_ns, interval_ns)
+
+    def _push(self, item, deadline_ns: int, interval_ns: int, base_ns: int) -> None:
+        self.sequence += 1
+        previous = self.entries.get(item)
+        if previous:
+            self.rate -= 1e9 / previous[0]
+        self.rate += 1e9 / interval_ns
+        self.entries[item] = (interval_ns, self.sequence, deadline_ns, base_ns)
+        heapq.heappush(self.heap, (deadline_ns, self.sequence, item))
+
+    def remove(self, item) -> None:
+        """Stops scheduling an item."""
+        entry = self.entries.pop(item, None)
+        if entry:
+            self.rate -= 1e9 / entry[0]
+            self.base_rate -= 1e9 / entry[3]
+
+    def set_interval(self, item, interval: float) -> None:
+        """Changes an item's interval; its next deadline moves no later than one new interval from now."""
+        entry = self.entries.get(item)
+        if entry is None:
+            return
+        interval_ns = int(interval * 1e9)
+        deadline_ns = self.deadline_of(item)
+        now = self.clock()
+        if deadline_ns is None or deadline_ns > now + interval_ns:
+            deadline_ns = now + interval_ns
+        self._push(item, deadline_ns, interval_ns, entry[3])
+
+    def interval_of(self, item) -> Optional[float]:
+        """Returns an item's current interval in seconds."""
+        entry = self.entries.get(item)
+        return entry[0] / 1e9 if entry else None
+
+    def deadline_of(self, item) -> Optional[int]:
+        """Returns the pending deadline of an item."""
+        entry = self.entries.get(item)
+        return entry[2] if entry else None
+
+    def next_deadline_ns(self) -> Optional[int]:
+        """Returns the earliest pending deadline, or None if nothing is scheduled."""
+        while self.heap:
+            deadline_ns, sequence, item = self.heap[0]
+            entry = self.entries.get(item)
+            if entry and entry[1] == sequence:
+                return deadline_ns
+            heapq.heappop(self.heap)
+        return None
+
+    def pop_due(self, now_ns: int) -> List[tuple]:
+        """Returns (item, deadline_ns) for every item due by now_ns and schedules their next deadline."""
+        due = []
+        while self.heap and self.heap[0][0] <= now_ns:
+            deadline_ns, sequence, item = heapq.heappop(self.heap)
+            entry = self.entries.get(item)
+            if not entry or entry[1] != sequence:
+                continue
+            interval_ns = entry[0]
+            due.append((item, deadline_ns))
+            next_ns = deadline_ns + interval_ns
+            if next_ns <= now_ns:
+                # Skip the ticks we overran instead of firing them in a burst.
+                missed = (now_ns - next_ns) // interval_ns + 1
+                self.skipped += missed
+                next_ns += missed * interval_ns
+            self._push(item, next_ns, interval_ns, entry[3])
+        return due
+
+    def record_send(self, deadline_ns: int) -> float:
+        """Records the skew of a probe sent now for the given deadline and returns it in ms."""
+        skew_ms = max(self.clock() - deadline_ns, 0) / 1e6
+        self.skew.add(skew_ms, True)
+        return skew_ms
+
+    def metrics_lines(self) -> List[str]:
+        """Exposition lines for the send-time skew."""
+        skew = self.skew
+        lines = ["# HELP sryping_schedule_skew_seconds Delay between a probe's deadline and its send.",
+                 "# TYPE sryping_schedule_skew_seconds summary"]
+        if skew.count:
+            for q in (0.5, 0.9, 0.99):
+                lines.append(f'sryping_schedule_skew_seconds{{quantile="{q}"}} {skew.sketch.quantile(q) / 1000:.6f}')
+        lines.append(f"sryping_schedule_skew_seconds_sum {skew.mean * skew.count / 1000:.6f}")
+        lines.append(f"sryping_schedule_skew_seconds_count {skew.count}")
+        lines.append("# HELP sryping_schedule_skipped_total Probe ticks skipped because a target overran its slot.")
+        lines.append("# TYPE sryping_schedule_skipped_total counter")
+        lines.append(f"sryping_schedule_skipped_total {self.skipped}")
+        lines.append("# HELP sryping_probe_rate Scheduled probes per second.")
+        lines.append("# TYPE sryping_probe_rate gauge")
+        lines.append(f"sryping_probe_rate {self.rate:.3f}")
+        lines.append("# HELP sryping_probe_rate_baseline Probes per second at the configured intervals.")
+        lines.append("# TYPE sryping_probe_rate_baseline gauge")
+        lines.append(f"sryping_probe_rate_baseline {self.base_rate:.3f}")
+        return lines
+
+class FleetEngine:
+    """Probes every target concurrently, each on its own interval, on one event loop."""
+
+    def __init__(self, targets: List[Target], max_in_flight: int = FLEET_MAX_IN_FLIGHT,
+                 max_rate: float = FLEET_MAX_RATE, on_result: Optional[callable] = None,
+                 adaptive: bool = False, adaptive_max_rate: float = ADAPTIVE_MAX_RATE,
+                 result_log: Optional[ResultLog] = None, clock: callable = time.monotonic_ns) -> None:
+        self.targets = targets
+        for target in targets:
+            target.result_log = result_log
+        self.max_in_flight = max_in_flight
+        self.max_rate = max_rate
+        self.on_result = on_result
+        self.adaptive = adaptive
+        self.adaptive_max_rate = min(adaptive_max_rate, max_rate)
+        self.policies: dict = {}
+        self.in_flight = 0
+        self.scheduler = ProbeScheduler(clock)
+        self.dns_changes = 0
+        self.last_dns_change = ""
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop: Optional[asyncio.Event] = None
+
+    def stop(self) -> None:
+        """Asks a running engine to shut down; safe to call from any thread."""
+        if self._loop and self._stop:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    async def run(self) -> None:
+        """Resolves all targets, then probes them until stop() is called."""
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        resolver = get_resolver()
+        await asyncio.gather(*(self._resolve(t) for t in self.targets))
+        watches = [resolver.watch(t.host, self._on_dns_change) for t in self.targets if t.ip_address]
+
+        for target in self.targets:
+            if target.ip_address:
+                interval = max(target.interval, 1.0 / self.max_rate)
+                self.scheduler.add(target, interval)
+                if self.adaptive:
+                    self.policies[target] = AdaptiveInterval(interval, self.adaptive_max_rate)
+        self._wakeup = asyncio.Event()
+        self._busy: set = set()
+        self._tasks: set = set()
+        if self.adaptive:
+            get_change_monitor().add_hook(self._on_change)
+        dispatcher = asyncio.create_task(self._dispatch())
+        try:
+            await self._stop.wait()
+        finally:
+            get_change_monitor().remove_hook(self._on_change)
+            dispatcher.cancel()
+            for task in list(self._tasks):
+                task.cancel()
+            await asyncio.gather(dispatcher, *self._tasks, return_exceptions=True)
+            for watch in watches:
+                resolver.unwatch(watch)
+
+    async def _resolve(self, target: Target) -> None:
+        """Resolves a target's host on the resolver pool without blocking the loop."""
+        try:
+            target.ip_address = await asyncio.wrap_future(get_resolver().resolve_async(target.host))
+        except (socket.gaierror, OSError):
+            target.ip_address = None
+
+    def _on_dns_change(self, host: str, old_ip: Optional[str], new_ip: Optional[str]) -> None:
+        """Points every target of a host at its new address."""
+        if not new_ip:
+            return
+        for target in self.targets:
+            if target.host == host:
+                target.ip_address = new_ip
+        self.dns_changes += 1
+        self.last_dns_change = f"{host}: {old_ip} -> {new_ip}"
+
+    def _on_change(self, event: ChangeEvent) -> None:
+        """Bursts a target whose detectors saw a change (runs on the loop, inside Target.record)."""
+        policy = self.policies.get(event.target)
+        if policy:
+            interval = policy.burst()
+            if interval:
+                self.reschedule(event.target, interval)
+
+    def reschedule(self, target: Target, interval: float) -> None:
+        """Changes a target's probe interval; must be called on the engine's loop."""
+        self.scheduler.set_interval(target, max(interval, 1.0 / self.max_rate))
+        self._wakeup.set()
+
+    async def _dispatch(self) -> None:
+        """Sleeps until the earliest deadline and starts every probe that is due."""
+        while True:
+            next_ns = self.scheduler.next_deadline_ns()
+            delay = (next_ns - self.scheduler.clock()) / 1e9 if next_ns is not None else None
+            if delay is None or delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            for target, deadline_ns in self.scheduler.pop_due(self.scheduler.clock()):
+                if target in self._busy:
+                    # The previous probe is still waiting for its timeout.
+                    self.scheduler.skipped += 1
+                    continue
+                self._busy.add(target)
+                task = asyncio.create_task(self._run_probe(target, deadline_ns))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _run_probe(self, target: Target, deadline_ns: int) -> None:
+        """Runs one scheduled probe under the in-flight cap and records its result."""
+        try:
+            async with self._semaphore:
+                skew_ms = self.scheduler.record_send(deadline_ns)
+                self.in_flight += 1
+                try:
+                    result = await self._probe(target)
+                finally:
+                    self.in_flight -= 1
+            latency, success, message = result
+            self_stats = _self_stats
+            if self_stats:
+                self_stats.observe("schedule", skew_ms)
+                record_start = time.perf_counter()
+            target.record(latency, success)
+            if self.on_result:
+                self.on_result(target, latency, success, message, result.timings)
+            policy = self.policies.get(target)
+            if policy:
+                interval = policy.update(latency, success)
+                if interval:
+                    self.reschedule(target, interval)
+            if self_stats:
+                self_stats.observe("record", (time.perf_counter() - record_start) * 1000)
+        finally:
+            self._busy.discard(target)
+
+    async def _probe(self, target: Target) -> ProbeResult:
+        """Runs one probe for a target with its method's plugin."""
+        return await get_probe(target.method).probe_async(target)
+
+class ShardedFleet:
+    """Splits a fleet across worker processes, each running its own FleetEngine.
+
+    Every SHARD_REPORT_INTERVAL a worker sends one batch over its pipe: a
+    RunningStats snapshot of each target that recorded a probe since the last
+    batch, metrics histogram deltas and pre-formatted JSONL lines. This
+    process only merges batches, renders and exports, so probing, parsing and
+    statistics scale with the number of workers. Exposes the same attributes
+    as FleetEngine for the dashboard and the metrics collector.
+    """
+
+    def __init__(self, targets: List[Target], workers: int, max_in_flight: int = FLEET_MAX_IN_FLIGHT,
+                 max_rate: float = FLEET_MAX_RATE, metrics: Optional[MetricsRegistry] = None, jsonl=None,
+                 adaptive: bool = False, adaptive_max_rate: float = ADAPTIVE_MAX_RATE) -> None:
+        self.targets = targets
+        self.workers = max(min(workers, len(targets)), 1)
+        self.max_in_flight = max_in_flight
+        self.max_rate = max_rate
+        self.adaptive = adaptive
+        self.adaptive_max_rate = adaptive_max_rate
+        self.metrics = metrics
+        self.jsonl = jsonl
+        self.in_flight = 0
+        # Only holds the merged skew of all shards; the shards do the scheduling.
+        self.scheduler = ProbeScheduler()
+        self.dns_changes = 0
+        self.last_dns_change = ""
+        self.shard_states: dict = {}
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """Asks the workers to shut down; safe to call from any thread."""
+        self._stop.set()
+
+    async def run(self) -> None:
+        """Starts the workers and merges their batches until stop() is called."""
+        await asyncio.get_running_loop().run_in_executor(None, self._serve)
+
+    def _options(self, shard: int) -> dict:
+        """Settings a worker cannot inherit from a spawned interpreter."""
+        source_ports = parse_port_range(tcp_source_ports)
+        if source_ports:
+            # Each worker binds its own slice of the range instead of racing for the same ports.
+            low, high = source_ports
+            size = (high - low + 1) // self.workers
+            if size:
+                source_ports = (low + shard * size, low + (shard + 1) * size - 1)
+        result_log = get_result_log()
+        return {"tcp_source_ports": f"{source_ports[0]}-{source_ports[1]}" if source_ports else "",
+                "log_dir": result_log.directory if result_log else None,
+                "buckets_ms": tuple(self.metrics.bounds) if self.metrics else None,
+                "jsonl": self.jsonl is not None,
+                "max_in_flight": self.max_in_flight,
+                "max_rate": self.max_rate,
+                "adaptive": self.adaptive,
+                "adaptive_max_rate": self.adaptive_max_rate,
+                "self_stats": _self_stats is not None,
+                "profile": f"{profile_path}.{shard}" if profile_path else None}
+
+    def _serve(self) -> None:
+        import multiprocessing
+        from multiprocessing.connection import wait
+        result_log = get_result_log()
+        if result_log:
+            # Register every target up front so the workers share one id map.
+            for target in self.targets:
+                result_log.target_id(target)
+        context = multiprocessing.get_context("spawn")
+        connections = {}
+        processes = []
+        for shard in range(self.workers):
+            entries = [(index, {"name": t.name, "host": t.host, "method": t.method, "port": t.port, "interval": t.interval,
+                                 "query": t.query})
+                       for index, t in enumerate(self.targets) if index % self.workers == shard]
+            parent_end, child_end = context.Pipe()
+            process = context.Process(target=_shard_main, args=(shard, entries, self._options(shard), child_end),
+                                      name=f"sryping-shard-{shard}", daemon=True)
+            process.start()
+            child_end.close()
+            connections[parent_end] = shard
+            processes.append(process)
+
+        stopping = False
+        while connections:
+            if self._stop.is_set() and not stopping:
+                stopping = True
+                for connection in connections:
+                    try:
+                        connection.send("stop")
+                    except OSError:
+                        pass
+            for connection in wait(list(connections), 0.1):
+                try:
+                    batch = connection.recv()
+                except (EOFError, OSError):
+                    batch = None
+                if batch is None:
+                    del connections[connection]
+                    connection.close()
+                    continue
+                self._merge(*batch)
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    def _merge(self, shard: int, updates: list, series: list, text: str, state: tuple, changes: list,
+               stages: dict) -> None:
+        """Applies one worker batch to the local targets, metrics, outputs, change hooks and self-stats."""
+        self_stats = _self_stats
+        if self_stats:
+            merge_start = time.perf_counter()
+            self_stats.merge(stages)
+        targets = self.targets
+        for index, ip_address, stats in updates:
+            target = targets[index]
+            target.ip_address = ip_address
+            target.stats = stats
+            target.version += 1
+        if self.metrics:
+            for index, delta in series:
+                self.metrics.merge(targets[index], delta)
+        if text and self.jsonl is not None:
+            self.jsonl.write(text)
+            self.jsonl.flush()
+        monitor = get_change_monitor()
+        for index, kind, timestamp, before, after in changes:
+            monitor.emit(ChangeEvent(kind, targets[index], timestamp, before, after))
+
+        self.shard_states[shard] = state
+        states = list(self.shard_states.values())
+        skew = RunningStats()
+        for _, shard_skew, *_ in states:
+            skew.merge(shard_skew)
+        self.scheduler.skew = skew
+        self.scheduler.skipped = sum(s[2] for s in states)
+        self.scheduler.rate = sum(s[5] for s in states)
+        self.scheduler.base_rate = sum(s[6] for s in states)
+        self.in_flight = sum(s[0] for s in states)
+        self.dns_changes = sum(s[3] for s in states)
+        if state[4]:
+            self.last_dns_change = state[4]
+        if self_stats:
+            self_stats.observe("merge", (time.perf_counter() - merge_start) * 1000)
+
+def _shard_main(shard: int, entries: List[tuple], options: dict, connection) -> None:
+    """Entry point of a fleet worker process."""
+    global result_log_enabled, _result_log, tcp_source_ports
+    import io
+    import signal
+    # Ctrl+C reaches the whole process group; the coordinator decides when workers stop.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    tcp_source_ports = options["tcp_source_ports"]
+    result_log_enabled = options["log_dir"] is not None
+    if result_log_enabled:
+        _result_log = ResultLog(options["log_dir"])
+    if options["self_stats"]:
+        enable_self_stats()
+    sampler = StackSampler().start() if options["profile"] else None
+    targets = [Target.from_config(entry) for _, entry in entries]
+    indexes = [index for index, _ in entries]
+    registry = MetricsRegistry(options["buckets_ms"], max_series=math.inf) if options["buckets_ms"] else None
+    buffer = io.StringIO() if options["jsonl"] else None
+    sink = JsonlSink(buffer) if buffer else None
+    engine = FleetEngine(targets, max_in_flight=options["max_in_flight"], max_rate=options["max_rate"],
+                         on_result=fan_out(sink, registry), adaptive=options["adaptive"],
+                         adaptive_max_rate=options["adaptive_max_rate"], result_log=_result_log)
+    try:
+        asyncio.run(_shard_run(shard, engine, indexes, registry, sink, buffer, connection))
+    finally:
+        if _result_log:
+            _result_log.close()
+        if sampler:
+            sampler.stop()
+            sampler.write(options["profile"])
+        connection.close()
+
+async def _shard_run(shard: int, engine: FleetEngine, indexes: List[int], registry: Optional[MetricsRegistry],
+                     sink: Optional["JsonlSink"], buffer, connection) -> None:
+    """Runs a worker's engine and sends a batch to the coordinator every SHARD_REPORT_INTERVAL."""
+    targets = engine.targets
+    reported = [0] * len(targets)
+    index_of = dict(zip(targets, indexes))
+    changes: List[tuple] = []
+
+    def on_change(event: ChangeEvent) -> None:
+        changes.append((index_of[event.target], event.kind, event.timestamp, event.before, event.after))
+
+    get_change_monitor().add_hook(on_change)
+
+    def batch() -> tuple:
+        updates = []
+        series = []
+        for position, target in enumerate(targets):
+            if target.version != reported[position]:
+                reported[position] = target.version
+                updates.append((indexes[position], target.ip_address, target.stats))
+                if registry:
+                    delta = registry.take(target)
+                    if delta:
+                        series.append((indexes[position], delta))
+        text = ""
+        if sink:
+            sink.flush()
+            text = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        scheduler = engine.scheduler
+        state = (engine.in_flight, scheduler.skew, scheduler.skipped, engine.dns_changes, engine.last_dns_change,
+                 scheduler.rate, scheduler.base_rate)
+        events = changes[:]
+        changes.clear()
+        return shard, updates, series, text, state, events, _self_stats.take() if _self_stats else {}
+
+    task = asyncio.create_task(engine.run())
+    try:
+        while not task.done():
+            await asyncio.sleep(SHARD_REPORT_INTERVAL)
+            if connection.poll():
+                break
+            connection.send(batch())
+    except (EOFError, OSError):
+        # The coordinator went away; nothing is left to report to.
+        connection = None
+    finally:
+        engine.stop()
+        await asyncio.gather(task, return_exceptions=True)
+    if connection is not None:
+        try:
+            connection.send(batch())
+            connection.send(None)
+        except OSError:
+            pass
+
+def _start_ping_session(target: Target, method: str, ping_function: callable) -> None:
+    """Handles the generic pinging process, UI, and statistics."""
+    target.result_log = get_result_log()
+    ip_info = {"asn": "[dim]Looking up...[/dim]", "org": "[dim]Looking up...[/dim]"}
+    ip_info_ready = threading.Event()
+    notices: List[str] = []
+
+    def on_ip_info(info: dict) -> None:
+        ip_info.update(info)
+        ip_info_ready.set()
+
+    def on_dns_change(host: str, old_ip: Optional[str], new_ip: Optional[str]) -> None:
+        if new_ip:
+            target.ip_address = new_ip
+            notices.append(f"[bold yellow]DNS change: {host} now resolves to {new_ip} (was {old_ip})[/bold yellow]")
+            ip_info["asn"] = ip_info["org"] = "[dim]Looking up...[/dim]"
+            get_ip_info_cache().lookup_async(new_ip, on_ip_info)
+
+    def print_header() -> None:
+        """Clears the screen and prints the host information panel."""
+        info_table = Table(show_header=False, box=None, padding=(0, 1))
+        info_table.add_column()
+        info_table.add_column()
+        info_table.add_row("[bold white]Host:[/bold white]", target.host, "[bold white]IP:[/bold white]", target.ip_address)
+        info_table.add_row("[bold white]ASN:[/bold white]", ip_info['asn'], "[bold white]Organization:[/bold white]", ip_info['org'])
+        info_table.add_row("[bold white]Method:[/bold white]", method, "[bold white]Mode:[/bold white]", f"[bold]{ping_mode}[/bold]")
+        console.clear()
+        console.print(Panel(info_table, title="Ping Information", border_style="green"))
+        console.print("\n[cyan]Pinging... Press any key to stop.[/cyan]")
+
+    def on_change(event: ChangeEvent) -> None:
+        if event.target is target:
+            notices.append(f"[bold magenta]{time.strftime('%H:%M:%S', time.localtime(event.timestamp))} "
+                              f"{event.describe()}[/bold magenta]")
+            # Runs on the prober thread, inside target.record(), like the scheduler calls around it.
+            if policy:
+                interval = policy.burst()
+                if interval:
+                    scheduler.set_interval(target, interval)
+
+    get_ip_info_cache().lookup_async(target.ip_address, on_ip_info)
+    dns_watch = get_resolver().watch(target.host, on_dns_change)
+    get_change_monitor().add_hook(on_change)
+    print_header()
+
+    stats = target.stats
+    history = target.history
+    extended_ping_count = 0
+
+    def generate_output() -> Panel:
+        """Generates the rich Panel for live display."""
+        stats_table = Table(show_header=True, header_style="bold magenta", box=None)
+        stats_table.add_column("Statistic", justify="right")
+        stats_table.add_column("Value", justify="left")
+        stats_table.add_row("Sent", str(stats.sent))
+        if scheduler.skew.count:
+            stats_table.add_row("  └─ Send Skew", f"{scheduler.skew.mean:.2f} ms avg, {scheduler.skew.max:.2f} ms max")
+        if policy:
+            state = "burst" if policy.burst_left else "backed off" if policy.interval > policy.base else "normal"
+            stats_table.add_row("  └─ Interval", f"{policy.interval:g} s ({state}, {scheduler.rate:.2f} probes/s)")
+        stats_table.add_row("Failed", f"{stats.failed} ([red]{stats.loss_percent:.1f}%[/red])" if stats.sent > 0 else "0")
+        if stats.failure_streak:
+            stats_table.add_row("  └─ Streak", f"[red]{stats.failure_streak} failed in a row[/red]")
+        if stats.count:
+            stats_table.add_row("Latency (ms)", "")
+            stats_table.add_row("  └─ Current", f"{stats.last:.2f}")
+            stats_table.add_row("  └─ Min", f"{stats.min:.2f}")
+            stats_table.add_row("  └─ Max", f"{stats.max:.2f}")
+            stats_table.add_row("  └─ Avg", f"{stats.mean:.2f}")
+            stats_table.add_row("  └─ P50 / P95 / P99", " / ".join(f"{stats.sketch.quantile(q):.2f}" for q in (0.5, 0.95, 0.99)))
+            stats_table.add_row("  └─ Std Dev", f"{stats.stddev:.2f}")
+            stats_table.add_row("  └─ Jitter", f"{stats.jitter:.2f}")
+        if last_timings:
+            stats_table.add_row("Last Breakdown (ms)", "")
+            for phase, ms in list(last_timings.items()):
+                stats_table.add_row(f"  └─ {phase.upper() if len(phase) <= 4 else phase.capitalize()}", f"{ms:.2f}")
+        if stats.sent:
+            now = time.time()
+            stats_table.add_row("Recent (avg ms / loss)", "")
+            for seconds, label in HISTORY_WINDOWS:
+                window = history.window(seconds, now)
+                if window:
+                    avg = f"{window['avg']:.2f}" if window["avg"] is not None else "-"
+                    stats_table.add_row(f"  └─ Last {label}", f"{avg} / [red]{window['loss']:.1f}%[/red]")
+        if _self_stats:
+            stats_table.add_row("Self p50 / p99 (ms)", "")
+            for stage, _, _, p50, p99, _ in _self_stats.rows():
+                stats_table.add_row(f"  └─ {stage.capitalize()}", f"{p50:.3f} / {p99:.3f}")
+        return Panel(stats_table, title="Live Statistics", border_style="yellow", expand=False)
+
+    messages: deque = deque(maxlen=1000)
+    last_timings: dict = {}
+    stop = threading.Event()
+    errors: List[Exception] = []
+
+    scheduler = ProbeScheduler()
+    scheduler.add(target, target.interval, phase=0)
+    policy = AdaptiveInterval(target.interval, adaptive_max_rate) if adaptive_probing else None
+
+    def prober() -> None:
+        """Runs the probes on their own thread, on fixed deadlines, so output and RTT never stretch the interval."""
+        try:
+            while not stop.is_set():
+                wait = (scheduler.next_deadline_ns() - time.monotonic_ns()) / 1e9
+                if wait > 0 and stop.wait(wait):
+                    break
+                for _, deadline_ns in scheduler.pop_due(time.monotonic_ns()):
+                    skew_ms = scheduler.record_send(deadline_ns)
+                    result = ping_function()
+                    latency, success, message = result
+                    if getattr(result, "timings", None):
+                        last_timings.clear()
+                        last_timings.update(result.timings)
+                    self_stats = _self_stats
+                    if self_stats:
+                        self_stats.observe("schedule", skew_ms)
+                        record_start = time.perf_counter()
+                    target.record(latency, success)
+                    if policy:
+                        interval = policy.update(latency, success)
+                        if interval:
+                            scheduler.set_interval(target, interval)
+                    if self_stats:
+                        self_stats.observe("record", (time.perf_counter() - record_start) * 1000)
+                    if ping_mode == "Extended":
+                        messages.append(message)
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    probe_thread = threading.Thread(target=prober, name="prober", daemon=True)
+    probe_thread.start()
+    frame_time = 1 / RENDER_FPS
+    with KeyReader() as keys, Live(generate_output(), console=console, screen=False, auto_refresh=False, vertical_overflow="visible") as live:
+        try:
+            while not stop.is_set():
+                frame_start = time.perf_counter()
+                while messages:
+                    console.print(messages.popleft())
+                    extended_ping_count += 1
+                    if extended_ping_count > 10:
+                        print_header()
+                        extended_ping_count = 1
+
+                while notices:
+                    console.print(notices.pop(0))
+
+                if ip_info_ready.is_set():
+                    # Enrichment arrived after probing started; redraw the header once.
+                    ip_info_ready.clear()
+                    print_header()
+
+                self_stats = _self_stats
+                if self_stats:
+                    render_start = time.perf_counter()
+                live.update(generate_output(), refresh=True)
+                if self_stats:
+                    input_start = time.perf_counter()
+                    self_stats.observe("render", (input_start - render_start) * 1000)
+
+                key = keys.read()
+                if self_stats:
+                    self_stats.observe("input", (time.perf_counter() - input_start) * 1000)
+                if key is not None:
+                    break
+                time.sleep(max(frame_time - (time.perf_counter() - frame_start), 0))
+        finally:
+            stop.set()
+            probe_thread.join(timeout=TCP_TIMEOUT + 1)
+            get_resolver().unwatch(dns_watch)
+            get_change_monitor().remove_hook(on_change)
+            if target.result_log:
+                target.result_log.flush()
+    for e in errors:
+        console.print(f"\n[bold red]Error during ping: {e}[/bold red]")
+
+
+def start_icmp_ping() -> None:
+    """Handles the ICMP pinging process."""
+    console.clear()
+    host = console.input("[bold yellow]Enter the host to ping: [/bold yellow]").strip()
+    target = Target(host, host, "ICMP")
+
+    try:
+        target.ip_address = get_resolver().resolve(host)
+    except socket.gaierror as e:
+        console.print(f"[bold red]Error: Invalid hostname - {e}[/bold red]")
+        time.sleep(3)
+        return
+    except Exception as e:
+        console.print(f"[bold red]An unexpected error occurred: {e}[/bold red]")
+        time.sleep(3)
+        return
+
+    _start_ping_session(target, "ICMP Echo", make_probe_executor(target))
+
+def select_and_start_saved_ping() -> None:
+    """Displays saved pings and prompts user to start one."""
+    if not get_target_store().count():
+        console.clear()
+        console.print("\n[italic yellow]No saved pings yet. Create one from the 'Saved Pings' menu.[/italic yellow]\n")
+        console.print("[cyan]Returning to menu in 3 seconds...[/cyan]")
+        time.sleep(3)
+        return
+    ping_config = choose_saved_ping("Start Saved Ping", "start")
+    if ping_config:
+        start_saved_ping(ping_config)
+
+def start_saved_ping(ping_config: dict) -> None:
+    """Starts a ping session using a saved ping configuration."""
+    host = ping_config["host"]
+    method = ping_config["method"]
+    plugin = get_probe(method)
+    target = Target.from_config(ping_config)
+
+    try:
+        target.ip_address = get_resolver().resolve(host)
+    except socket.gaierror as e:
+        console.print(f"[bold red]Error: Invalid hostname for saved ping '{ping_config['name']}' - {e}[/bold red]")
+        time.sleep(3)
+        return
+    except Exception as e:
+        console.print(f"[bold red]An unexpected error occurred for saved ping '{ping_config['name']}': {e}[/bold red]")
+        time.sleep(3)
+        return
+
+    if plugin is None:
+        console.print(f"[bold red]Error: Unknown ping method '{method}' for saved ping '{ping_config['name']}'.[/bold red]")
+        time.sleep(3)
+    elif plugin.needs_port and target.port is None:
+        console.print(f"[bold red]Error: {method} ping '{ping_config['name']}' is missing a port number.[/bold red]")
+        time.sleep(3)
+    else:
+        _start_ping_session(target, plugin.describe(target), make_probe_executor(target))
+
+def start_tcp_ping() -> None:
+    """Handles the TCP pinging process by attempting to connect to a port."""
+    console.clear()
+    host = console.input("[bold yellow]Enter the host for TCP ping: [/bold yellow]").strip()
+    port_str = console.input("[bold yellow]Enter the port number (e.g., 80, 443): [/bold yellow]")
+
+    try:
+        port = int(port_str)
+        if not 0 < port < 65536:
+            raise ValueError("Port out of range.")
+    except ValueError:
+        console.print(f"[bold red]Error: Invalid port number.[/bold red]")
+        time.sleep(3)
+        return
+
+    target = Target(host, host, "TCP", port)
+    try:
+        target.ip_address = get_resolver().resolve(host)
+    except socket.gaierror as e:
+        console.print(f"[bold red]Error: Invalid hostname - {e}[/bold red]")
+        time.sleep(3)
+        return
+
+    _start_ping_session(target, f"TCP Connect (Port {port})", make_probe_executor(target))
+
+class PathHop:
+    """One TTL of a traced path: its statistics, the routers that answered for it and the ASN of the latest."""
+    __slots__ = ("ttl", "stats", "address", "addresses", "asn")
+
+    def __init__(self, ttl: int) -> None:
+        self.ttl = ttl
+        self.stats = RunningStats()
+        self.address: Optional[str] = None
+        self.addresses: List[str] = []
+        self.asn = ""
+
+class PathTrace:
+    """MTR-style per-hop statistics of the path to one target.
+
+    Each cycle probes every hop at once instead of one TTL after another, so
+    a cycle takes one timeout at most. Once the target itself answers, hops
+    past it are no longer probed. Per-hop memory stays constant: a
+    RunningStats and at most TRACE_HOP_ADDRESSES router addresses.
+    """
+
+    def __init__(self, target: "Target", method: str, port: Optional[int] = None,
+                 max_hops: int = TRACE_MAX_HOPS, timeout: float = TRACE_TIMEOUT) -> None:
+        self.target = target
+        self.method = method
+        self.port = port
+        self.timeout = timeout
+        self.tracer = get_hop_tracer(address_family(target.ip_address))
+        self.hops = [PathHop(ttl) for ttl in range(1, max_hops + 1)]
+        self.limit = max_hops
+        self.reached = False
+        self.cycles = 0
+        self.lock = threading.Lock()
+
+    def cycle(self) -> None:
+        """Sends one probe to every hop up to the target."""
+        self.cycles += 1
+        ip_address = self.target.ip_address
+        for hop in self.hops[:self.limit]:
+            self.tracer.send(ip_address, self.method, self.port, hop.ttl, self.timeout,
+                             lambda latency, responder, reached, hop=hop: self._record(hop, latency, responder, reached))
+
+    def _record(self, hop: PathHop, latency: Optional[float], responder: Optional[str], reached: bool) -> None:
+        with self.lock:
+            if reached and hop.ttl < self.limit:
+                self.limit = hop.ttl
+            if reached:
+                self.reached = True
+            if hop.ttl > self.limit:
+                return
+            hop.stats.add(latency if latency is not None else -1, latency is not None)
+            if responder is None or responder == hop.address:
+                return
+            hop.address = responder
+            if responder not in hop.addresses:
+                hop.addresses = (hop.addresses + [responder])[-TRACE_HOP_ADDRESSES:]
+            hop.asn = ""
+
+        def on_ip_info(info: dict, hop=hop, responder=responder) -> None:
+            if hop.address == responder:
+                hop.asn = info.get("asn", "N/A")
+
+        # The IP info cache coalesces and remembers lookups, so each router is looked up once, not once per cycle.
+        get_ip_info_cache().lookup_async(responder, on_ip_info)
+
+    def rows(self) -> List[PathHop]:
+        """The hops to show: up to the target, or one past the last hop that answered."""
+        with self.lock:
+            if self.reached:
+                return self.hops[:self.limit]
+            answered = [hop.ttl for hop in self.hops[:self.limit] if hop.address]
+            return self.hops[:min(max(answered, default=0) + 1, self.limit)]
+
+def _start_trace_session(trace: PathTrace, method: str) -> None:
+    """Runs an MTR-style path trace until a key is pressed."""
+    target = trace.target
+
+    def generate_output() -> Panel:
+        table = Table(show_header=True, header_style="bold magenta", box=None)
+        for column in ("Hop", "Host", "ASN", "Loss%", "Sent", "Last", "Avg", "Best", "Wrst", "StDev", "P95"):
+            table.add_column(column, justify="left" if column in ("Host", "ASN") else "right")
+        for hop in trace.rows():
+            stats = hop.stats
+            if hop.address is None:
+                table.add_row(str(hop.ttl), "[dim]???[/dim]", "", f"{stats.loss_percent:.1f}" if stats.sent else "", str(stats.sent))
+                continue
+            host = hop.address
+            if len(hop.addresses) > 1:
+                host += f" [dim](+{len(hop.addresses) - 1})[/dim]"
+            loss_style = "red" if stats.failed else "green"
+            timing = [f"{stats.last:.1f}", f"{stats.mean:.1f}", f"{stats.min:.1f}", f"{stats.max:.1f}",
+                      f"{stats.stddev:.1f}", f"{stats.sketch.quantile(0.95):.1f}"] if stats.count else [""] * 6
+            table.add_row(str(hop.ttl), host, hop.asn or "[dim]...[/dim]",
+                          f"[{loss_style}]{stats.loss_percent:.1f}[/{loss_style}]", str(stats.sent), *timing)
+        status = "" if trace.reached else " [dim](target not reached yet)[/dim]"
+        return Panel(table, title=f"Path to {target.host} ({target.ip_address}) via {method}{status}",
+                     subtitle="Press any key to stop", border_style="yellow", expand=False)
+
+    stop = threading.Event()
+    errors: List[Exception] = []
+    scheduler = ProbeScheduler()
+    scheduler.add(trace, TRACE_INTERVAL, phase=0)
+
+    def prober() -> None:
+        try:
+            while not stop.is_set():
+                wait = (scheduler.next_deadline_ns() - time.monotonic_ns()) / 1e9
+                if wait > 0 and stop.wait(wait):
+                    break
+                for _, deadline_ns in scheduler.pop_due(time.monotonic_ns()):
+                    scheduler.record_send(deadline_ns)
+                    trace.cycle()
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+
+    console.clear()
+    probe_thread = threading.Thread(target=prober, name="path-tracer", daemon=True)
+    probe_thread.start()
+    frame_time = 1 / RENDER_FPS
+    with KeyReader() as keys, Live(generate_output(), console=console, screen=False, auto_refresh=False) as live:
+        try:
+            while not stop.is_set():
+                frame_start = time.perf_counter()
+                live.update(generate_output(), refresh=True)
+                if keys.read() is not None:
+                    break
+                time.sleep(max(frame_time - (time.perf_counter() - frame_start), 0))
+        finally:
+            stop.set()
+            probe_thread.join(timeout=1)
+    for e in errors:
+        console.print(f"\n[bold red]Error during trace: {e}[/bold red]")
+
+def start_path_trace() -> None:
+    """Prompts for a host (or saved ping) and trace method, then starts an MTR-style path trace."""
+    console.clear()
+    host = console.input("[bold yellow]Enter the host to trace (blank to pick a saved ping): [/bold yellow]").strip()
+    port = None
+    if host:
+        methods = ["ICMP", "UDP", "TCP"]
+        choice = console.input(f"[bold yellow]Select method ({method_menu(methods)}, blank for ICMP): [/bold yellow]").strip()
+        method = methods[int(choice) - 1] if choice.isdigit() and 0 < int(choice) <= len(methods) else "ICMP"
+        if method == "TCP":
+            port_str = console.input("[bold yellow]Enter the port number (blank for 80): [/bold yellow]").strip()
+            try:
+                port = int(port_str or 80)
+                if not 0 < port < 65536:
+                    raise ValueError("Port out of range.")
+            except ValueError:
+                console.print(f"[bold red]Error: Invalid port number.[/bold red]")
+                time.sleep(3)
+                return
+        target = Target(host, host, method, port)
+    else:
+        if not get_target_store().count():
+            console.print("\n[italic yellow]No saved pings yet. Create one from the 'Saved Pings' menu.[/italic yellow]\n")
+            time.sleep(3)
+            return
+        ping_config = choose_saved_ping("Trace Saved Ping", "trace")
+        if not ping_config:
+            return
+        target = Target.from_config(ping_config)
+        # Trace the way the saved ping probes: UDP-based methods over UDP, connection-based ones over TCP.
+        method = {"ICMP": "ICMP", "UDP": "UDP", "DNS": "UDP"}.get(target.method, "TCP")
+        if method == "TCP":
+            port = port_of(target)
+
+    try:
+        target.ip_address = get_resolver().resolve(target.host)
+    except socket.gaierror as e:
+        console.print(f"[bold red]Error: Invalid hostname - {e}[/bold red]")
+        time.sleep(3)
+        return
+
+    try:
+        trace = PathTrace(target, method, port)
+    except PermissionError:
+        console.print("[bold red]Error: Path tracing needs raw sockets; run Sry-Ping as root (or with CAP_NET_RAW).[/bold red]")
+        time.sleep(3)
+        return
+    _start_trace_session(trace, f"{method} (Port {port})" if port else method)
+
+class FleetDashboard:
+    """Virtual-scrolling fleet table: only visible rows are built, and only when their target changed."""
+    SORT_MODES = ("name", "loss", "latency")
+
+    def __init__(self, engine: FleetEngine, targets: List[Target]) -> None:
+        self.engine = engine
+        self.targets = targets
+        self.offset = 0
+        self.sort_mode = 0
+        self.page_size = 1
+        self.rows: dict = {}
+        self.ip_info_cache = get_ip_info_cache()
+
+    def handle_key(self, key: str) -> bool:
+        """Scrolls or re-sorts for a key press; returns False when the view should close."""
+        last = max(len(self.targets) - self.page_size, 0)
+        if key in ("q", "\x1b", "b"):
+            return False
+        elif key in ("down", "j"):
+            self.offset += 1
+        elif key in ("up", "k"):
+            self.offset -= 1
+        elif key in ("pgdn", "n", " "):
+            self.offset += self.page_size
+        elif key in ("pgup", "p"):
+            self.offset -= self.page_size
+        elif key in ("home", "g"):
+            self.offset = 0
+        elif key in ("end", "G"):
+            self.offset = last
+        elif key == "s":
+            self.sort_mode = (self.sort_mode + 1) % len(self.SORT_MODES)
+        self.offset = min(max(self.offset, 0), last)
+        return True
+
+    def _row(self, target: Target) -> tuple:
+        """Returns the statistics cells of a row, rebuilding them only if the target recorded a probe."""
+        cached = self.rows.get(target)
+        if cached and cached[0] == target.version:
+            return cached[1]
+        stats = target.stats
+        cells = (str(stats.sent),
+                 f"{stats.failed} ([red]{stats.loss_percent:.1f}%[/red])" if stats.sent else "0",
+                 f"{stats.last:.2f}" if stats.count else "-",
+                 f"{stats.sketch.quantile(0.95):.2f}" if stats.count else "-")
+        self.rows[target] = (target.version, cells)
+        return cells
+
+    def _asn(self, target: Target) -> str:
+        if not target.ip_address:
+            return "-"
+        info = self.ip_info_cache.peek(target.ip_address)
+        if info is None:
+            # Only visible rows are enriched; duplicate IPs coalesce into one lookup.
+            self.ip_info_cache.lookup_async(target.ip_address)
+            return "-"
+        return info["asn"].split(" ", 1)[0]
+
+    def _self_stats_panel(self) -> Optional[Panel]:
+        """Stage timings of Sry-Ping itself, when self-instrumentation is on."""
+        if not _self_stats:
+            return None
+        stage_table = Table(show_header=True, header_style="bold magenta", box=None)
+        for column in ("Stage", "Count", "Mean (ms)", "P50 (ms)", "P99 (ms)", "Max (ms)"):
+            stage_table.add_column(column, justify="left" if column == "Stage" else "right")
+        for stage, count, mean, p50, p99, high in _self_stats.rows():
+            stage_table.add_row(stage, str(count), f"{mean:.3f}", f"{p50:.3f}", f"{p99:.3f}", f"{high:.3f}")
+        return Panel(stage_table, title="Self Stats", border_style="blue")
+
+    def render(self, height: int) -> Panel | Group:
+        """Builds the panel for the rows currently scrolled into view (plus self-stats when on)."""
+        self_stats_panel = self._self_stats_panel()
+        if self_stats_panel:
+            height -= len(self_stats_panel.renderable.rows) + 3
+        self.page_size = max(height - 8, 1)
+        mode = self.SORT_MODES[self.sort_mode]
+        ordered = self.targets
+        if mode == "loss":
+            ordered = sorted(self.targets, key=lambda t: -t.stats.loss_percent)
+        elif mode == "latency":
+            ordered = sorted(self.targets, key=lambda t: -(t.stats.mean if t.stats.count else -1))
+        self.offset = min(self.offset, max(len(ordered) - self.page_size, 0))
+
+        fleet_table = Table(show_header=True, header_style="bold magenta", box=None)
+        fleet_table.add_column("Name")
+        fleet_table.add_column("Host")
+        fleet_table.add_column("ASN")
+        fleet_table.add_column("Method")
+        fleet_table.add_column("Sent", justify="right")
+        fleet_table.add_column("Failed", justify="right")
+        fleet_table.add_column("Last (ms)", justify="right")
+        fleet_table.add_column("P95 (ms)", justify="right")
+        for t in ordered[self.offset:self.offset + self.page_size]:
+            fleet_table.add_row(t.name, t.ip_address or f"[red]{t.host}[/red]", self._asn(t), t.method, *self._row(t))
+
+        engine = self.engine
+        skew = engine.scheduler.skew
+        skew_text = f"{skew.mean:.2f}/{skew.sketch.quantile(0.99):.2f}/{skew.max:.2f}" if skew.count else "-"
+        scheduler = engine.scheduler
+        rate_text = f"{scheduler.rate:.1f}"
+        if scheduler.base_rate > scheduler.rate:
+            rate_text += f" ({(1 - scheduler.rate / scheduler.base_rate) * 100:.0f}% saved)"
+        title = (f"Fleet: {len(self.targets)} targets | In flight: {engine.in_flight} | Probes/s: {rate_text} | "
+                 f"Send skew avg/p99/max: {skew_text} ms")
+        end = min(self.offset + self.page_size, len(ordered))
+        subtitle = (f"Rows {self.offset + 1}-{end} of {len(ordered)} | Sort: {mode} | "
+                    "↑/↓ j/k scroll, PgUp/PgDn n/p page, s sort, q quit")
+        if engine.last_dns_change:
+            subtitle = f"DNS changes: {engine.dns_changes} (last {engine.last_dns_change}) | {subtitle}"
+        monitor = get_change_monitor()
+        if monitor.recent:
+            event = monitor.recent[-1]
+            subtitle = f"Changes: {sum(monitor.counts.values())} (last {event.target.name} {event.describe()}) | {subtitle}"
+        panel = Panel(fleet_table, title=title, subtitle=subtitle, border_style="yellow")
+        return Group(panel, self_stats_panel) if self_stats_panel else panel
+
+def start_fleet_ping() -> None:
+    """Probes every saved ping at once and shows a live fleet table."""
+    console.clear()
+    saved_pings = get_target_store().all()
+    if not saved_pings:
+        console.print("\n[italic yellow]No saved pings yet. Create one from the 'Saved Pings' menu.[/italic yellow]\n")
+        console.print("[cyan]Returning to menu in 3 seconds...[/cyan]")
+        time.sleep(3)
+        return
+
+    targets = [Target.from_config(p) for p in saved_pings if is_probeable(p)]
+    metrics = metrics_server = None
+    if metrics_port:
+        metrics = MetricsRegistry()
+        try:
+            metrics_server = metrics.serve(metrics_port)
+        except OSError as e:
+            console.print(f"[bold red]Could not serve metrics on port {metrics_port}: {e}[/bold red]")
+            metrics = None
+            time.sleep(2)
+    workers = resolve_worker_count(fleet_workers)
+    if workers > 1:
+        engine = ShardedFleet(targets, workers, metrics=metrics, adaptive=adaptive_probing, adaptive_max_rate=adaptive_max_rate)
+    else:
+        engine = FleetEngine(targets, on_result=metrics, adaptive=adaptive_probing, adaptive_max_rate=adaptive_max_rate,
+                             result_log=get_result_log())
+    if metrics:
+        metrics.add_collector(engine.scheduler.metrics_lines)
+        metrics.add_collector(get_change_monitor().metrics_lines)
+        if _self_stats:
+            metrics.add_collector(_self_stats.metrics_lines)
+    engine_thread = threading.Thread(target=asyncio.run, args=(engine.run(),), daemon=True)
+    engine_thread.start()
+    dashboard = FleetDashboard(engine, targets)
+    frame_time = 1 / RENDER_FPS
+
+    with KeyReader() as keys, Live(dashboard.render(console.size.height), console=console, screen=False,
+                                   auto_refresh=False, vertical_overflow="crop") as live:
+        try:
+            while True:
+                frame_start = time.perf_counter()
+                key = keys.read()
+                self_stats = _self_stats
+                if self_stats:
+                    render_start = time.perf_counter()
+                    self_stats.observe("input", (render_start - frame_start) * 1000)
+                if key is not None and not dashboard.handle_key(key):
+                    break
+                live.update(dashboard.render(console.size.height), refresh=True)
+                if self_stats:
+                    self_stats.observe("render", (time.perf_counter() - render_start) * 1000)
+                time.sleep(max(frame_time - (time.perf_counter() - frame_start), 0))
+        finally:
+            engine.stop()
+            engine_thread.join(timeout=5)
+            if metrics_server:
+                metrics_server.shutdown()
+                metrics_server.server_close()
+            if get_result_log():
+                get_result_log().flush()
+
+def select_ping_method() -> None:
+    """Displays a menu to select the ping method."""
+    while True:
+        console.clear()
+        ping_menu_text = Text.from_markup(
+            "Select a ping method:\n\n"
+            "  [yellow]1)[/yellow] ICMP Ping (Standard)\n"
+            "  [yellow]2)[/yellow] TCP Ping (Port Check)\n"
+            "  [yellow]3)[/yellow] From Saved Pings\n"
+            "  [yellow]4)[/yellow] All Saved Pings (Fleet)\n"
+            "  [yellow]5)[/yellow] Path Trace (MTR)\n\n"
+            "  [yellow]b)[/yellow] Back to Main Menu\n"
+        )
+        console.print(Panel(ping_menu_text, title="Ping Method", border_style="cyan"))
+        choice = getch().lower()
+
+        if choice == '1':
+            start_icmp_ping()
+            break
+        elif choice == '2':
+            start_tcp_ping()
+            break
+        elif choice == '3':
+            select_and_start_saved_ping()
+            break
+        elif choice == '4':
+            start_fleet_ping()
+            break
+        elif choice == '5':
+            start_path_trace()
+            break
+        elif choice == 'b':
+            break
+
+def resolve_worker_count(workers: int) -> int:
+    """Returns the number of fleet worker processes to use; 0 means one per CPU."""
+    return workers if workers > 0 else os.cpu_count() or 1
+
+def parse_buckets(value: str) -> Tuple[float, ...]:
+    """Parses comma-separated RTT histogram bounds in ms; they must be positive, finite and increasing."""
+    try:
+        bounds = tuple(float(part) for part in value.split(","))
+    except ValueError:
+        raise ValueError(f"invalid bucket list '{value}' (expected ms bounds such as 1,5,10,50)")
+    if not all(0 < bound < math.inf for bound in bounds):
+        raise ValueError(f"invalid bucket list '{value}' (bounds must be positive numbers)")
+    if any(low >= high for low, high in zip(bounds, bounds[1:])):
+        raise ValueError(f"invalid bucket list '{value}' (bounds must be strictly increasing)")
+    return bounds
+
+def parse_duration(value: str) -> float:
+    """Parses '500ms', '1s', '2m', '1h', '7d' or a plain number of seconds."""
+    value = value.strip().lower()
+    for suffix, scale in (("ms", 0.001), ("s", 1), ("m", 60), ("h", 3600), ("d", 86400)):
+        if value.endswith(suffix):
+            return float(value[:-len(suffix)]) * scale
+    return float(value)
+
+def load_targets_file(path: str) -> List[dict]:
+    """Reads targets from a CSV (header row), JSON list/config, JSONL file, or 'host[,method[,port[,name]]]' lines."""
+    with open(path, 'r', newline='') as f:
+        if path.endswith(".csv"):
+            import csv
+            entries = []
+            for row in csv.DictReader(f):
+                entry = {key: value.strip() for key, value in row.items() if key and value and value.strip()}
+                entry["method"] = entry.get("method", "ICMP").upper()
+                if "port" in entry:
+                    entry["port"] = int(entry["port"])
+                if "interval" in entry:
+                    entry["interval"] = float(entry["interval"])
+                entries.append(entry)
+            return entries
+        if path.endswith(".json"):
+            data = json.load(f)
+            return data.get("saved_pings", []) if isinstance(data, dict) else data
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        entries = []
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            fields = [field.strip() for field in line.split(",")]
+            entry = {"host": fields[0], "method": (fields[1] if len(fields) > 1 and fields[1] else "ICMP").upper()}
+            if len(fields) > 2 and fields[2]:
+                entry["port"] = int(fields[2])
+            entry["name"] = fields[3] if len(fields) > 3 and fields[3] else fields[0]
+            entries.append(entry)
+        return entries
+
+def import_targets_file(path: str, tags: str = "") -> int:
+    """Bulk-imports a targets file into the saved pings, adding `tags` to each; returns how many."""
+    entries = [entry for entry in load_targets_file(path) if entry.get("host")]
+    if tags:
+        for entry in entries:
+            own = entry.get("tags") or []
+            entry["tags"] = (own.split(",") if isinstance(own, str) else list(own)) + tags.split(",")
+    return len(get_target_store().import_entries(entries))
+
+class JsonlSink:
+    """Writes one JSON object per probe result, batched into few large writes."""
+
+    def __init__(self, stream) -> None:
+        self.stream = stream
+        self.lines: List[str] = []
+        self.lock = threading.Lock()
+
+    def __call__(self, target: Target, latency: float, success: bool, message: str, timings: Optional[dict] = None) -> None:
+        entry = {"name": target.name, "host": target.host, "method": target.method, "port": target.port,
+                 "ip": target.ip_address, "ts": round(time.time(), 6), "rtt_ms": round(latency, 3) if success else None,
+                 "ok": success}
+        if timings:
+            entry["timings"] = {phase: round(ms, 3) for phase, ms in timings.items()}
+        line = json.dumps(entry) + "\n"
+        with self.lock:
+            self.lines.append(line)
+            if len(self.lines) >= RUN_BATCH_LINES:
+                self._write()
+
+    def _write(self) -> None:
+        if self.lines:
+            self_stats = _self_stats
+            if self_stats:
+                write_start = time.perf_counter()
+            self.stream.write("".join(self.lines))
+            self.lines.clear()
+            self.stream.flush()
+            if self_stats:
+                self_stats.observe("export", (time.perf_counter() - write_start) * 1000)
+
+    def flush(self) -> None:
+        """Writes everything queued so far."""
+        with self.lock:
+            self._write()
+
+class ChangeEventSink:
+    """Change-monitor hook that appends each event as one JSON line."""
+
+    def __init__(self, stream) -> None:
+        self.stream = stream
+        self.lock = threading.Lock()
+
+    def __call__(self, event: ChangeEvent) -> None:
+        line = json.dumps(event.to_dict()) + "\n"
+        with self.lock:
+            self.stream.write(line)
+            self.stream.flush()
+
+class PromFileSink:
+    """Periodically writes the metrics registry as a text file (textfile-collector style)."""
+
+    def __init__(self, path: Optional[str], registry: MetricsRegistry) -> None:
+        self.path = path
+        self.registry = registry
+
+    def __call__(self, target: Target, latency: float, success: bool, message: str, timings: Optional[dict] = None) -> None:
+        pass
+
+    def flush(self) -> None:
+        """Replaces the output file (or prints to stdout) with the current metrics."""
+        text = self.registry.render()
+        if not self.path:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+            return
+        with open(self.path + ".tmp", 'w') as f:
+            f.write(text)
+        os.replace(self.path + ".tmp", self.path)
+
+def run_headless(args) -> int:
+    """Probes a target list without the interactive UI and streams results to the chosen output."""
+    global result_log_enabled, _result_log, tcp_source_ports
+    try:
+        entries = load_targets_file(args.targets) if args.targets else get_target_store().find(args.select)
+    except (OSError, ValueError) as e:
+        log_error(f"Error: Could not read targets: {e}")
+        return 2
+    interval = args.interval
+    try:
+        parse_port_range(args.source_ports)
+    except ValueError as e:
+        log_error(f"Error: {e}")
+        return 2
+    tcp_source_ports = args.source_ports
+    result_log_enabled = args.output == "binary"
+    if result_log_enabled:
+        _result_log = ResultLog(args.out or RESULT_LOG_DIR)
+
+    targets = []
+    for entry in entries:
+        entry = dict(entry)
+        entry.setdefault("name", entry.get("host", ""))
+        entry["method"] = (entry.get("method") or "ICMP").upper()
+        entry.setdefault("interval", interval)
+        if is_probeable(entry):
+            targets.append(Target.from_config(entry))
+    if not targets:
+        log_error("Error: No targets to probe.")
+        return 2
+
+    metrics = None
+    if args.output == "prom" or args.metrics_port:
+        metrics = MetricsRegistry(args.buckets or METRICS_BUCKETS_MS)
+        if args.metrics_port:
+            try:
+                metrics.serve(args.metrics_port)
+            except OSError as e:
+                log_error(f"Error: Could not serve metrics on port {args.metrics_port}: {e}")
+                return 2
+    if args.output == "jsonl":
+        sink = JsonlSink(open(args.out, 'a') if args.out else sys.stdout)
+    elif args.output == "prom":
+        sink = PromFileSink(args.out, metrics)
+    else:
+        sink = None
+    if args.events:
+        get_change_monitor().add_hook(ChangeEventSink(sys.stderr if args.events == "-" else open(args.events, 'a')))
+    workers = resolve_worker_count(args.workers)
+    if workers > 1:
+        engine = ShardedFleet(targets, workers, max_in_flight=args.max_in_flight, metrics=metrics,
+                              jsonl=sink.stream if isinstance(sink, JsonlSink) else None,
+                              adaptive=args.adaptive, adaptive_max_rate=args.adaptive_max_rate)
+        sink = sink if isinstance(sink, PromFileSink) else None
+    else:
+        engine = FleetEngine(targets, max_in_flight=args.max_in_flight, on_result=fan_out(sink, metrics),
+                             adaptive=args.adaptive, adaptive_max_rate=args.adaptive_max_rate, result_log=get_result_log())
+    if metrics:
+        metrics.add_collector(engine.scheduler.metrics_lines)
+        metrics.add_collector(get_change_monitor().metrics_lines)
+        if _self_stats:
+            metrics.add_collector(_self_stats.metrics_lines)
+    engine_thread = threading.Thread(target=asyncio.run, args=(engine.run(),), daemon=True)
+    engine_thread.start()
+
+    import signal
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    deadline = time.monotonic() + args.duration if args.duration else math.inf
+    next_summary = time.monotonic() + SELF_STATS_INTERVAL
+    try:
+        while not stop.is_set() and time.monotonic() < deadline:
+            stop.wait(min(RUN_FLUSH_INTERVAL, max(deadline - time.monotonic(), 0)))
+            if sink:
+                sink.flush()
+            if _self_stats and time.monotonic() >= next_summary:
+                next_summary += SELF_STATS_INTERVAL
+                print(_self_stats.summary(), file=sys.stderr, flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.stop()
+        engine_thread.join(timeout=5)
+        if sink:
+            sink.flush()
+        if _result_log:
+            _result_log.close()
+        if _self_stats:
+            print(_self_stats.summary(), file=sys.stderr, flush=True)
+    return 0
+
+def serve_bench_responder(listeners: int, delay_ms: float, loss_pct: float, icmp: bool) -> None:
+    """Stand-in for real hosts during 'bench': a TCP listener farm and, optionally, a user-space
+    ICMP echo responder with injected delay and loss.
+
+    Meant to run in its own process (inside the benchmark namespace). Prints
+    'ready <port,...>' once listening and serves until stdin closes.
+    """
+    import random
+    import selectors
+    selector = selectors.DefaultSelector()
+    ports = []
+    for _ in range(listeners):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind(("", 0))
+        listener.listen(4096)
+        listener.setblocking(False)
+        selector.register(listener, selectors.EVENT_READ, "tcp")
+        ports.append(listener.getsockname()[1])
+    raw = None
+    if icmp:
+        # Replies come from this process instead of the kernel, so they can be delayed and dropped.
+        with open("/proc/sys/net/ipv4/icmp_echo_ignore_all", 'w') as f:
+            f.write("1")
+        raw = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+        raw.setsockopt(socket.IPPROTO_IP, socket.IP_HDRINCL, 1)
+        selector.register(raw, selectors.EVENT_READ, "icmp")
+    delay = delay_ms / 1000
+    pending: List[tuple] = []
+    sequence = 0
+    print("ready " + ",".join(map(str, ports)), flush=True)
+    threading.Thread(target=lambda: (sys.stdin.read(), os._exit(0)), daemon=True).start()
+
+    while True:
+        timeout = max(pending[0][0] - time.monotonic(), 0) if pending else None
+        for key, _ in selector.select(timeout):
+            if key.data == "tcp":
+                try:
+                    while True:
+                        # A plain close: the prober resets the connection itself, like against a real server.
+                        key.fileobj.accept()[0].close()
+                except OSError:
+                    continue
+            data = raw.recv(2048)
+            header = (data[0] & 0x0F) * 4
+            if len(data) < header + 8 or data[header] != 8:
+                continue
+            if loss_pct and random.random() * 100 < loss_pct:
+                continue
+            reply = bytearray(data[header:])
+            reply[0] = 0
+            reply[2:4] = b"\0\0"
+            struct.pack_into("!H", reply, 2, _icmp_checksum(bytes(reply)))
+            # The request's addresses swapped; the kernel fills in length, id and checksum.
+            ip_header = struct.pack("!BBHHHBBH4s4s", 0x45, 0, 0, 0, 0, 64, socket.IPPROTO_ICMP, 0, data[16:20], data[12:16])
+            sequence += 1
+            heapq.heappush(pending, (time.monotonic() + delay, sequence, ip_header + bytes(reply), socket.inet_ntoa(data[12:16])))
+        now = time.monotonic()
+        while pending and pending[0][0] <= now:
+            _, _, packet, destination = heapq.heappop(pending)
+            try:
+                raw.sendto(packet, (destination, 0))
+            except OSError:
+                pass
+
+class BenchNamespace:
+    """Throwaway network namespace behind a veth pair, with all of BENCH_NET local inside it.
+
+    netem on the host end injects delay and loss into every probe when the
+    kernel has it; `netem` tells whether that worked.
+    """
+
+    def __init__(self, delay_ms: float, loss_pct: float) -> None:
+        self.name = f"srybench{os.getpid()}"
+        self.link = f"sryb{os.getpid() % 100000}"
+        self.delay_ms = delay_ms
+        self.loss_pct = loss_pct
+        self.netem = False
+
+    @staticmethod
+    def _run(*command: str) -> bool:
+        return subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0
+
+    def __enter__(self) -> "BenchNamespace":
+        host_ip, peer_ip = BENCH_LINK
+        inside = ("ip", "-n", self.name)
+        steps = [("ip", "netns", "add", self.name),
+                 ("ip", "link", "add", self.link, "type", "veth", "peer", "name", self.link + "n"),
+                 ("ip", "link", "set", self.link + "n", "netns", self.name),
+                 ("ip", "addr", "add", f"{host_ip}/30", "dev", self.link),
+                 ("ip", "link", "set", self.link, "up"),
+                 (*inside, "addr", "add", f"{peer_ip}/30", "dev", self.link + "n"),
+                 (*inside, "link", "set", self.link + "n", "up"),
+                 (*inside, "link", "set", "lo", "up"),
+                 (*inside, "route", "add", "local", BENCH_NET, "dev", "lo"),
+                 ("ip", "route", "add", BENCH_NET, "via", peer_ip)]
+        for step in steps:
+            if not self._run(*step):
+                self.__exit__()
+                raise OSError(f"'{' '.join(step)}' failed")
+        if self.delay_ms or self.loss_pct:
+            self.netem = self._run("tc", "qdisc", "add", "dev", self.link, "root", "netem",
+                                   "delay", f"{self.delay_ms}ms", "loss", f"{self.loss_pct}%")
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._run("ip", "netns", "del", self.name)
+        self._run("ip", "link", "del", self.link)
+
+    def addresses(self, count: int) -> List[str]:
+        base = int.from_bytes(socket.inet_aton(BENCH_NET.split("/")[0]), "big")
+        return [socket.inet_ntoa((base + 1 + i).to_bytes(4, "big")) for i in range(count)]
+
+def _start_bench_responder(namespace: Optional[str], delay_ms: float, loss_pct: float, icmp: bool) -> Tuple[subprocess.Popen, List[int]]:
+    """Starts serve_bench_responder in a child process (inside `namespace` if given) and returns it with its ports."""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    module = os.path.splitext(os.path.basename(__file__))[0]
+    code = (f"import sys; sys.path.insert(0, {directory!r}); import {module}; "
+            f"{module}.serve_bench_responder({BENCH_TCP_LISTENERS}, {delay_ms!r}, {loss_pct!r}, {icmp!r})")
+    command = [sys.executable, "-c", code]
+    if namespace:
+        command = ["ip", "netns", "exec", namespace, *command]
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline().split()
+    if not line or line[0] != "ready":
+        process.kill()
+        raise OSError("benchmark responder did not start")
+    return process, [int(port) for port in line[1].split(",")]
+
+class _PythonpingEngine(FleetEngine):
+    """FleetEngine pinned to the pythonping fallback, so 'bench' can compare it with IcmpSocket."""
+    pythonping = PythonpingProbe()
+
+    async def _probe(self, target: Target) -> ProbeResult:
+        return await self.pythonping.probe_async(target)
+
+def measure_target_memory(count: int, samples: int = BENCH_MEMORY_SAMPLES) -> float:
+    """Bytes allocated per target for `count` targets that each recorded `samples` results."""
+    import tracemalloc
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        targets = [Target(f"bench{i}", "127.0.0.1", "ICMP") for i in range(count)]
+        for target in targets:
+            for sample in range(samples):
+                target.record(1.0 + (sample % 10) * 0.1, True)
+        return (tracemalloc.get_traced_memory()[0] - before) / count
+    finally:
+        tracemalloc.stop()
+
+def run_bench_case(engine_name: str, addresses: List[str], ports: List[int], interval: float,
+                   duration: float, delay_ms: float, loss_pct: float) -> dict:
+    """Probes every address with one engine for `duration` seconds and returns its measurements."""
+    tcp = engine_name == "tcp"
+    targets = [Target(f"bench{i}", address, "TCP" if tcp else "ICMP", ports[i % len(ports)] if tcp else None, interval)
+               for i, address in enumerate(addresses)]
+    engine = (_PythonpingEngine if engine_name == "pythonping" else FleetEngine)(targets)
+    engine_thread = threading.Thread(target=asyncio.run, args=(engine.run(),), daemon=True)
+    engine_thread.start()
+    time.sleep(BENCH_WARMUP)
+    sent_before = sum(t.stats.sent for t in targets)
+    cpu_before = time.process_time()
+    start = time.perf_counter()
+    time.sleep(duration)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_before
+    probes = sum(t.stats.sent for t in targets) - sent_before
+    engine.stop()
+    engine_thread.join(timeout=5)
+
+    stats = RunningStats()
+    for target in targets:
+        stats.merge(target.stats)
+    skew = engine.scheduler.skew
+    quantile = lambda q: stats.sketch.quantile(q) if stats.count else None
+    return {"engine": engine_name, "targets": len(targets), "interval_s": interval,
+            "probes": probes, "probes_per_sec": round(probes / elapsed, 1),
+            "offered_per_sec": round(len(targets) / interval, 1),
+            "cpu_us_per_probe": round(cpu / probes * 1e6, 1) if probes else None,
+            "injected_delay_ms": delay_ms, "injected_loss_pct": loss_pct,
+            "rtt_p50_ms": quantile(0.5), "rtt_p99_ms": quantile(0.99),
+            "error_p50_ms": quantile(0.5) - delay_ms if stats.count else None,
+            "error_p99_ms": quantile(0.99) - delay_ms if stats.count else None,
+            "loss_pct": round(stats.loss_percent, 3),
+            "skew_p99_ms": skew.sketch.quantile(0.99) if skew.count else None,
+            "skipped": engine.scheduler.skipped}
+
+def run_bench(args) -> int:
+    """Benchmarks the probe engines against local responders and saves the results as JSON."""
+    sizes = args.sizes
+    engines = [engine.strip() for engine in args.engines.split(",")]
+    duration = args.duration
+    interval = args.interval
+    namespace = None
+    if args.netns:
+        if os.name != "posix" or os.geteuid() != 0:
+            log_error("Note: network namespaces need root; benchmarking on loopback without injected delay or loss.")
+        else:
+            try:
+                namespace = BenchNamespace(args.delay, args.loss).__enter__()
+            except OSError as e:
+                log_error(f"Note: could not set up a network namespace ({e}); benchmarking on loopback.")
+    if namespace is None:
+        base = int.from_bytes(socket.inet_aton("127.1.0.0"), "big")
+        addresses = [socket.inet_ntoa((base + 1 + i).to_bytes(4, "big")) for i in range(max(sizes))]
+    else:
+        addresses = namespace.addresses(max(sizes))
+
+    # Without netem, ICMP delay and loss come from the user-space responder; TCP then runs uninjected.
+    responder_icmp = namespace is not None and not namespace.netem
+    injection = "netem" if namespace and namespace.netem else "responder" if responder_icmp else "none"
+    results = []
+    try:
+        responder, ports = _start_bench_responder(namespace.name if namespace else None, args.delay, args.loss, responder_icmp)
+        try:
+            for size in sizes:
+                for engine_name in engines:
+                    if engine_name == "pythonping":
+                        try:
+                            import pythonping  # noqa: F401
+                        except ImportError:
+                            log_error("Note: pythonping is not installed; skipping it.")
+                            continue
+                    injected = injection == "netem" or (injection == "responder" and engine_name != "tcp")
+                    result = run_bench_case(engine_name, addresses[:size], ports, interval, duration,
+                                            args.delay if injected else 0.0, args.loss if injected else 0.0)
+                    results.append(result)
+                    print(f"{engine_name:>10} {size:>6} targets: {result['probes_per_sec']:>9.1f} probes/s "
+                          f"(offered {result['offered_per_sec']:.0f}), {result['cpu_us_per_probe'] or 0:.1f} us CPU/probe, "
+                          f"RTT p50 {result['rtt_p50_ms'] or 0:.3f} ms, error p50/p99 "
+                          f"{result['error_p50_ms'] or 0:+.3f}/{result['error_p99_ms'] or 0:+.3f} ms, "
+                          f"loss {result['loss_pct']:.2f}%", flush=True)
+        finally:
+            responder.stdin.close()
+            responder.wait(timeout=5)
+    finally:
+        if namespace:
+            namespace.__exit__()
+
+    memory = [{"targets": size, "bytes_per_target": round(measure_target_memory(size))} for size in sizes]
+    for entry in memory:
+        print(f"{'memory':>10} {entry['targets']:>6} targets: {entry['bytes_per_target']} bytes/target")
+    import platform
+    report = {"version": VERSION, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+              "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+              "config": {"duration_s": duration, "interval_s": interval, "delay_ms": args.delay, "loss_pct": args.loss,
+                         "network": "netns" if namespace else "loopback", "injection": injection},
+              "results": results, "memory": memory}
+    path = args.out or os.path.join(BENCH_DIR, f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=4)
+    print(f"Saved {path}")
+    return 0
+
+def load_report_records(directory: str, since_ns: int = 0, until_ns: int = 0):
+    """Concatenates the ts/target/rtt/ok columns of every log segment in [since, until), sorted by (target, ts)."""
+    columns: dict = {"ts": [], "target": [], "rtt": [], "ok": []}
+    for segment in read_result_log(directory):
+        if since_ns or until_ns:
+            keep = segment["ts"] >= since_ns
+            if until_ns:
+                keep &= segment["ts"] < until_ns
+            segment = segment[keep]
+        columns["ts"].append(segment["ts"])
+        columns["target"].append(segment["target"])
+        columns["rtt"].append(segment["rtt"])
+        columns["ok"].append(segment["status"] == STATUS_OK)
+    if not columns["ts"]:
+        return None
+    records = {name: np.concatenate(parts) for name, parts in columns.items()}
+    # Segments of concurrent writers (workers, sessions) interleave in time; one sort orders everything.
+    order = np.lexsort((records["ts"], records["target"]))
+    return {name: values[order] for name, values in records.items()}
+
+def _group_bounds(keys, count: int):
+    """(counts, starts) of each key 0..count-1 in an array sorted by key."""
+    counts = np.bincount(keys, minlength=count)
+    return counts, np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+def summarize_records(keys, count: int, ts, rtt, ok, utc_offset: float) -> dict:
+    """Per-key probe counts, RTT percentiles and hour-of-day tables, fully vectorized.
+
+    `keys` must be sorted. Percentiles are nearest-rank over the successful
+    probes of each key.
+    """
+    sent = np.bincount(keys, minlength=count)
+    failed = np.bincount(keys, weights=~ok, minlength=count).astype(np.int64)
+    ok_keys = keys[ok]
+    ok_rtt = rtt[ok].astype(np.float64)
+    # Offsetting each key's RTTs into its own range lets one plain sort order them by (key, rtt), far faster than lexsort.
+    span = float(ok_rtt.max()) + 1 if len(ok_rtt) else 1.0
+    sorted_rtt = np.sort(ok_keys * span + ok_rtt)
+    successes, starts = _group_bounds(ok_keys, count)
+    sorted_rtt -= np.repeat(np.arange(count) * span, successes)
+    summary = {"sent": sent, "failed": failed, "successes": successes,
+               "mean": np.divide(np.bincount(ok_keys, weights=ok_rtt, minlength=count), successes,
+                                 out=np.full(count, np.nan), where=successes > 0)}
+    for q in REPORT_PERCENTILES:
+        values = np.full(count, np.nan)
+        present = successes > 0
+        values[present] = sorted_rtt[starts[present] + np.floor((q / 100) * (successes[present] - 1)).astype(np.int64)]
+        summary[f"p{q}"] = values
+    hours = ((ts // 1_000_000_000 + int(utc_offset)) // 3600 % 24).astype(np.int64)
+    cells = keys.astype(np.int64) * 24 + hours
+    summary["hour_sent"] = np.bincount(cells, minlength=count * 24).reshape(count, 24)
+    summary["hour_failed"] = np.bincount(cells, weights=~ok, minlength=count * 24).reshape(count, 24)
+    summary["hour_rtt"] = np.bincount(cells[ok], weights=ok_rtt, minlength=count * 24).reshape(count, 24)
+    return summary
+
+def target_jitter(keys, count: int, rtt, ok):
+    """Mean |RTT difference| between consecutive successful probes of each target (records sorted by target, ts)."""
+    ok_keys = keys[ok]
+    ok_rtt = rtt[ok].astype(np.float64)
+    same = ok_keys[1:] == ok_keys[:-1]
+    deltas = np.abs(np.diff(ok_rtt))[same]
+    delta_keys = ok_keys[1:][same]
+    pairs = np.bincount(delta_keys, minlength=count)
+    return np.divide(np.bincount(delta_keys, weights=deltas, minlength=count), pairs,
+                     out=np.full(count, np.nan), where=pairs > 0)
+
+def find_outages(keys, ts, ok, min_probes: int = REPORT_OUTAGE_PROBES) -> dict:
+    """Runs of at least `min_probes` consecutive failures per target (records sorted by target, ts).
+
+    Returns arrays key/start_ns/end_ns/probes; an outage ends at the next
+    success of its target, or at its last failure if none followed.
+    """
+    failed = ~ok
+    boundary = np.ones(len(keys) + 1, dtype=bool)
+    boundary[1:-1] = (failed[1:] != failed[:-1]) | (keys[1:] != keys[:-1])
+    run_starts = np.flatnonzero(boundary[:-1])
+    run_ends = np.flatnonzero(boundary[1:])
+    outage = failed[run_starts] & (run_ends - run_starts + 1 >= min_probes)
+    starts, ends = run_starts[outage], run_ends[outage]
+    after = np.minimum(ends + 1, len(keys) - 1)
+    recovered = (ends + 1 < len(keys)) & (keys[after] == keys[starts])
+    return {"key": keys[starts], "start_ns": ts[starts], "end_ns": np.where(recovered, ts[after], ts[ends]),
+            "probes": ends - starts + 1, "ongoing": ~recovered}
+
+def _report_groups(index: dict, ids, by: str) -> Tuple[List[str], List[tuple]]:
+    """Group names and (target id, group number) pairs for tag, asn or org grouping."""
+    names: dict = {}
+    pairs = []
+    if by == "tag":
+        tags_of = {ResultLog._key(entry): entry["tags"] for entry in get_target_store().all()}
+        for target_id in ids:
+            for tag in tags_of.get(ResultLog._key(index[target_id]), []) or ["(untagged)"]:
+                pairs.append((target_id, names.setdefault(tag, len(names))))
+    else:
+        for target_id in ids:
+            value = index[target_id].get(by) or "N/A"
+            pairs.append((target_id, names.setdefault(value, len(names))))
+    return list(names), pairs
+
+def _lookup_report_ip_info(index: dict, ids) -> None:
+    """Adds ip/asn/org to the index entries, from the IP info cache (waiting briefly for new lookups)."""
+    addresses = get_resolver().resolve_many([index[target_id]["host"] for target_id in ids])
+    cache = get_ip_info_cache()
+    pending = set()
+    done = threading.Event()
+    lock = threading.Lock()
+
+    def on_info(ip_address: str) -> callable:
+        def store(info: dict) -> None:
+            with lock:
+                pending.discard(ip_address)
+                if not pending:
+                    done.set()
+        return store
+
+    for ip_address in set(filter(None, addresses.values())):
+        if cache.peek(ip_address) is None:
+            with lock:
+                pending.add(ip_address)
+            cache.lookup_async(ip_address, on_info(ip_address))
+    if pending and not done.wait(REPORT_IPINFO_WAIT):
+        log_error(f"Note: {len(pending)} ASN/Org lookups did not finish in time; they are grouped as N/A.")
+    for target_id in ids:
+        entry = index[target_id]
+        entry["ip"] = addresses.get(entry["host"])
+        info = cache.peek(entry["ip"]) if entry["ip"] else None
+        entry["asn"] = info["asn"] if info else "N/A"
+        entry["org"] = info["org"] if info else "N/A"
+    cache.save()
+
+def build_report(directory: str, since_ns: int = 0, until_ns: int = 0, group_by: str = "tag") -> Optional[dict]:
+    """Computes per-target and per-group availability, percentiles, jitter, outages and hour-of-day tables."""
+    records = load_report_records(directory, since_ns, until_ns)
+    if records is None or not len(records["ts"]):
+        return None
+    index = load_log_index(directory)
+    keys, ts, rtt, ok = records["target"].astype(np.int64), records["ts"], records["rtt"], records["ok"]
+    count = int(keys.max()) + 1
+    utc_offset = time.localtime().tm_gmtoff
+    targets = summarize_records(keys, count, ts, rtt, ok, utc_offset)
+    targets["jitter"] = target_jitter(keys, count, rtt, ok)
+    outages = find_outages(keys, ts, ok)
+    targets["outages"] = np.bincount(outages["key"], minlength=count)
+    downtime = (outages["end_ns"] - outages["start_ns"]) / 1e9
+    targets["downtime"] = np.bincount(outages["key"], weights=downtime, minlength=count)
+    ids = [int(target_id) for target_id in np.flatnonzero(targets["sent"])]
+    for target_id in ids:
+        index.setdefault(target_id, {"id": target_id, "name": f"#{target_id}", "host": "?", "method": "?", "port": None})
+    if group_by in ("asn", "org"):
+        _lookup_report_ip_info(index, ids)
+
+    groups = None
+    if group_by != "none":
+        names, pairs = _report_groups(index, ids, group_by)
+        pair_targets = np.array([target_id for target_id, _ in pairs], dtype=np.int64)
+        pair_groups = np.array([group for _, group in pairs], dtype=np.int64)
+        # Each record counts once per group its target belongs to (a target can carry several tags).
+        counts, starts = _group_bounds(keys, count)
+        lengths = counts[pair_targets]
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        rows = np.repeat(starts[pair_targets], lengths) + offsets
+        group_keys = np.repeat(pair_groups, lengths)
+        order = np.argsort(group_keys, kind="stable")
+        rows, group_keys = rows[order], group_keys[order]
+        groups = summarize_records(group_keys, len(names), ts[rows], rtt[rows], ok[rows], utc_offset)
+        weights = np.bincount(pair_groups, weights=np.nan_to_num(targets["jitter"][pair_targets]) * targets["successes"][pair_targets],
+                              minlength=len(names))
+        groups["jitter"] = np.divide(weights, groups["successes"], out=np.full(len(names), np.nan), where=groups["successes"] > 0)
+        groups["targets"] = np.bincount(pair_groups, minlength=len(names))
+        groups["outages"] = np.bincount(pair_groups, weights=targets["outages"][pair_targets], minlength=len(names)).astype(np.int64)
+        groups["downtime"] = np.bincount(pair_groups, weights=targets["downtime"][pair_targets], minlength=len(names))
+        groups["names"] = names
+    return {"index": index, "ids": ids, "targets": targets, "groups": groups, "group_by": group_by, "outages": outages,
+            "first_ns": int(ts.min()), "last_ns": int(ts.max()), "records": len(ts), "utc_offset": utc_offset}
+
+def _report_rows(summary: dict, positions, labels: List[list]) -> List[list]:
+    """Table rows of a summary: the given labels, then counts, availability, percentiles, jitter and outages."""
+    rows = []
+    for position, label in zip(positions, labels):
+        sent = int(summary["sent"][position])
+        failed = int(summary["failed"][position])
+        values = [summary[f"p{q}"][position] for q in REPORT_PERCENTILES] + [summary["mean"][position], summary["jitter"][position]]
+        rows.append(label + [sent, failed, f"{(sent - failed) / sent * 100:.3f}" if sent else ""]
+                    + ["" if math.isnan(value) else f"{value:.3f}" for value in values]
+                    + [int(summary["outages"][position]), f"{summary['downtime'][position]:.0f}"])
+    return rows
+
+REPORT_STAT_COLUMNS = (["sent", "failed", "availability_pct"] + [f"p{q}_ms" for q in REPORT_PERCENTILES]
+                       + ["mean_ms", "jitter_ms", "outages", "downtime_s"])
+
+def _report_tables(report: dict) -> dict:
+    """The report as plain tables (header + rows) shared by the CSV and HTML writers."""
+    index, ids, targets = report["index"], report["ids"], report["targets"]
+    target_columns = ["name", "host", "method", "port"] + (["ip", "asn", "org"] if report["group_by"] in ("asn", "org") else [])
+    labels = [[index[i].get(column) if index[i].get(column) is not None else "" for column in target_columns] for i in ids]
+    tables = {"targets": (target_columns + REPORT_STAT_COLUMNS, _report_rows(targets, ids, labels))}
+    groups = report["groups"]
+    if groups:
+        labels = [[name, int(groups["targets"][position])] for position, name in enumerate(groups["names"])]
+        tables["groups"] = ([report["group_by"], "targets"] + REPORT_STAT_COLUMNS,
+                            _report_rows(groups, range(len(groups["names"])), labels))
+    outages = report["outages"]
+    order = np.argsort(outages["start_ns"])
+    tables["outages"] = (["name", "host", "start", "end", "duration_s", "failed_probes", "ongoing"],
+                         [[index[int(outages["key"][i])]["name"], index[int(outages["key"][i])]["host"],
+                           time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(outages["start_ns"][i] / 1e9)),
+                           time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(outages["end_ns"][i] / 1e9)),
+                           f"{(outages['end_ns'][i] - outages['start_ns'][i]) / 1e9:.0f}", int(outages["probes"][i]),
+                           "yes" if outages["ongoing"][i] else ""] for i in order])
+    heatmaps = [("target", targets, ids, [index[i]["name"] for i in ids])]
+    if groups:
+        heatmaps.insert(0, (report["group_by"], groups, range(len(groups["names"])), groups["names"]))
+    for kind, summary, positions, names in heatmaps:
+        rows = []
+        for position, name in zip(positions, names):
+            hour_sent = summary["hour_sent"][position]
+            hour_ok = hour_sent - summary["hour_failed"][position]
+            availability = np.divide(hour_ok, hour_sent, out=np.full(24, np.nan), where=hour_sent > 0) * 100
+            mean_rtt = np.divide(summary["hour_rtt"][position], hour_ok, out=np.full(24, np.nan), where=hour_ok > 0)
+            rows.append([name] + [("" if math.isnan(a) else f"{a:.2f}", "" if math.isnan(r) else f"{r:.2f}")
+                                  for a, r in zip(availability, mean_rtt)])
+        tables[f"heatmap_{kind}"] = ([kind] + [f"{hour:02d}h" for hour in range(24)], rows)
+    return tables
+
+def write_report_csv(report: dict, path: str) -> List[str]:
+    """Writes one CSV per table next to `path` and returns their paths."""
+    import csv
+    base = path[:-4] if path.endswith(".csv") else path
+    written = []
+    for name, (header, rows) in _report_tables(report).items():
+        table_path = path if name == "targets" else f"{base}-{name}.csv"
+        with open(table_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            if name.startswith("heatmap_"):
+                # One availability and one mean-RTT column per hour.
+                writer.writerow([header[0]] + [f"{hour}_{field}" for hour in header[1:] for field in ("availability_pct", "rtt_ms")])
+                writer.writerows([row[0]] + [value for cell in row[1:] for value in cell] for row in rows)
+            else:
+                writer.writerow(header)
+                writer.writerows(rows)
+        written.append(table_path)
+    return written
+
+def write_report_html(report: dict, path: str) -> List[str]:
+    """Writes the report as one self-contained HTML page and returns its path."""
+    from html import escape
+    tables = _report_tables(report)
+    span = (f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(report['first_ns'] / 1e9))} to "
+            f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(report['last_ns'] / 1e9))}")
+    parts = ["<!DOCTYPE html><html><head><meta charset='utf-8'><title>Sry-Ping report</title><style>",
+             "body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;margin-bottom:2em;font-size:13px}",
+             "th,td{border:1px solid #ccc;padding:3px 6px;text-align:right}th{background:#eee}td:first-child{text-align:left}",
+             ".heat td{width:2.2em;text-align:center}</style></head><body>",
+             f"<h1>Sry-Ping report</h1><p>{span} &middot; {report['records']:,} probes &middot; {len(report['ids'])} targets</p>"]
+
+    def table(title: str, name: str) -> None:
+        header, rows = tables[name]
+        parts.append(f"<h2>{escape(title)}</h2><table><tr>{''.join(f'<th>{escape(str(h))}</th>' for h in header)}</tr>")
+        parts.extend("<tr>" + "".join(f"<td>{escape(str(value))}</td>" for value in row) + "</tr>" for row in rows)
+        parts.append("</table>")
+
+    def heatmap(title: str, name: str, rows: Optional[list] = None) -> None:
+        header, all_rows = tables[name]
+        rows = all_rows if rows is None else rows
+        parts.append(f"<h2>{escape(title)}</h2><table class='heat'><tr>{''.join(f'<th>{escape(h)}</th>' for h in header)}</tr>")
+        for row in rows:
+            cells = []
+            for availability, mean_rtt in row[1:]:
+                if not availability:
+                    cells.append("<td></td>")
+                    continue
+                # Green at 100% availability, fading to red at REPORT_HEATMAP_FLOOR and below.
+                share = min(max((float(availability) - REPORT_HEATMAP_FLOOR) / (100 - REPORT_HEATMAP_FLOOR), 0), 1)
+                color = f"hsl({share * 120:.0f},70%,70%)"
+                tooltip = f"{availability}% up" + (f", {mean_rtt} ms" if mean_rtt else "")
+                cells.append(f"<td style='background:{color}' title='{tooltip}'>{float(availability):.0f}</td>")
+            parts.append(f"<tr><td>{escape(str(row[0]))}</td>{''.join(cells)}</tr>")
+        parts.append("</table>")
+
+    if "groups" in tables:
+        table(f"By {report['group_by']}", "groups")
+        heatmap(f"Availability by hour of day (%), by {report['group_by']}", f"heatmap_{report['group_by']}")
+    table("Targets", "targets")
+    table("Outages", "outages")
+    # Thousands of heatmap rows make the page unreadable; show the targets with the lowest availability.
+    targets = report["targets"]
+    availability = 1 - targets["failed"][report["ids"]] / targets["sent"][report["ids"]]
+    worst = np.argsort(availability, kind="stable")[:REPORT_HTML_HEATMAP_ROWS]
+    title = "Availability by hour of day (%), by target"
+    if len(report["ids"]) > REPORT_HTML_HEATMAP_ROWS:
+        title += f", {REPORT_HTML_HEATMAP_ROWS} least available"
+    heatmap(title, "heatmap_target", [tables["heatmap_target"][1][position] for position in worst])
+    parts.append("</body></html>")
+    with open(path, 'w') as f:
+        f.write("\n".join(parts))
+    return [path]
+
+def run_report(args) -> int:
+    """Summarizes stored probe results into an HTML or CSV report."""
+    if _load_numpy() is None:
+        log_error("Error: 'report' needs NumPy (pip install numpy).")
+        return 2
+    now_ns = time.time_ns()
+    since_ns = now_ns - int(args.since * 1e9) if args.since is not None else 0
+    until_ns = now_ns - int(args.until * 1e9) if args.until is not None else 0
+    if not os.path.isdir(args.log):
+        log_error(f"Error: No result log at '{args.log}'.")
+        return 2
+    started = time.perf_counter()
+    report = build_report(args.log, since_ns, until_ns, args.group)
+    if report is None:
+        log_error("Error: No probe results in that time range.")
+        return 2
+    path = args.out or os.path.join(REPORT_DIR, f"report-{time.strftime('%Y%m%d-%H%M%S')}.{args.format}")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    written = (write_report_html if args.format == "html" else write_report_csv)(report, path)
+    print(f"Summarized {report['records']:,} probes of {len(report['ids'])} targets in "
+          f"{time.perf_counter() - started:.2f} s: {', '.join(written)}")
+    return 0
+
+def cli(argv: List[str]) -> int:
+    """Dispatches command-line subcommands; without one, starts the interactive menus."""
+    if not argv:
+        main()
+        return 0
+    import argparse
+    # Settings first: they provide the defaults of the flags below.
+    load_settings()
+    parser = argparse.ArgumentParser(prog="sry.py", description=f"Sry-Ping v{VERSION}")
+    instrumentation = argparse.ArgumentParser(add_help=False)
+    instrumentation.add_argument("--self-stats", action="store_true", default=argparse.SUPPRESS,
+                                 help="time Sry-Ping's own stages (schedule, send, wait, parse, record, render, export, ...)")
+    instrumentation.add_argument("--profile", metavar="FILE", default=argparse.SUPPRESS,
+                                 help="sample stacks while running and write them to FILE as collapsed stacks for flame graphs")
+    parser.add_argument("--self-stats", action="store_true", help="start the interactive menus with self-stats shown")
+    parser.add_argument("--profile", metavar="FILE", help="sample stacks while the interactive menus run")
+    subparsers = parser.add_subparsers(dest="command")
+    run_parser = subparsers.add_parser("run", parents=[instrumentation], help="probe targets headless, without the interactive UI")
+    run_parser.add_argument("--targets", help="targets file (.json, .jsonl, or host[,method[,port[,name]]] lines); defaults to saved pings")
+    run_parser.add_argument("--select", default="", help="probe only saved pings whose name/host starts with this, or 'tag:<name>'")
+    run_parser.add_argument("--interval", type=parse_duration, default=1.0, help="probe interval for targets without their own (e.g. 500ms, 1s, 1m)")
+    run_parser.add_argument("--output", choices=("jsonl", "binary", "prom"), default="jsonl")
+    run_parser.add_argument("--out", help="output file (jsonl/prom) or log directory (binary); jsonl and prom default to stdout")
+    run_parser.add_argument("--duration", type=parse_duration, help="stop after this long instead of running until interrupted")
+    run_parser.add_argument("--metrics-port", type=int, default=metrics_port, help="serve Prometheus metrics on this port at /metrics (0 = off)")
+    run_parser.add_argument("--events", help="append RTT-shift and loss change events as JSON lines to this file ('-' = stderr)")
+    def buckets_argument(value: str) -> Tuple[float, ...]:
+        try:
+            return parse_buckets(value)
+        except ValueError as e:
+            run_parser.error(f"argument --buckets: {e}")
+
+    run_parser.add_argument("--buckets", type=buckets_argument, help="comma-separated RTT histogram bounds in ms")
+    run_parser.add_argument("--source-ports", default=tcp_source_ports, help="source-port range for TCP probes, e.g. 40000-40999")
+    run_parser.add_argument("--max-in-flight", type=int, default=FLEET_MAX_IN_FLIGHT, help="cap on concurrent probes (per worker)")
+    run_parser.add_argument("--adaptive", action=argparse.BooleanOptionalAction, default=adaptive_probing,
+                            help="back off stable targets and burst on loss or RTT shifts")
+    run_parser.add_argument("--adaptive-max-rate", type=float, default=adaptive_max_rate,
+                            help="per-target probes/sec ceiling during adaptive bursts")
+    run_parser.add_argument("--workers", type=int, default=fleet_workers, help="worker processes to shard targets across (0 = one per CPU)")
+    import_parser = subparsers.add_parser("import", help="bulk-import targets into the saved pings")
+    import_parser.add_argument("file", help="targets file (.csv with a header row, .json, .jsonl, or host[,method[,port[,name]]] lines)")
+    import_parser.add_argument("--tags", default="", help="comma-separated tags added to every imported target")
+    bench_parser = subparsers.add_parser("bench", help="benchmark the probe engines against local responders")
+    def sizes_argument(value: str) -> List[int]:
+        try:
+            sizes = [int(part) for part in value.split(",")]
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid size list '{value}' (expected target counts such as 10,1000)")
+        if not all(size > 0 for size in sizes):
+            raise argparse.ArgumentTypeError(f"invalid size list '{value}' (target counts must be positive)")
+        return sizes
+
+    bench_parser.add_argument("--sizes", type=sizes_argument, default="10,1000,10000", help="comma-separated target counts")
+    bench_parser.add_argument("--engines", default="icmp,pythonping,tcp", help="comma-separated engines: icmp, pythonping, tcp")
+    bench_parser.add_argument("--duration", type=parse_duration, default=5.0, help="measurement time per engine and size")
+    bench_parser.add_argument("--interval", type=parse_duration, default=0.1, help="probe interval of every target")
+    bench_parser.add_argument("--delay", type=float, default=5.0, help="injected one-way delay in ms")
+    bench_parser.add_argument("--loss", type=float, default=0.0, help="injected loss in percent")
+    bench_parser.add_argument("--netns", action=argparse.BooleanOptionalAction, default=True,
+                              help="run responders in a network namespace (root) instead of on loopback")
+    bench_parser.add_argument("--out", help=f"results file (default {BENCH_DIR}/bench-<time>.json)")
+    report_parser = subparsers.add_parser("report", help="summarize stored probe results as HTML or CSV")
+    report_parser.add_argument("--log", default=RESULT_LOG_DIR, help="result log directory")
+    report_parser.add_argument("--since", type=parse_duration, help="only results newer than this (e.g. 24h, 30d)")
+    report_parser.add_argument("--until", type=parse_duration, help="only results older than this (e.g. 1d)")
+    report_parser.add_argument("--group", choices=("tag", "asn", "org", "none"), default="tag",
+                               help="group targets by saved-ping tag or by ASN/Org")
+    report_parser.add_argument("--format", choices=("html", "csv"), default="html")
+    report_parser.add_argument("--out", help=f"output file (default {REPORT_DIR}/report-<time>.<format>)")
+    args = parser.parse_args(argv)
+    global profile_path
+    if args.self_stats:
+        enable_self_stats()
+    sampler = None
+    if args.profile:
+        profile_path = args.profile
+        sampler = StackSampler().start()
+    try:
+        if args.command is None:
+            main()
+        elif args.command == "run":
+            return run_headless(args)
+        elif args.command == "bench":
+            return run_bench(args)
+        elif args.command == "report":
+            return run_report(args)
+        elif args.command == "import":
+            try:
+                count = import_targets_file(args.file, args.tags)
+            except (OSError, ValueError, KeyError) as e:
+                log_error(f"Error: Could not import '{args.file}': {e}")
+                return 2
+            print(f"Imported {count} saved pings.")
+    finally:
+        if sampler:
+            sampler.stop()
+            sampler.write(args.profile)
+    return 0
 
 def main() -> None:
     """Main program loop."""
+    _load_ui()
+    load_settings()
+    os.system(f"title SryPing - {VERSION} by shellXploit")
     while True:
         show_menu()
         choice = getch().lower()
@@ -560,4 +5138,4 @@ def main() -> None:
             time.sleep(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(cli(sys.argv[1:]))
\ No newline at end of file
@@ -0,0 +1,43 @@
+import random
+
+import sry
+
+
+def _simulate(latencies):
+    """Feeds RTTs through a target's detectors and an adaptive policy the way FleetEngine does.
+
+    Returns the simulated seconds elapsed and the number of bursts.
+    """
+    target = sry.Target("t", "192.0.2.1", "ICMP")
+    policy = sry.AdaptiveInterval(1.0)
+    bursts = []
+
+    def on_change(event):
+        if event.target is target and policy.burst():
+            bursts.append(event)
+
+    monitor = sry.get_change_monitor()
+    monitor.add_hook(on_change)
+    elapsed = 0.0
+    try:
+        for latency in latencies:
+            elapsed += policy.interval
+            target.record(latency, True)
+            policy.update(latency, True)
+    finally:
+        monitor.remove_hook(on_change)
+    return elapsed, len(bursts)
+
+
+def test_heavy_tailed_jitter_still_backs_off():
+    rng = random.Random(1)
+    elapsed, bursts = _simulate([20 + rng.expovariate(1 / 5) for _ in range(10000)])
+    assert bursts <= 5
+    assert 10000 / elapsed < 0.2
+
+
+def test_rtt_step_triggers_burst():
+    rng = random.Random(2)
+    latencies = [20 + rng.gauss(0, 0.5) for _ in range(500)] + [30 + rng.gauss(0, 0.5) for _ in range(50)]
+    _, bursts = _simulate(latencies)
+    assert bursts == 1
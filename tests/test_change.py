@@ -0,0 +1,23 @@
+import random
+
+import pytest
+
+import sry
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("before, after", [(20, 30), (30, 20)])
+def test_rtt_step_reports_one_event_with_post_shift_level(seed, before, after):
+    rng = random.Random(seed)
+    cusum = sry.RttCusum()
+    events = []
+    for i in range(3000):
+        shift = cusum.add((before if i < 1000 else after) + rng.gauss(0, 1))
+        if shift:
+            events.append((i, *shift))
+
+    assert len(events) == 1
+    index, reported_before, reported_after = events[0]
+    assert 1000 <= index < 1000 + 20
+    assert reported_before == pytest.approx(before, abs=0.5)
+    assert reported_after == pytest.approx(after, abs=1.0)
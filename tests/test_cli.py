@@ -0,0 +1,58 @@
+import time
+
+import pytest
+
+import sry
+
+
+def test_parse_buckets():
+    assert sry.parse_buckets("1,5,10.5") == (1.0, 5.0, 10.5)
+    for value in ("", "1,,5", "1,x", "0,1", "-1", "nan", "inf", "5,1", "1,1"):
+        with pytest.raises(ValueError):
+            sry.parse_buckets(value)
+
+
+def test_bad_buckets_is_a_usage_error(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(SystemExit) as exit_info:
+        sry.cli(["run", "--output", "prom", "--buckets", "10,5"])
+    assert exit_info.value.code == 2
+    assert "argument --buckets" in capsys.readouterr().err
+
+
+def test_bad_interval_is_a_usage_error(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    for command in ("run", "bench"):
+        with pytest.raises(SystemExit) as exit_info:
+            sry.cli([command, "--interval", "soon"])
+        assert exit_info.value.code == 2
+        assert "argument --interval" in capsys.readouterr().err
+
+
+def test_report_time_range(tmp_path, capsys):
+    log = sry.ResultLog(str(tmp_path / "log"))
+    target = sry.Target("a", "192.0.2.1", "ICMP")
+    now_ns = time.time_ns()
+    log.write(target, now_ns - 2 * 3600 * 10**9, 5.0, True)
+    log.write(target, now_ns, 7.0, True)
+    log.flush()
+    common = ["report", "--log", str(tmp_path / "log"), "--format", "csv", "--out", str(tmp_path / "report.csv")]
+
+    assert sry.cli(common + ["--since", "1h"]) == 0
+    assert "Summarized 1 probes" in capsys.readouterr().out
+    assert sry.cli(common + ["--until", "1h"]) == 0
+    assert "Summarized 1 probes" in capsys.readouterr().out
+    assert sry.cli(common + ["--since", "0s"]) == 2
+
+    with pytest.raises(SystemExit) as exit_info:
+        sry.cli(common + ["--since", "yesterday"])
+    assert exit_info.value.code == 2
+    assert "argument --since" in capsys.readouterr().err
+
+
+def test_bad_sizes_is_a_usage_error(capsys):
+    for value in ("", "10,x", "10,0", "-5"):
+        with pytest.raises(SystemExit) as exit_info:
+            sry.cli(["bench", "--sizes", value])
+        assert exit_info.value.code == 2
+        assert "argument --sizes" in capsys.readouterr().err
@@ -0,0 +1,33 @@
+import sys
+import threading
+
+import sry
+
+
+def test_scrape_while_targets_register():
+    errors = []
+
+    def register(registry, worker):
+        for number in range(2000):
+            target = sry.Target(f"w{worker}-{number}", "192.0.2.1", "HTTP", 80)
+            registry.observe(target, 5.0, True, "", {f"phase{number % 50}": 1.0, "ttfb": 2.0})
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for _ in range(10):
+            registry = sry.MetricsRegistry(max_series=100000)
+            writers = [threading.Thread(target=register, args=(registry, worker)) for worker in range(4)]
+            for thread in writers:
+                thread.start()
+            try:
+                while any(thread.is_alive() for thread in writers):
+                    registry.render()
+            except RuntimeError as e:
+                errors.append(e)
+            for thread in writers:
+                thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert not errors
+    assert "sryping_probe_phase_seconds_sum" in registry.render()
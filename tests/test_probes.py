@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+import sry
+
+
+class SilentProbe(sry.ProbePlugin):
+    """Never calls back, like a plugin that lost its callback."""
+    method = "SILENT"
+    label = "Silent"
+    timeout = 0.1
+
+    def start(self, target, callback):
+        pass
+
+
+def _dns_target(name):
+    target = sry.Target("dns", "127.0.0.1", "DNS", 53, query=name)
+    target.ip_address = "127.0.0.1"
+    return target
+
+
+def test_probe_reports_synchronous_plugin_error():
+    latency, success, message = sry.get_probe("DNS").probe(_dns_target("a" * 64 + ".example"))
+    assert (latency, success) == (-1, False)
+    assert "UnicodeError" in message
+
+
+def test_probe_async_reports_synchronous_plugin_error():
+    latency, success, _ = asyncio.run(sry.get_probe("DNS").probe_async(_dns_target("a" * 64 + ".example")))
+    assert (latency, success) == (-1, False)
+
+
+def test_probe_gives_up_without_callback(monkeypatch):
+    monkeypatch.setattr(sry, "PROBE_RESULT_GRACE", 0.1)
+    target = sry.Target("t", "127.0.0.1", "SILENT")
+    start = time.perf_counter()
+    assert SilentProbe().probe(target)[1] is False
+    assert asyncio.run(SilentProbe().probe_async(target))[1] is False
+    assert time.perf_counter() - start < 2
+
+
+def test_http_probe_reports_unexpected_error(monkeypatch):
+    plugin = sry.get_probe("HTTP")
+
+    def broken(*args):
+        raise ValueError("bad")
+
+    monkeypatch.setattr(plugin, "_connect", broken)
+    target = sry.Target("web", "127.0.0.1", "HTTP", 80)
+    target.ip_address = "127.0.0.1"
+    latency, success, message = plugin.probe(target)
+    assert (latency, success) == (-1, False)
+    assert "ValueError" in message
@@ -0,0 +1,45 @@
+import sry
+
+
+def test_concurrent_logs_allocate_distinct_ids(tmp_path):
+    # Two processes sharing a directory each load the index once at startup.
+    first = sry.ResultLog(str(tmp_path))
+    second = sry.ResultLog(str(tmp_path))
+    a = sry.Target("a", "192.0.2.1", "ICMP")
+    b = sry.Target("b", "192.0.2.2", "ICMP")
+    c = sry.Target("c", "192.0.2.3", "TCP", 80)
+
+    assert first.target_id(a) == 1
+    assert second.target_id(b) == 2
+    assert first.target_id(c) == 3
+    assert second.target_id(a) == 1
+
+    index = sry.load_log_index(str(tmp_path))
+    assert {entry["id"]: entry["name"] for entry in index.values()} == {1: "a", 2: "b", 3: "c"}
+
+
+def test_numpy_is_loaded_only_for_readback(tmp_path):
+    import os
+    import subprocess
+    import sys
+    code = ("import sys, sry; assert 'numpy' not in sys.modules; "
+            f"log = sry.ResultLog({str(tmp_path)!r}); log.write(sry.Target('a', '192.0.2.1', 'ICMP'), 1, 2.0, True); "
+            f"log.flush(); assert 'numpy' not in sys.modules; "
+            f"segments = sry.read_result_log({str(tmp_path)!r}); assert segments[0]['rtt'][0] == 2.0")
+    subprocess.run([sys.executable, "-c", code], cwd=str(tmp_path.parent), check=True,
+                   env={**os.environ, "PYTHONPATH": os.path.dirname(os.path.abspath(sry.__file__))})
+
+
+def test_targets_do_not_open_the_log(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    target = sry.Target("a", "192.0.2.1", "ICMP")
+    target.record(1.0, True)
+    assert target.result_log is None
+    assert not (tmp_path / sry.RESULT_LOG_DIR).exists()
+
+
+def test_engine_attaches_its_log(tmp_path):
+    log = sry.ResultLog(str(tmp_path))
+    targets = [sry.Target("a", "192.0.2.1", "ICMP"), sry.Target("b", "192.0.2.2", "ICMP")]
+    sry.FleetEngine(targets, result_log=log)
+    assert all(target.result_log is log for target in targets)
@@ -0,0 +1,111 @@
+import asyncio
+
+import sry
+
+
+class FakeClock:
+    def __init__(self, now_ns=0):
+        self.now_ns = now_ns
+
+    def __call__(self):
+        return self.now_ns
+
+
+def test_pop_due_in_deadline_order():
+    clock = FakeClock()
+    scheduler = sry.ProbeScheduler(clock)
+    scheduler.add("c", 1.0, phase=0.75)
+    scheduler.add("a", 1.0, phase=0.0)
+    scheduler.add("b", 2.0, phase=0.25)
+    assert scheduler.next_deadline_ns() == 0
+
+    assert scheduler.pop_due(600_000_000) == [("a", 0), ("b", 500_000_000)]
+    assert scheduler.pop_due(1_000_000_000) == [("c", 750_000_000), ("a", 1_000_000_000)]
+    assert scheduler.pop_due(1_800_000_000) == [("c", 1_750_000_000)]
+    assert scheduler.next_deadline_ns() == 2_000_000_000
+    assert scheduler.deadline_of("b") == 2_500_000_000
+    assert scheduler.skipped == 0
+
+
+def test_removed_and_rescheduled_items_leave_no_stale_deadlines():
+    clock = FakeClock()
+    scheduler = sry.ProbeScheduler(clock)
+    scheduler.add("a", 1.0, phase=0.5)
+    scheduler.add("b", 1.0, phase=0.9)
+    scheduler.remove("a")
+    scheduler.set_interval("b", 0.1)
+    assert scheduler.next_deadline_ns() == 100_000_000
+    assert scheduler.pop_due(1_000_000_000)[0] == ("b", 100_000_000)
+    assert scheduler.interval_of("a") is None
+
+
+def test_new_items_are_phase_spread():
+    scheduler = sry.ProbeScheduler(FakeClock())
+    count = 1000
+    for item in range(count):
+        scheduler.add(item, 1.0)
+    deadlines = sorted(scheduler.deadline_of(item) for item in range(count))
+    assert len(set(deadlines)) == count
+    assert 0 <= deadlines[0] and deadlines[-1] < 1_000_000_000
+    gaps = [high - low for low, high in zip(deadlines, deadlines[1:])]
+    # A golden-ratio sequence keeps every gap within a small factor of the even spacing.
+    assert max(gaps) < 3 * 1_000_000_000 / count
+
+
+def test_skew_and_skipped_ticks():
+    clock = FakeClock()
+    scheduler = sry.ProbeScheduler(clock)
+    scheduler.add("a", 1.0, phase=0.0)
+
+    clock.now_ns = 5_000_000
+    [(item, deadline_ns)] = scheduler.pop_due(clock())
+    assert scheduler.record_send(deadline_ns) == 5.0
+    assert scheduler.record_send(clock.now_ns + 1_000_000) == 0.0
+
+    # Overrunning by 3.5 intervals skips the missed ticks instead of bursting them.
+    clock.now_ns = 4_500_000_000
+    assert scheduler.pop_due(clock()) == [("a", 1_000_000_000)]
+    assert scheduler.skipped == 3
+    assert scheduler.deadline_of("a") == 5_000_000_000
+    assert scheduler.skew.count == 2
+    assert scheduler.skew.max == 5.0
+
+
+class BlockingEngine(sry.FleetEngine):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = asyncio.Event()
+        self.peak = 0
+
+    async def _probe(self, target):
+        self.peak = max(self.peak, self.in_flight)
+        await self.release.wait()
+        return sry.ProbeResult(1.0, True, "ok")
+
+
+def test_in_flight_is_capped_by_max_in_flight():
+    clock = FakeClock()
+    targets = [sry.Target(f"t{i}", f"192.0.2.{i + 1}", "ICMP") for i in range(20)]
+    engine = BlockingEngine(targets, max_in_flight=3, clock=clock)
+
+    async def settle():
+        for _ in range(50):
+            await asyncio.sleep(0)
+
+    async def scenario():
+        run = asyncio.create_task(engine.run())
+        while len(engine.scheduler.entries) < len(targets):
+            await asyncio.sleep(0.01)
+        clock.now_ns += 999_000_000  # every target's first deadline is now due
+        engine._wakeup.set()
+        await settle()
+        assert engine.in_flight == 3
+        assert len(engine._busy) == len(targets)
+        engine.release.set()
+        await settle()
+        engine.stop()
+        await run
+
+    asyncio.run(scenario())
+    assert engine.peak == 3
+    assert sum(target.stats.sent for target in targets) == len(targets)
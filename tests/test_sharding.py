@@ -0,0 +1,47 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+
+import sry
+
+
+def _serve_dns(sock: socket.socket, names: list) -> None:
+    """Answers every query with an empty NOERROR reply and records the name asked for."""
+    while True:
+        try:
+            data, address = sock.recvfrom(512)
+        except OSError:
+            return
+        labels, offset = [], 12
+        while data[offset]:
+            labels.append(data[offset + 1:offset + 1 + data[offset]].decode())
+            offset += 1 + data[offset]
+        names.append(".".join(labels) or ".")
+        sock.sendto(data[:2] + b"\x81\x80" + data[4:6] + b"\0" * 6 + data[12:offset + 5], address)
+
+
+def test_sharded_run_keeps_dns_query(tmp_path):
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.bind(("127.0.0.1", 0))
+    port = server.getsockname()[1]
+    names: list = []
+    threading.Thread(target=_serve_dns, args=(server, names), daemon=True).start()
+
+    targets = tmp_path / "targets.jsonl"
+    with open(targets, "w") as f:
+        for number in range(2):
+            f.write(json.dumps({"name": f"dns{number}", "host": "127.0.0.1", "method": "DNS", "port": port,
+                                "interval": 0.2, "query": "example.com"}) + "\n")
+    result = subprocess.run([sys.executable, os.path.abspath(sry.__file__), "run", "--targets", str(targets),
+                             "--workers", "2", "--duration", "3s", "--output", "jsonl"],
+                            cwd=tmp_path, capture_output=True, text=True, timeout=60)
+    server.close()
+
+    assert result.returncode == 0, result.stderr
+    lines = [json.loads(line) for line in result.stdout.splitlines() if line.strip()]
+    assert {line["name"] for line in lines} == {"dns0", "dns1"}
+    assert all(line["ok"] for line in lines)
+    assert names and set(names) == {"example.com"}
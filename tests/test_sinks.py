@@ -0,0 +1,22 @@
+import io
+import json
+
+import sry
+
+
+def test_jsonl_sink_escapes_every_field():
+    stream = io.StringIO()
+    sink = sry.JsonlSink(stream)
+    target = sry.Target('db "primary"\\1', 'host"\n', "HTTP", 80)
+    target.ip_address = 'fe80::1%eth"0'
+    sink(target, 12.3456, True, "", {"ttfb": 1.23456})
+    target.ip_address = None
+    sink(target, -1, False, "")
+    sink.flush()
+
+    first, second = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert first["name"] == 'db "primary"\\1' and first["host"] == 'host"\n'
+    assert first["ip"] == 'fe80::1%eth"0'
+    assert first["rtt_ms"] == 12.346 and first["ok"] is True
+    assert first["timings"] == {"ttfb": 1.235}
+    assert second["ip"] is None and second["rtt_ms"] is None and second["ok"] is False
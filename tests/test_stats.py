@@ -0,0 +1,49 @@
+import math
+import random
+
+import pytest
+
+import sry
+
+
+def samples(seed, n):
+    rng = random.Random(seed)
+    return [rng.lognormvariate(math.log(20), 0.8) for _ in range(n)]
+
+
+@pytest.mark.parametrize("q", [0.5, 0.95, 0.99])
+def test_sketch_quantiles_within_relative_error(q):
+    values = samples(1, 20000)
+    sketch = sry.LatencySketch(relative_accuracy=0.01)
+    for value in values:
+        sketch.add(value)
+    exact = sorted(values)[int(q * (len(values) - 1))]
+    assert sketch.quantile(q) == pytest.approx(exact, rel=0.01)
+
+
+def test_sketch_empty_and_zero():
+    sketch = sry.LatencySketch()
+    assert sketch.quantile(0.5) is None
+    sketch.add(0.0)
+    assert sketch.quantile(0.5) == 0.0
+
+
+def test_merge_matches_single_pass():
+    results = [(latency, i % 7 != 0) for i, latency in enumerate(samples(2, 3000))]
+    single = sry.RunningStats()
+    for latency, success in results:
+        single.add(latency, success)
+    merged = sry.RunningStats()
+    for part in (results[:1000], results[1000:1200], [], results[1200:]):
+        stats = sry.RunningStats()
+        for latency, success in part:
+            stats.add(latency, success)
+        merged.merge(stats)
+
+    assert (merged.sent, merged.failed, merged.count) == (single.sent, single.failed, single.count)
+    assert (merged.min, merged.max) == (single.min, single.max)
+    assert merged.mean == pytest.approx(single.mean, rel=1e-12)
+    assert merged.variance == pytest.approx(single.variance, rel=1e-9)
+    assert merged.sketch.buckets == single.sketch.buckets
+    for q in (0.5, 0.95, 0.99):
+        assert merged.sketch.quantile(q) == single.sketch.quantile(q)